@@ -83,6 +83,8 @@ REST_FRAMEWORK = {
 
 
 MIDDLEWARE = [
+    # En premier pour mesurer toute la chaîne (latence, requêtes SQL par vue)
+    'core.metrics.MetriquesMiddleware',
     'django.middleware.security.SecurityMiddleware',
 ]
 if WHITENOISE_AVAILABLE:
@@ -130,6 +132,34 @@ DATABASES = {
 }
 
 
+# Cache
+# Mémoire locale par défaut ; CACHE_URL=redis://hôte:6379/1 (paquet `redis` requis)
+# ou CACHE_URL=file:///chemin/du/cache pour un cache partagé entre workers.
+
+CACHE_URL = os.getenv('CACHE_URL', '')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+elif CACHE_URL.startswith('file://'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_URL[len('file://'):],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'proscool',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -200,6 +230,78 @@ EMAIL_PORT = int(os.getenv('EMAIL_PORT', '587'))
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+# Expéditeur des emails aux parents ; par défaut le compte SMTP
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER or 'webmaster@localhost')
+
+# Envoi des SMS (core/sms.py) : core.sms.TwilioBackend en production, ConsoleBackend,
+# FileBackend (SMS_FILE_PATH) ou LocmemBackend en développement et en test
+SMS_BACKEND = os.getenv('SMS_BACKEND', 'core.sms.TwilioBackend')
+SMS_FILE_PATH = os.getenv('SMS_FILE_PATH', os.path.join(BASE_DIR, 'sms.log'))
+SMS_TIMEOUT = float(os.getenv('SMS_TIMEOUT', '10'))
+TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID', '')
+TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN', '')
+TWILIO_FROM_NUMBER = os.getenv('TWILIO_FROM_NUMBER', '')
+
+# Durée de vie (secondes) de l'instantané de l'école affiché sur dashboard_admin
+SCHOOL_SNAPSHOT_TTL = int(os.getenv('SCHOOL_SNAPSHOT_TTL', '300'))
+
+# Durée de vie maximale (secondes) des graphiques mis en cache par enseignant
+TEACHER_ANALYTICS_TTL = int(os.getenv('TEACHER_ANALYTICS_TTL', '86400'))
+
+# Durée de vie (secondes) des fiches enfant mises en cache sur dashboard_parent
+PARENT_FRAGMENT_TTL = int(os.getenv('PARENT_FRAGMENT_TTL', '86400'))
+
+# Intervalle (secondes) d'écriture en base des positions GPS reçues
+TRANSPORT_FLUSH_INTERVAL = float(os.getenv('TRANSPORT_FLUSH_INTERVAL', '5'))
+
+# Intervalle (secondes) d'ajout en base des points de trace des bus
+TRACE_FLUSH_INTERVAL = float(os.getenv('TRACE_FLUSH_INTERVAL', '30'))
+
+# Flux SSE des positions : relecture du cache (secondes) et durée d'une connexion
+TRANSPORT_STREAM_INTERVAL = float(os.getenv('TRANSPORT_STREAM_INTERVAL', '2'))
+TRANSPORT_STREAM_DUREE = int(os.getenv('TRANSPORT_STREAM_DUREE', '300'))
+
+# Jeton optionnel exigé des traceurs GPS sur l'envoi groupé des positions de bus
+GPS_TRACKER_TOKEN = os.getenv('GPS_TRACKER_TOKEN', '')
+
+# Trajets de bus : distance (mètres) au point de départ qui marque le départ, rayons
+# d'approche et d'arrivée à un arrêt, relecture des arrêts d'un bus (secondes)
+TRAJET_DEPART_METRES = float(os.getenv('TRAJET_DEPART_METRES', '200'))
+GEOFENCE_APPROCHE_METRES = float(os.getenv('GEOFENCE_APPROCHE_METRES', '800'))
+GEOFENCE_RAYON_METRES = float(os.getenv('GEOFENCE_RAYON_METRES', '150'))
+GEOFENCE_ARRETS_TTL = int(os.getenv('GEOFENCE_ARRETS_TTL', '300'))
+# Fin d'un trajet sans dernier arrêt atteint : bus immobile (ou muet) pendant
+# TRAJET_INACTIVITE secondes. Après un trajet, un nouveau départ n'est compté qu'une
+# fois le bus resté TRAJET_REPOS secondes au même endroit (retour au dépôt)
+TRAJET_INACTIVITE = int(os.getenv('TRAJET_INACTIVITE', '1800'))
+TRAJET_REPOS = int(os.getenv('TRAJET_REPOS', '600'))
+
+# Estimation d'arrivée : vitesse moyenne de service (m/s) quand le bus est à l'arrêt,
+# et durée de validité (secondes) d'une estimation sans nouveau ping
+ETA_VITESSE_DEFAUT = float(os.getenv('ETA_VITESSE_DEFAUT', '6'))
+ETA_TTL = int(os.getenv('ETA_TTL', '600'))
+
+# Carte des transports (admin) : relecture des positions regroupées en marqueurs (secondes)
+CARTE_INDEX_TTL = int(os.getenv('CARTE_INDEX_TTL', '60'))
+
+# File des notifications : tentatives avant abandon, délai (secondes) avant le premier
+# nouvel essai, doublé à chaque échec, et durée de réservation d'une tâche par un worker
+NOTIF_TENTATIVES_MAX = int(os.getenv('NOTIF_TENTATIVES_MAX', '5'))
+NOTIF_DELAI_BASE = float(os.getenv('NOTIF_DELAI_BASE', '30'))
+NOTIF_RESERVATION = int(os.getenv('NOTIF_RESERVATION', '300'))
+
+# Fenêtre (secondes) pendant laquelle une même notification (parent, élève, type) n'est
+# pas renvoyée : les répétitions incrémentent le compteur de la première
+NOTIF_FENETRE_REGROUPEMENT = int(os.getenv('NOTIF_FENETRE_REGROUPEMENT', '900'))
+
+# Durée (secondes) du compteur de notifications non lues en cache. Le worker crée des
+# notifications dans un autre processus : sans cache partagé (CACHE_URL), les serveurs
+# web ne voient pas ses incréments et recomptent au plus tard après ce délai
+NOTIF_NON_LUES_TTL = int(os.getenv('NOTIF_NON_LUES_TTL', '86400' if CACHE_URL else '60'))
+
+# Jeton optionnel permettant à Prometheus de lire /metrics/ sans session admin
+# (metrics_path: /metrics/ dans la configuration du scraper)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
 
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 CSRF_COOKIE_SECURE = os.getenv('CSRF_COOKIE_SECURE', 'False') == 'True'
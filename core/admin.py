@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
-    Eleve, Absence, Note, Transport, Profile,
-    Enseignant, Parent, Cours, Quiz, Question, Probleme
+    Eleve, Absence, Note, Transport, Bus, Profile,
+    Enseignant, Parent, Cours, Quiz, Question, Probleme, TacheNotification
 )
 
 # Enregistrements simples
@@ -9,6 +9,7 @@ admin.site.register(Probleme)
 admin.site.register(Absence)
 admin.site.register(Note)
 admin.site.register(Transport)
+admin.site.register(Bus)
 admin.site.register(Profile)
 admin.site.register(Quiz)
 admin.site.register(Question)
@@ -62,3 +63,10 @@ class CoursAdmin(admin.ModelAdmin):
     list_display = ("nom", "enseignant", "classe", "date_creation")
     search_fields = ("nom", "enseignant__user__username")
     list_filter = ("classe", "date_creation")
+
+@admin.register(TacheNotification)
+class TacheNotificationAdmin(admin.ModelAdmin):
+    list_display = ("eleve", "numero_bus", "canal", "statut", "tentatives", "prochain_essai", "traitee_a")
+    list_filter = ("statut", "canal")
+    search_fields = ("eleve__nom", "eleve__prenom", "numero_bus", "derniere_erreur")
+    raw_id_fields = ("eleve",)
@@ -0,0 +1,159 @@
+# core/analytics.py
+#
+# Jeux de données des graphiques de dashboard_enseignant, mis en cache par
+# enseignant. Chaque enseignant a un numéro de version en cache : toute écriture
+# sur une de ses notes, sur une absence ou la classe d'un de ses élèves l'incrémente,
+# ce qui rend obsolètes ses graphiques sans toucher à ceux des autres enseignants.
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.utils import timezone
+
+from .models import Absence, Eleve, Enseignant, Note
+
+GRAPHIQUES = ('notes', 'absences', 'classes')
+
+
+def _cle_version(enseignant_id):
+    return f'core:enseignant:{enseignant_id}:charts:version'
+
+
+def _version(enseignant_id):
+    return cache.get_or_set(_cle_version(enseignant_id), 1, None)
+
+
+def invalider_enseignants(enseignant_ids):
+    for enseignant_id in set(enseignant_ids):
+        if enseignant_id is None:
+            continue
+        try:
+            cache.incr(_cle_version(enseignant_id))
+        except ValueError:
+            cache.set(_cle_version(enseignant_id), 1, None)
+
+
+def _graphique_notes(enseignant, today):
+    notes_par_matiere = (
+        Note.objects.filter(enseignant=enseignant)
+        .values('matiere')
+        .annotate(moyenne=Avg('note'))
+        .order_by('matiere')
+    )
+    return {
+        'labels': [n['matiere'] or '—' for n in notes_par_matiere],
+        'values': [float(n['moyenne'] or 0) for n in notes_par_matiere],
+    }
+
+
+def _graphique_absences(enseignant, today):
+    absences_par_jour = (
+        Absence.objects.filter(eleve__enseignants=enseignant, date__gte=today - timedelta(days=7))
+        .values('date')
+        .annotate(total=Count('id'))
+        .order_by('date')
+    )
+    return {
+        'labels': [a['date'].strftime('%d/%m') for a in absences_par_jour],
+        'values': [a['total'] for a in absences_par_jour],
+    }
+
+
+def _graphique_classes(enseignant, today):
+    eleves_par_classe = (
+        Eleve.objects.filter(enseignants=enseignant)
+        .values('classe')
+        .annotate(total=Count('id'))
+        .order_by('classe')
+    )
+    return {
+        'labels': [c['classe'] or '—' for c in eleves_par_classe],
+        'values': [c['total'] for c in eleves_par_classe],
+    }
+
+
+CALCULS = {
+    'notes': _graphique_notes,
+    'absences': _graphique_absences,
+    'classes': _graphique_classes,
+}
+
+
+def graphique_enseignant(enseignant, nom):
+    """Retourne {'labels': [...], 'values': [...]} pour un graphique, depuis le cache si possible."""
+    today = timezone.localdate()
+    # La date fait partie de la clé : l'histogramme des 7 jours glisse à minuit
+    cle = f'core:enseignant:{enseignant.pk}:charts:v{_version(enseignant.pk)}:{nom}:{today.isoformat()}'
+    donnees = cache.get(cle)
+    if donnees is None:
+        donnees = CALCULS[nom](enseignant, today)
+        cache.set(cle, donnees, settings.TEACHER_ANALYTICS_TTL)
+    return donnees
+
+
+def _enseignants_de_eleves(eleve_ids):
+    return Enseignant.objects.filter(eleves__id__in=eleve_ids).values_list('id', flat=True)
+
+
+def _memoriser_avant(sender, instance, raw=False, **kwargs):
+    instance._analytics_avant = None
+    if raw or not instance.pk:
+        return
+    champ = 'enseignant_id' if sender is Note else 'eleve_id'
+    instance._analytics_avant = sender.objects.filter(pk=instance.pk).values_list(champ, flat=True).first()
+
+
+def _note_modifiee(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalider_enseignants([instance.enseignant_id, getattr(instance, '_analytics_avant', None)])
+
+
+def _absence_modifiee(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    eleve_ids = {instance.eleve_id, getattr(instance, '_analytics_avant', None)} - {None}
+    invalider_enseignants(_enseignants_de_eleves(eleve_ids))
+
+
+def _eleve_modifie(sender, instance, created=False, raw=False, **kwargs):
+    # Changement de classe : graphique des classes de ses enseignants (un nouvel élève n'en a pas encore)
+    if raw or created:
+        return
+    invalider_enseignants(_enseignants_de_eleves([instance.pk]))
+
+
+def _memoriser_enseignants(sender, instance, **kwargs):
+    # Les affectations sont supprimées avec l'élève, avant post_delete
+    instance._analytics_enseignants = list(_enseignants_de_eleves([instance.pk]))
+
+
+def _eleve_supprime(sender, instance, **kwargs):
+    invalider_enseignants(getattr(instance, '_analytics_enseignants', []))
+
+
+def _affectation_modifiee(sender, instance, action, reverse, pk_set, **kwargs):
+    # Le graphique des classes dépend des élèves affectés à l'enseignant
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        invalider_enseignants([instance.pk])
+    elif pk_set:
+        invalider_enseignants(pk_set)
+    else:
+        invalider_enseignants(instance.enseignants.values_list('id', flat=True))
+
+
+pre_save.connect(_memoriser_avant, sender=Note, dispatch_uid='analytics_pre_note')
+pre_save.connect(_memoriser_avant, sender=Absence, dispatch_uid='analytics_pre_absence')
+post_save.connect(_note_modifiee, sender=Note, dispatch_uid='analytics_post_note')
+post_delete.connect(_note_modifiee, sender=Note, dispatch_uid='analytics_del_note')
+post_save.connect(_absence_modifiee, sender=Absence, dispatch_uid='analytics_post_absence')
+post_delete.connect(_absence_modifiee, sender=Absence, dispatch_uid='analytics_del_absence')
+post_save.connect(_eleve_modifie, sender=Eleve, dispatch_uid='analytics_post_eleve')
+pre_delete.connect(_memoriser_enseignants, sender=Eleve, dispatch_uid='analytics_pre_del_eleve')
+post_delete.connect(_eleve_supprime, sender=Eleve, dispatch_uid='analytics_del_eleve')
+m2m_changed.connect(_affectation_modifiee, sender=Eleve.enseignants.through, dispatch_uid='analytics_m2m_enseignants')
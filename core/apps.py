@@ -5,6 +5,12 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
 
+    def ready(self):
+        # Receivers qui tiennent à jour EleveStats et les caches dérivés
+        # (analytique, notifications non lues, fiches parent, positions, arrêts, carte),
+        # vérifications de déploiement, et compteur SQL posé sur chaque connexion ouverte
+        from . import analytics, boite, carte, checks, fragments, geofence, metrics, positions, stats  # noqa: F401
+
 
 
 def ready(self):
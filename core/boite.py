@@ -0,0 +1,64 @@
+# core/boite.py
+#
+# Nombre de notifications non lues par utilisateur, pour le badge des clients
+# mobiles (api/notifications/non_lues/). Le compteur est tenu dans le cache :
+# une notification créée l'incrémente (post_save), les lectures faites par
+# l'API l'ajustent directement, et toute autre modification l'efface pour qu'il
+# soit recompté, une fois, avec l'index (user, is_read).
+#
+# Les incréments faits par le worker des notifications ne sont vus des serveurs
+# web qu'à travers un cache partagé (CACHE_URL) ; à défaut, NOTIF_NON_LUES_TTL
+# est court et le compteur est recompté régulièrement.
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from .models import Notification
+
+
+def _cle(user_id):
+    return f'core:notifications:non_lues:{user_id}'
+
+
+def nombre_non_lues(user_id):
+    nombre = cache.get(_cle(user_id))
+    if nombre is None:
+        nombre = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        # add : un incrément posé entre-temps par un autre worker n'est pas écrasé
+        if not cache.add(_cle(user_id), nombre, settings.NOTIF_NON_LUES_TTL):
+            nombre = cache.get(_cle(user_id), nombre)
+    return nombre
+
+
+def ajuster_non_lues(user_id, delta):
+    if not delta:
+        return
+    try:
+        if cache.incr(_cle(user_id), delta) < 0:
+            cache.delete(_cle(user_id))
+    except ValueError:
+        pass  # pas encore compté : il le sera à la prochaine lecture
+
+
+def invalider_non_lues(user_ids):
+    # Après un bulk_create ou un update(), qui n'émettent pas de signaux
+    cache.delete_many([_cle(user_id) for user_id in set(user_ids)])
+
+
+def _notification_enregistree(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        if not instance.is_read:
+            ajuster_non_lues(instance.user_id, 1)
+    else:
+        invalider_non_lues([instance.user_id])
+
+
+def _notification_supprimee(sender, instance, **kwargs):
+    invalider_non_lues([instance.user_id])
+
+
+post_save.connect(_notification_enregistree, sender=Notification, dispatch_uid='boite_post_notification')
+post_delete.connect(_notification_supprimee, sender=Notification, dispatch_uid='boite_del_notification')
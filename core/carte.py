@@ -0,0 +1,143 @@
+# core/carte.py
+#
+# Marqueurs de la carte des transports (admin), regroupés côté serveur. Les
+# emplacements saisis (Transport.latitude/longitude, modifiés seulement par
+# save(), qui invalide l'index) sont chargés une fois par processus et projetés
+# en Web Mercator ; pour une emprise et un niveau de zoom, chaque point tombe
+# dans une case de TAILLE_CASE_PX pixels à l'écran et le navigateur ne reçoit
+# qu'un marqueur par case occupée (position moyenne et effectif), quel que soit
+# le nombre de transports.
+
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from .models import Transport
+
+try:
+    import numpy as np
+except ImportError:  # repli en Python pur, plus lent sur une grande flotte
+    np = None
+
+# Côté d'une case de regroupement, en pixels à l'écran
+TAILLE_CASE_PX = 60
+# Tuiles Web Mercator de 256 px
+TAILLE_TUILE_PX = 256
+LATITUDE_MAX = 85.05112878
+ZOOM_MAX = 22
+
+
+def _mercator(latitude, longitude):
+    """Coordonnées Web Mercator normalisées dans [0, 1] (x vers l'est, y vers le sud)."""
+    phi = math.radians(max(-LATITUDE_MAX, min(LATITUDE_MAX, latitude)))
+    return (longitude + 180) / 360, (1 - math.log(math.tan(phi) + 1 / math.cos(phi)) / math.pi) / 2
+
+
+class _Index:
+    def __init__(self, lignes):
+        self.eleve_ids = [l[0] for l in lignes]
+        self.numeros_bus = [l[1] for l in lignes]
+        self.charge_a = time.monotonic()
+        if np is not None:
+            self.lat = np.array([l[2] for l in lignes], dtype=np.float64)
+            self.lon = np.array([l[3] for l in lignes], dtype=np.float64)
+            # _mercator, sur tout le tableau
+            phi = np.radians(np.clip(self.lat, -LATITUDE_MAX, LATITUDE_MAX))
+            self.x = (self.lon + 180) / 360
+            self.y = (1 - np.log(np.tan(phi) + 1 / np.cos(phi)) / np.pi) / 2
+        else:
+            projetes = [_mercator(l[2], l[3]) for l in lignes]
+            self.lat = [l[2] for l in lignes]
+            self.lon = [l[3] for l in lignes]
+            self.x = [p[0] for p in projetes]
+            self.y = [p[1] for p in projetes]
+
+    def _groupes_numpy(self, ouest, sud, est, nord, cases):
+        selection = np.flatnonzero((self.lat >= sud) & (self.lat <= nord) & (self.lon >= ouest) & (self.lon <= est))
+        if not len(selection):
+            return []
+        cx = (self.x[selection] * cases).astype(np.int64)
+        cy = (self.y[selection] * cases).astype(np.int64)
+        _, premiers, inverse, effectifs = np.unique(
+            cx * (cases + 1) + cy, return_index=True, return_inverse=True, return_counts=True,
+        )
+        latitudes = np.bincount(inverse, weights=self.lat[selection]) / effectifs
+        longitudes = np.bincount(inverse, weights=self.lon[selection]) / effectifs
+        return [
+            (float(latitudes[k]), float(longitudes[k]), int(effectifs[k]), int(selection[premiers[k]]))
+            for k in range(len(effectifs))
+        ]
+
+    def _groupes_python(self, ouest, sud, est, nord, cases):
+        cumuls = {}
+        for i, (lat, lon) in enumerate(zip(self.lat, self.lon)):
+            if sud <= lat <= nord and ouest <= lon <= est:
+                cumul = cumuls.setdefault((int(self.x[i] * cases), int(self.y[i] * cases)), [0.0, 0.0, 0, i])
+                cumul[0] += lat
+                cumul[1] += lon
+                cumul[2] += 1
+        return [(s_lat / n, s_lon / n, n, i) for s_lat, s_lon, n, i in cumuls.values()]
+
+    def groupes(self, ouest, sud, est, nord, zoom):
+        """[(latitude moyenne, longitude moyenne, effectif, indice d'un point du groupe)]"""
+        cases = 2 ** zoom * TAILLE_TUILE_PX // TAILLE_CASE_PX + 1
+        if np is not None:
+            return self._groupes_numpy(ouest, sud, est, nord, cases)
+        return self._groupes_python(ouest, sud, est, nord, cases)
+
+
+_verrou = threading.Lock()
+_index = None
+# Incrémentée à chaque invalidation : un index chargé avant n'est pas installé
+_generation = 0
+
+
+def _index_courant():
+    global _index
+    index = _index
+    if index is not None and time.monotonic() - index.charge_a < settings.CARTE_INDEX_TTL:
+        return index
+
+    generation = _generation
+    lignes = list(
+        Transport.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        .values_list('eleve_id', 'numero_bus', 'latitude', 'longitude')
+    )
+    index = _Index(lignes)
+    with _verrou:
+        if generation == _generation:
+            _index = index
+    return index
+
+
+def marqueurs(ouest, sud, est, nord, zoom):
+    """Marqueurs de l'emprise : un par case occupée, avec l'élève et le bus quand la case est seule."""
+    index = _index_courant()
+    resultat = []
+    for latitude, longitude, effectif, i in index.groupes(ouest, sud, est, nord, min(max(zoom, 0), ZOOM_MAX)):
+        marqueur = {'latitude': round(latitude, 6), 'longitude': round(longitude, 6), 'nombre': effectif}
+        if effectif == 1:
+            marqueur['eleve_id'] = index.eleve_ids[i]
+            marqueur['numero_bus'] = index.numeros_bus[i] or ''
+        resultat.append(marqueur)
+    return resultat
+
+
+def invalider_index():
+    """Oublie l'index de ce processus ; un chargement en cours ne sera pas installé."""
+    global _index, _generation
+    with _verrou:
+        _index = None
+        _generation += 1
+
+
+def _transport_modifie(sender, instance, **kwargs):
+    # Les autres processus rechargent l'index au bout de CARTE_INDEX_TTL
+    invalider_index()
+
+
+post_save.connect(_transport_modifie, sender=Transport, dispatch_uid='carte_post_transport')
+post_delete.connect(_transport_modifie, sender=Transport, dispatch_uid='carte_del_transport')
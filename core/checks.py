@@ -0,0 +1,28 @@
+# core/checks.py
+#
+# Vérifications de déploiement (manage.py check --deploy). Le worker des
+# notifications et le service snapshot tournent dans d'autres processus que les
+# serveurs web : versions des fiches parent, compteurs de non-lues, dédoublonnage
+# des trajets et des notifications (cache.add) et instantané de l'école supposent
+# un cache partagé.
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+CACHES_LOCAUX = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def verifier_cache_partage(app_configs, **kwargs):
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend not in CACHES_LOCAUX:
+        return []
+    return [Warning(
+        "Le cache par défaut est propre à chaque processus : le worker des notifications, le service "
+        "snapshot et les serveurs web ne partagent ni compteurs ni dédoublonnage.",
+        hint="Définir CACHE_URL=redis://… pour tous les services (file://… seulement sur une même machine).",
+        id='core.W001',
+    )]
@@ -0,0 +1,115 @@
+# core/eta.py
+#
+# Heure d'arrivée estimée du bus à l'arrêt de chaque élève. Le calcul est fait
+# une fois par bus à chaque envoi de position (transport_positions_bus) et mis
+# en cache ; transport_position_parent et transport_eta_parent ne font que le
+# relire, quel que soit le nombre de parents connectés.
+#
+# Vitesse : moyenne glissante des vitesses entre pings successifs. Distance
+# restante : tournée au plus proche voisin sur les arrêts pas encore atteints
+# pendant le trajet (core.geofence), majorée d'un facteur de détour routier.
+
+import math
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .geofence import RAYON_TERRE_METRES, arrets_du_bus, cle_arrivee, trajet_en_cours
+
+# Poids du dernier ping dans la vitesse lissée
+LISSAGE_VITESSE = 0.3
+# Distance par la route / distance à vol d'oiseau, en ville
+FACTEUR_DETOUR = 1.3
+# En dessous (m/s), le bus est à l'arrêt : on estime avec la vitesse moyenne de service
+VITESSE_MIN = 1.0
+
+
+def _cle(numero_bus):
+    return f'core:eta:bus:{numero_bus}'
+
+
+def _distance(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * RAYON_TERRE_METRES * math.asin(math.sqrt(a))
+
+
+def _tournee(arrets, restants, latitude, longitude):
+    """[(indice d'arrêt, distance cumulée en mètres)] en allant chaque fois à l'arrêt restant le plus proche."""
+    restants = set(restants)
+    tournee = []
+    cumul = 0.0
+    while restants:
+        distances = arrets.distances(latitude, longitude)
+        i = min(restants, key=lambda k: distances[k])
+        cumul += float(distances[i])
+        tournee.append((i, cumul))
+        restants.remove(i)
+        latitude, longitude = arrets.latitudes[i], arrets.longitudes[i]
+    return tournee
+
+
+def mettre_a_jour_eta(numero_bus, latitude, longitude):
+    precedent = cache.get(_cle(numero_bus))
+    maintenant = time.time()
+
+    vitesse = None
+    if precedent is not None and maintenant > precedent['horodatage']:
+        instantanee = (
+            _distance(precedent['latitude'], precedent['longitude'], latitude, longitude)
+            / (maintenant - precedent['horodatage'])
+        )
+        if precedent['vitesse'] is None:
+            vitesse = instantanee
+        else:
+            vitesse = LISSAGE_VITESSE * instantanee + (1 - LISSAGE_VITESSE) * precedent['vitesse']
+
+    arrets = arrets_du_bus(numero_bus)
+    trajet = trajet_en_cours(numero_bus)
+    # Avant le départ, toute la tournée reste à faire
+    atteints = {}
+    if trajet is not None:
+        atteints = cache.get_many([cle_arrivee(numero_bus, trajet, eleve_id) for eleve_id in arrets.eleve_ids])
+    restants = [
+        i for i, eleve_id in enumerate(arrets.eleve_ids)
+        if cle_arrivee(numero_bus, trajet, eleve_id) not in atteints
+    ]
+
+    vitesse_estimee = vitesse if vitesse is not None and vitesse >= VITESSE_MIN else settings.ETA_VITESSE_DEFAUT
+    estimations = {}
+    for i, cumul in _tournee(arrets, restants, latitude, longitude):
+        distance = cumul * FACTEUR_DETOUR
+        estimations[arrets.eleve_ids[i]] = (round(distance), maintenant + distance / vitesse_estimee)
+
+    cache.set(_cle(numero_bus), {
+        'latitude': latitude,
+        'longitude': longitude,
+        'horodatage': maintenant,
+        'vitesse': vitesse,
+        'estimations': estimations,
+    }, settings.ETA_TTL)
+
+
+def mettre_a_jour_eta_bus(positions):
+    """mettre_a_jour_eta pour un lot [(numero_bus, latitude, longitude), ...] ; dernière position par bus."""
+    dernieres = {numero: (latitude, longitude) for numero, latitude, longitude in positions}
+    for numero, (latitude, longitude) in dernieres.items():
+        mettre_a_jour_eta(numero, latitude, longitude)
+
+
+def eta_transport(transport):
+    """{'secondes', 'heure', 'distance_m'} pour l'arrêt de l'élève, ou None si inconnue."""
+    if transport is None or not transport.numero_bus:
+        return None
+    etat = cache.get(_cle(transport.numero_bus))
+    if etat is None or transport.eleve_id not in etat['estimations']:
+        return None
+    distance, arrivee = etat['estimations'][transport.eleve_id]
+    return {
+        'secondes': max(0, round(arrivee - time.time())),
+        'heure': timezone.localtime(datetime.fromtimestamp(arrivee, tz=dt_timezone.utc)).strftime('%H:%M'),
+        'distance_m': distance,
+    }
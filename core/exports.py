@@ -0,0 +1,64 @@
+# core/exports.py
+#
+# Export des notes en flux (StreamingHttpResponse) : les lignes sont lues par
+# paquets avec QuerySet.iterator() et écrites au fil de l'eau, la mémoire reste
+# constante et les premiers octets partent immédiatement.
+
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+
+TAILLE_PAQUET = 2000
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+}
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer : write() renvoie la ligne au lieu de la stocker."""
+
+    def write(self, value):
+        return value
+
+
+def _lignes(notes, avec_enseignant):
+    champs = ['eleve__nom', 'eleve__prenom', 'eleve__classe', 'matiere', 'note', 'date']
+    if avec_enseignant:
+        champs.append('enseignant__user__username')
+    return notes.order_by('-date', '-id').values_list(*champs).iterator(chunk_size=TAILLE_PAQUET)
+
+
+def _flux_csv(notes, avec_enseignant):
+    writer = csv.writer(_Echo())
+    entete = ['Eleve', 'Classe', 'Matiere', 'Note', 'Date']
+    if avec_enseignant:
+        entete.append('Enseignant')
+    yield writer.writerow(entete)
+    for nom, prenom, classe, matiere, note, date, *reste in _lignes(notes, avec_enseignant):
+        yield writer.writerow([f"{nom} {prenom}", classe, matiere, note, date, *reste])
+
+
+def _flux_jsonl(notes, avec_enseignant):
+    for nom, prenom, classe, matiere, note, date, *reste in _lignes(notes, avec_enseignant):
+        ligne = {
+            'eleve': f"{nom} {prenom}",
+            'classe': classe,
+            'matiere': matiere,
+            'note': note,
+            'date': date.isoformat() if date else None,
+        }
+        if avec_enseignant:
+            ligne['enseignant'] = reste[0]
+        yield json.dumps(ligne, ensure_ascii=False) + '\n'
+
+
+def exporter_notes(notes, format_export, nom_fichier, avec_enseignant=False):
+    """Réponse en flux pour un queryset de Note ; format_export vaut 'csv' ou 'jsonl'."""
+    content_type, extension = FORMATS[format_export]
+    flux = _flux_csv if format_export == 'csv' else _flux_jsonl
+    response = StreamingHttpResponse(flux(notes, avec_enseignant), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{nom_fichier}.{extension}"'
+    return response
@@ -0,0 +1,88 @@
+# core/fragments.py
+#
+# Versions des fiches enfant de dashboard_parent. Chaque élève a un numéro de
+# version en cache, utilisé dans la clé du fragment {% cache %} : une écriture
+# sur ses notes, absences, enseignants ou transport l'incrémente et seule sa
+# fiche est recalculée au prochain affichage.
+
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+
+from .models import Absence, Eleve, Enseignant, Note, Transport
+
+# Mises à jour GPS (transport_update_position) : la position est lue en JS,
+# la fiche en cache ne change pas.
+CHAMPS_POSITION = frozenset({'latitude_actuelle', 'longitude_actuelle'})
+
+
+def _cle_version(eleve_id):
+    return f'core:eleve:{eleve_id}:fiche:version'
+
+
+def versions_fiches(eleve_ids):
+    """Retourne {eleve_id: version} en un seul aller-retour vers le cache."""
+    cles = {_cle_version(eleve_id): eleve_id for eleve_id in eleve_ids}
+    trouvees = cache.get_many(cles)
+    manquantes = {cle: 1 for cle in cles if cle not in trouvees}
+    if manquantes:
+        cache.set_many(manquantes, None)
+    return {eleve_id: trouvees.get(cle, 1) for cle, eleve_id in cles.items()}
+
+
+def invalider_fiches(eleve_ids):
+    for eleve_id in set(eleve_ids):
+        if eleve_id is None:
+            continue
+        try:
+            cache.incr(_cle_version(eleve_id))
+        except ValueError:
+            cache.set(_cle_version(eleve_id), 1, None)
+
+
+def _position_seule(sender, update_fields):
+    return sender is Transport and bool(update_fields) and CHAMPS_POSITION.issuperset(update_fields)
+
+
+def _memoriser_eleve(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._fiche_avant = None
+    if raw or not instance.pk or _position_seule(sender, update_fields):
+        return
+    instance._fiche_avant = sender.objects.filter(pk=instance.pk).values_list('eleve_id', flat=True).first()
+
+
+def _ligne_modifiee(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or _position_seule(sender, update_fields):
+        return
+    invalider_fiches([instance.eleve_id, getattr(instance, '_fiche_avant', None)])
+
+
+def _eleve_modifie(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalider_fiches([instance.pk])
+
+
+def _enseignant_modifie(sender, instance, raw=False, **kwargs):
+    # La spécialité est affichée sur la fiche de chacun de ses élèves
+    if not raw:
+        invalider_fiches(instance.eleves.values_list('id', flat=True))
+
+
+def _affectation_modifiee(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalider_fiches([instance.pk])
+    elif pk_set:
+        invalider_fiches(pk_set)
+    else:
+        invalider_fiches(instance.eleves.values_list('id', flat=True))
+
+
+for _modele in (Note, Absence, Transport):
+    _nom = _modele.__name__.lower()
+    pre_save.connect(_memoriser_eleve, sender=_modele, dispatch_uid=f'fragments_pre_{_nom}')
+    post_save.connect(_ligne_modifiee, sender=_modele, dispatch_uid=f'fragments_post_{_nom}')
+    post_delete.connect(_ligne_modifiee, sender=_modele, dispatch_uid=f'fragments_del_{_nom}')
+post_save.connect(_eleve_modifie, sender=Eleve, dispatch_uid='fragments_post_eleve')
+post_save.connect(_enseignant_modifie, sender=Enseignant, dispatch_uid='fragments_post_enseignant')
+m2m_changed.connect(_affectation_modifiee, sender=Eleve.enseignants.through, dispatch_uid='fragments_m2m_enseignants')
@@ -0,0 +1,131 @@
+# core/geofence.py
+#
+# Arrêts des bus, pour la machine à états des trajets (core.trajets) et les
+# estimations d'arrivée (core.eta). Les arrêts d'un bus sont les domiciles de
+# ses élèves (Transport.latitude/longitude) : ils sont chargés une fois par
+# processus dans des tableaux NumPy, et la distance haversine du bus à tous les
+# arrêts est calculée en une seule opération vectorisée.
+
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .fragments import CHAMPS_POSITION
+from .models import Transport
+
+try:
+    import numpy as np
+except ImportError:  # repli en Python pur, plus lent sur les longues tournées
+    np = None
+
+RAYON_TERRE_METRES = 6371000.0
+
+
+class _Arrets:
+    """Domiciles des élèves d'un bus, en radians."""
+
+    def __init__(self, eleve_ids, latitudes, longitudes):
+        self.eleve_ids = eleve_ids
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.charge_a = time.monotonic()
+        if np is not None:
+            self.lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+            self.lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+            self.cos_lat = np.cos(self.lat)
+        else:
+            self.lat = [math.radians(v) for v in latitudes]
+            self.lon = [math.radians(v) for v in longitudes]
+            self.cos_lat = [math.cos(v) for v in self.lat]
+
+    def distances(self, latitude, longitude):
+        """Distances (mètres) du point à chaque arrêt, dans l'ordre de eleve_ids."""
+        lat, lon = math.radians(latitude), math.radians(longitude)
+        cos_lat = math.cos(lat)
+        if np is not None:
+            a = np.sin((self.lat - lat) / 2) ** 2 + cos_lat * self.cos_lat * np.sin((self.lon - lon) / 2) ** 2
+            return 2 * RAYON_TERRE_METRES * np.arcsin(np.sqrt(a))
+        return [
+            2 * RAYON_TERRE_METRES * math.asin(math.sqrt(
+                math.sin((la - lat) / 2) ** 2 + cos_lat * c * math.sin((lo - lon) / 2) ** 2
+            ))
+            for la, lo, c in zip(self.lat, self.lon, self.cos_lat)
+        ]
+
+    def proches(self, latitude, longitude, rayon):
+        """[(eleve_id, distance)] des arrêts à moins de `rayon` mètres."""
+        distances = self.distances(latitude, longitude)
+        if np is not None:
+            return [(self.eleve_ids[i], float(distances[i])) for i in np.flatnonzero(distances <= rayon)]
+        return [(eleve_id, d) for eleve_id, d in zip(self.eleve_ids, distances) if d <= rayon]
+
+
+_verrou = threading.Lock()
+_arrets_par_bus = {}
+
+
+def arrets_du_bus(numero_bus):
+    arrets = _arrets_par_bus.get(numero_bus)
+    if arrets is not None and time.monotonic() - arrets.charge_a < settings.GEOFENCE_ARRETS_TTL:
+        return arrets
+
+    lignes = list(
+        Transport.objects.filter(numero_bus=numero_bus, latitude__isnull=False, longitude__isnull=False)
+        .values_list('eleve_id', 'latitude', 'longitude')
+    )
+    arrets = _Arrets([l[0] for l in lignes], [l[1] for l in lignes], [l[2] for l in lignes])
+    with _verrou:
+        _arrets_par_bus[numero_bus] = arrets
+    return arrets
+
+
+def oublier_arrets():
+    """Vide les arrêts chargés par ce processus ; ils sont relus au prochain ping."""
+    with _verrou:
+        _arrets_par_bus.clear()
+
+
+def cle_trajet(numero_bus):
+    # Identifiant du trajet en cours, posé au départ par core.trajets
+    return f'core:trajet:{numero_bus}:courant'
+
+
+def trajet_en_cours(numero_bus):
+    """Identifiant du trajet en cours du bus, ou None s'il n'est pas parti."""
+    return cache.get(cle_trajet(numero_bus))
+
+
+def cle_arrivee(numero_bus, trajet, eleve_id):
+    # Posée par core.trajets quand le bus atteint l'arrêt de l'élève
+    return f'core:geofence:{numero_bus}:{trajet}:{eleve_id}'
+
+
+def _position_seule(update_fields):
+    # Position GPS de l'élève (core.positions) : ses arrêts ne changent pas
+    return bool(update_fields) and CHAMPS_POSITION.issuperset(update_fields)
+
+
+def _memoriser_bus(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._bus_avant = None
+    if raw or not instance.pk or _position_seule(update_fields):
+        return
+    instance._bus_avant = Transport.objects.filter(pk=instance.pk).values_list('numero_bus', flat=True).first()
+
+
+def _transport_modifie(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Les autres processus rechargent leurs arrêts au bout de GEOFENCE_ARRETS_TTL
+    if _position_seule(update_fields):
+        return
+    with _verrou:
+        # Un élève qui change de bus quitte aussi les arrêts de l'ancien
+        for numero_bus in {instance.numero_bus, getattr(instance, '_bus_avant', None)}:
+            _arrets_par_bus.pop(numero_bus, None)
+
+
+pre_save.connect(_memoriser_bus, sender=Transport, dispatch_uid='geofence_pre_transport')
+post_save.connect(_transport_modifie, sender=Transport, dispatch_uid='geofence_post_transport')
+post_delete.connect(_transport_modifie, sender=Transport, dispatch_uid='geofence_del_transport')
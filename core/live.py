@@ -0,0 +1,43 @@
+# core/live.py
+#
+# Flux Server-Sent Events des positions de bus (transport_position_stream).
+# Chaque connexion relit la position de l'élève dans le cache à intervalle
+# court, côté serveur, et n'envoie un événement que lorsqu'elle a changé ; un
+# commentaire de maintien garde la connexion ouverte derrière les proxys.
+# Nécessite un serveur ASGI (config/asgi.py).
+
+import asyncio
+import json
+import time
+
+from django.conf import settings
+
+from .positions import aposition_transport, etat_position
+
+MAINTIEN_SECONDES = 15
+
+
+def _evenement(donnees):
+    return f"event: position\ndata: {json.dumps(donnees)}\n\n"
+
+
+async def flux_position(eleve):
+    """Générateur SSE pour un élève dont le transport est déjà chargé (select_related)."""
+    transport = getattr(eleve, 'transport', None)
+    # Le navigateur se reconnecte seul à la fin du flux
+    yield f"retry: {int(settings.TRANSPORT_STREAM_INTERVAL * 1000)}\n\n"
+
+    fin = time.monotonic() + settings.TRANSPORT_STREAM_DUREE
+    derniere = None
+    derniere_emission = time.monotonic()
+    while time.monotonic() < fin:
+        position = await aposition_transport(transport) if transport else None
+        donnees = etat_position(transport, position)
+        if donnees != derniere:
+            yield _evenement(donnees)
+            derniere = donnees
+            derniere_emission = time.monotonic()
+        elif time.monotonic() - derniere_emission >= MAINTIEN_SECONDES:
+            yield ": maintien\n\n"
+            derniere_emission = time.monotonic()
+        await asyncio.sleep(settings.TRANSPORT_STREAM_INTERVAL)
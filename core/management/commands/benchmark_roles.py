@@ -0,0 +1,116 @@
+import json
+import math
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+def _scenarios():
+    # (rôle, nom, URL, authentification JWT ?)
+    return [
+        ('eleve', 'dashboard_eleve', reverse('dashboard_eleve'), False),
+        ('parent', 'dashboard_parent', reverse('dashboard_parent'), False),
+        ('enseignant', 'dashboard_enseignant', reverse('dashboard_enseignant'), False),
+        ('enseignant', 'gerer_notes', reverse('gerer_notes'), False),
+        ('enseignant', 'api_eleves', reverse('eleve-list'), True),
+        ('enseignant', 'api_notes', reverse('note-list'), True),
+        ('enseignant', 'api_absences', reverse('absence-list'), True),
+        ('admin', 'dashboard_admin', reverse('dashboard_admin'), False),
+        ('admin', 'liste_eleves', reverse('liste_eleves'), False),
+    ]
+
+
+def _percentile(valeurs, p):
+    # Méthode du rang le plus proche
+    ordonnees = sorted(valeurs)
+    rang = max(0, math.ceil(p / 100 * len(ordonnees)) - 1)
+    return ordonnees[rang]
+
+
+class Command(BaseCommand):
+    help = (
+        "Se connecte avec chaque rôle d'une école synthétique (generate_school) et mesure "
+        "les tableaux de bord, gerer_notes et l'API REST : latence p50/p95 et requêtes SQL, en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefixe', default='synth', help="Préfixe utilisé lors de generate_school.")
+        parser.add_argument('--repetitions', type=int, default=20)
+        parser.add_argument('--echauffement', type=int, default=2, help="Appels non mesurés avant chaque scénario.")
+        parser.add_argument('--output', help="Fichier JSON de sortie (sinon sortie standard).")
+
+    def handle(self, *args, **options):
+        prefixe = options['prefixe']
+        comptes = {
+            'eleve': f'{prefixe}_eleve_0',
+            'parent': f'{prefixe}_parent_0',
+            'enseignant': f'{prefixe}_enseignant_0',
+            'admin': f'{prefixe}_admin',
+        }
+        users = {u.username: u for u in User.objects.filter(username__in=comptes.values())}
+        manquants = [nom for nom in comptes.values() if nom not in users]
+        if manquants:
+            raise CommandError(f"Comptes introuvables ({', '.join(manquants)}) : lancez d'abord generate_school.")
+
+        resultats = []
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for role, nom, url, jwt in _scenarios():
+                user = users[comptes[role]]
+                client = Client()
+                entetes = {}
+                if jwt:
+                    entetes['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(user).access_token}'
+                else:
+                    client.force_login(user)
+
+                for _ in range(options['echauffement']):
+                    self._appeler(client, url, entetes)
+
+                latences = []
+                requetes = []
+                for _ in range(options['repetitions']):
+                    with CaptureQueriesContext(connection) as capture:
+                        debut = time.perf_counter()
+                        statut = self._appeler(client, url, entetes)
+                        latences.append((time.perf_counter() - debut) * 1000)
+                    requetes.append(len(capture))
+
+                resultats.append({
+                    'role': role,
+                    'scenario': nom,
+                    'url': url,
+                    'status': statut,
+                    'p50_ms': round(_percentile(latences, 50), 2),
+                    'p95_ms': round(_percentile(latences, 95), 2),
+                    'moyenne_ms': round(statistics.fmean(latences), 2),
+                    'requetes_sql': max(requetes),
+                })
+                self.stderr.write(f"{nom:<22} p50={resultats[-1]['p50_ms']:>8} ms  sql={resultats[-1]['requetes_sql']}")
+
+        rapport = {
+            'date': timezone.now().isoformat(),
+            'base': connection.vendor,
+            'prefixe': prefixe,
+            'repetitions': options['repetitions'],
+            'resultats': resultats,
+        }
+        contenu = json.dumps(rapport, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fichier:
+                fichier.write(contenu + '\n')
+        else:
+            self.stdout.write(contenu)
+
+    def _appeler(self, client, url, entetes):
+        response = client.get(url, **entetes)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code
@@ -0,0 +1,81 @@
+import re
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Absence, Badge, Eleve, Enseignant, Note, Notification, Quiz, SoumissionQuiz
+from core.synthetic import generer_ecole
+
+# Lignes de plan qui trahissent un parcours complet de table
+SCAN_SEQUENTIEL = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    # SQLite : "SCAN core_note" (sans "USING INDEX") est un parcours complet
+    'sqlite': re.compile(r'\bSCAN (\w+)(?! USING (?:COVERING )?INDEX)(?:\s|$)'),
+}
+
+
+def requetes_canoniques():
+    """Requêtes représentatives des tableaux de bord, avec des paramètres pris dans la base."""
+    eleve = Eleve.objects.filter(parent_user__isnull=False).order_by('id').first() or Eleve.objects.order_by('id').first()
+    enseignant = Enseignant.objects.order_by('id').first()
+    quiz = Quiz.objects.select_related('cours').order_by('id').first()
+    if not (eleve and enseignant and quiz):
+        raise CommandError("Base vide : relancez avec --seed pour générer un jeu de données.")
+    depuis = date.today() - timedelta(days=7)
+
+    return {
+        # dashboard_eleve / notes_eleve
+        'notes_eleve': Note.objects.filter(eleve=eleve).order_by('-date'),
+        'absences_eleve': Absence.objects.filter(eleve=eleve, justifiee=False, date__gte=depuis),
+        'badges_eleve': Badge.objects.filter(eleve=eleve),
+        # dashboard_enseignant / gerer_notes
+        'notes_enseignant': Note.objects.filter(enseignant=enseignant).order_by('-date')[:6],
+        'absences_enseignant_7j': Absence.objects.filter(eleve__enseignants=enseignant, date__gte=depuis),
+        # passer_quiz / cours_pour_eleve / mini-jeux
+        'soumissions_quiz': SoumissionQuiz.objects.filter(eleve=eleve, quiz=quiz),
+        'badge_existe': Badge.objects.filter(eleve=eleve, cours=quiz.cours, titre='Math Master'),
+        # dashboard_parent / dashboard_admin
+        'notifications_parent': Notification.objects.filter(user_id=eleve.parent_user_id).order_by('-created_at')[:10],
+        'notifications_recentes': Notification.objects.order_by('-created_at')[:10],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Exécute EXPLAIN sur les requêtes canoniques des tableaux de bord et échoue "
+        "si l'une d'elles parcourt une table séquentiellement."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help="Génère une école de N élèves (voir generate_school) dans une transaction annulée à la fin.",
+        )
+
+    def handle(self, *args, **options):
+        motif = SCAN_SEQUENTIEL.get(connection.vendor)
+        if motif is None:
+            raise CommandError(f"Moteur non pris en charge : {connection.vendor}")
+
+        with transaction.atomic():
+            if options['seed']:
+                generer_ecole(options['seed'], prefixe='plan')
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            echecs = []
+            for nom, queryset in requetes_canoniques().items():
+                plan = queryset.explain()
+                tables = [t for t in motif.findall(plan) if t.startswith('core_')]
+                if tables:
+                    echecs.append(nom)
+                    self.stdout.write(self.style.ERROR(f"✗ {nom} : parcours séquentiel sur {', '.join(tables)}"))
+                    self.stdout.write(plan)
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"✓ {nom}"))
+
+            transaction.set_rollback(True)
+
+        if echecs:
+            raise CommandError(f"{len(echecs)} requête(s) sans index : {', '.join(echecs)}")
@@ -0,0 +1,44 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.synthetic import MOT_DE_PASSE, generer_ecole
+
+
+class Command(BaseCommand):
+    help = "Génère une école synthétique (élèves CE1–CE6, enseignants, parents, notes, transports...) via bulk_create."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--eleves', type=int, default=1000, help="Nombre d'élèves (défaut : 1000).")
+        parser.add_argument('--prefixe', default='synth', help="Préfixe des noms d'utilisateur générés.")
+        parser.add_argument('--eleves-par-enseignant', type=int, default=25)
+        parser.add_argument('--notes-par-eleve', type=int, default=20)
+        parser.add_argument('--absences-par-eleve', type=int, default=4)
+        parser.add_argument('--quiz-par-cours', type=int, default=3)
+        parser.add_argument('--eleves-par-bus', type=int, default=40)
+        parser.add_argument('--graine', type=int, default=0, help="Graine aléatoire (résultats reproductibles).")
+
+    def handle(self, *args, **options):
+        prefixe = options['prefixe']
+        if User.objects.filter(username__startswith=f'{prefixe}_').exists():
+            raise CommandError(f"Des comptes « {prefixe}_* » existent déjà : choisissez un autre --prefixe.")
+
+        debut = time.perf_counter()
+        totaux = generer_ecole(
+            options['eleves'],
+            prefixe=prefixe,
+            eleves_par_enseignant=options['eleves_par_enseignant'],
+            notes_par_eleve=options['notes_par_eleve'],
+            absences_par_eleve=options['absences_par_eleve'],
+            quiz_par_cours=options['quiz_par_cours'],
+            eleves_par_bus=options['eleves_par_bus'],
+            graine=options['graine'],
+        )
+        duree = time.perf_counter() - debut
+
+        for modele, total in totaux.items():
+            self.stdout.write(f"  {modele:<14} {total}")
+        self.stdout.write(self.style.SUCCESS(
+            f"École « {prefixe} » générée en {duree:.1f} s (mot de passe des comptes : {MOT_DE_PASSE})."
+        ))
@@ -0,0 +1,331 @@
+import heapq
+import http.client
+import json
+import math
+import random
+import re
+import statistics
+import threading
+import time
+from collections import Counter
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Bus, Eleve, Transport
+from core.trames import ENREGISTREMENT
+
+VUES_SUIVIES = ('transport_update_position', 'transport_positions_bus', 'transport_position_parent')
+
+
+def _percentile(valeurs, p):
+    # Méthode du rang le plus proche
+    ordonnees = sorted(valeurs)
+    rang = max(0, math.ceil(p / 100 * len(ordonnees)) - 1)
+    return ordonnees[rang]
+
+
+def _series(texte, nom, etiquette):
+    """Valeurs d'une métrique de /metrics/ : {(valeur de l'étiquette, suffixe ou opération): valeur}.
+
+    Histogrammes par vue : clés (vue, '_sum' | '_count'). Compteurs d'écriture par
+    table : clés (table, opération).
+    """
+    series = {}
+    motif = re.compile(rf'^{nom}(_sum|_count)?{{{etiquette}="([^"]*)"(?:,operation="([^"]*)")?}} (\S+)$')
+    for ligne in texte.splitlines():
+        trouve = motif.match(ligne)
+        if trouve:
+            suffixe, cle, operation, valeur = trouve.groups()
+            series[(cle, operation or suffixe)] = float(valeur)
+    return series
+
+
+class _Acteur:
+    """Un bus qui envoie sa position ou un parent qui consulte celle de son enfant."""
+
+    def __init__(self, role, intervalle, construire):
+        self.role = role
+        self.intervalle = intervalle
+        self.construire = construire  # -> (méthode, chemin, corps, en-têtes)
+
+
+class _Resultats:
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self.latences = {}
+        self.statuts = {}
+
+    def enregistrer(self, role, latence, statut):
+        with self._verrou:
+            self.latences.setdefault(role, []).append(latence)
+            self.statuts.setdefault(role, Counter())[statut] += 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge du suivi des transports contre un serveur local : N bus envoient leur "
+        "position pendant que M parents consultent celle de leur enfant. Rapport JSON : débit, "
+        "latences p50/p95/p99, taux d'erreur, requêtes SQL par vue et écritures en base par table "
+        "(via /metrics/, quel que soit le moteur de base de données)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Adresse du serveur à tester.")
+        parser.add_argument('--prefixe', default='synth', help="Préfixe utilisé lors de generate_school.")
+        parser.add_argument('--bus', type=int, default=10, help="Nombre de bus simulés.")
+        parser.add_argument('--parents', type=int, default=100, help="Nombre de parents simulés.")
+        parser.add_argument('--intervalle-bus', type=float, default=2.0, help="Secondes entre deux positions d'un bus.")
+        parser.add_argument('--intervalle-parents', type=float, default=10.0, help="Secondes entre deux consultations.")
+        parser.add_argument(
+            '--mode', choices=('eleve', 'bus', 'trame'), default='eleve',
+            help=(
+                "eleve : transport_update_position (une position par élève) ; bus : envoi groupé par "
+                "numero_bus en JSON ; trame : même envoi en trame binaire (core.trames)."
+            ),
+        )
+        parser.add_argument('--jeton', default='', help="GPS_TRACKER_TOKEN du serveur, pour le mode bus.")
+        parser.add_argument('--duree', type=float, default=30.0, help="Durée du test en secondes.")
+        parser.add_argument(
+            '--attente', type=float, default=0.0,
+            help=(
+                "Secondes d'attente après le test avant la dernière mesure, pour compter les écritures "
+                "différées (TRANSPORT_FLUSH_INTERVAL, TRACE_FLUSH_INTERVAL du serveur)."
+            ),
+        )
+        parser.add_argument('--threads', type=int, default=32, help="Connexions HTTP simultanées.")
+        parser.add_argument('--graine', type=int, default=0)
+        parser.add_argument('--output', help="Fichier JSON de sortie (sinon sortie standard).")
+
+    def handle(self, *args, **options):
+        cible = urlsplit(options['url'])
+        if cible.scheme != 'http' or not cible.hostname:
+            raise CommandError("--url doit être une adresse http://hôte:port")
+        self.hote, self.port = cible.hostname, cible.port or 80
+        rnd = random.Random(options['graine'])
+        prefixe = options['prefixe']
+
+        admin = User.objects.filter(username=f'{prefixe}_admin').first()
+        if admin is None:
+            raise CommandError(f"Compte {prefixe}_admin introuvable : lancez d'abord generate_school.")
+
+        sessions = []
+        acteurs = self._bus(options, rnd) + self._parents(options, sessions)
+        if not acteurs:
+            raise CommandError("Aucun bus ni parent à simuler.")
+        cookie_admin = self._session(admin, sessions)
+
+        try:
+            avant = self._metriques(cookie_admin)
+            resultats, duree = self._executer(acteurs, options['duree'], options['threads'])
+            time.sleep(options['attente'])
+            apres = self._metriques(cookie_admin)
+        finally:
+            engine = import_module(settings.SESSION_ENGINE)
+            for cle in sessions:
+                engine.SessionStore(session_key=cle).delete()
+
+        rapport = {
+            'date': timezone.now().isoformat(),
+            'url': options['url'],
+            'mode': options['mode'],
+            'bus': options['bus'],
+            'parents': options['parents'],
+            'duree_s': round(duree, 2),
+            'scenarios': [],
+        }
+        for role, latences in sorted(resultats.latences.items()):
+            statuts = resultats.statuts[role]
+            erreurs = sum(n for statut, n in statuts.items() if not (200 <= statut < 300))
+            rapport['scenarios'].append({
+                'role': role,
+                'requetes': len(latences),
+                'debit_rps': round(len(latences) / duree, 1),
+                'p50_ms': round(_percentile(latences, 50), 2),
+                'p95_ms': round(_percentile(latences, 95), 2),
+                'p99_ms': round(_percentile(latences, 99), 2),
+                'moyenne_ms': round(statistics.fmean(latences), 2),
+                'taux_erreur': round(erreurs / len(latences), 4),
+                'statuts': {str(statut): n for statut, n in sorted(statuts.items())},
+            })
+            self.stderr.write(
+                f"{role:<8} {len(latences) / duree:>8.1f} req/s  p50={rapport['scenarios'][-1]['p50_ms']} ms  "
+                f"p95={rapport['scenarios'][-1]['p95_ms']} ms  erreurs={erreurs}"
+            )
+
+        if avant is None or apres is None:
+            rapport['sql_par_vue'] = rapport['ecritures_tables'] = None
+            rapport['avertissement'] = "/metrics/ inaccessible : requêtes SQL et écritures non mesurées."
+            self.stderr.write(rapport['avertissement'])
+        else:
+            sql_avant = _series(avant, 'core_view_sql_queries', 'view')
+            sql_apres = _series(apres, 'core_view_sql_queries', 'view')
+            rapport['sql_par_vue'] = {}
+            for vue in VUES_SUIVIES:
+                requetes = sql_apres.get((vue, '_sum'), 0) - sql_avant.get((vue, '_sum'), 0)
+                appels = sql_apres.get((vue, '_count'), 0) - sql_avant.get((vue, '_count'), 0)
+                if appels:
+                    rapport['sql_par_vue'][vue] = {
+                        'requetes_sql': int(requetes),
+                        'par_appel': round(requetes / appels, 2),
+                    }
+            # Écritures pendant le test, requêtes HTTP et vidages différés compris, pour le processus
+            # serveur interrogé (un worker parmi d'autres sous gunicorn)
+            rapport['ecritures_tables'] = {}
+            for nom, champ in (('core_sql_writes_total', 'instructions'), ('core_sql_rows_written_total', 'lignes')):
+                valeurs_avant, valeurs_apres = _series(avant, nom, 'table'), _series(apres, nom, 'table')
+                for (table, operation), valeur in sorted(valeurs_apres.items()):
+                    ecart = int(valeur - valeurs_avant.get((table, operation), 0))
+                    if ecart:
+                        rapport['ecritures_tables'].setdefault(table, {}).setdefault(operation, {})[champ] = ecart
+
+        contenu = json.dumps(rapport, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fichier:
+                fichier.write(contenu + '\n')
+        else:
+            self.stdout.write(contenu)
+
+    # Acteurs
+
+    def _bus(self, options, rnd):
+        numeros = list(
+            Transport.objects.filter(numero_bus__startswith=f'{options["prefixe"].upper()}-')
+            .values_list('numero_bus', flat=True).distinct().order_by('numero_bus')[:options['bus']]
+        )
+        if len(numeros) < options['bus']:
+            self.stderr.write(f"Seulement {len(numeros)} bus disponibles pour le préfixe {options['prefixe']}.")
+        un_eleve = dict(
+            Transport.objects.filter(numero_bus__in=numeros).order_by('numero_bus', 'eleve_id')
+            .values_list('numero_bus', 'eleve_id')
+        )
+        chemin_eleve = reverse('transport_update_position')
+        chemin_bus = reverse('transport_positions_bus')
+        ids_bus = dict(Bus.objects.filter(numero_bus__in=numeros).values_list('numero_bus', 'id'))
+        entetes = {'Content-Type': 'application/json'}
+        entetes_trame = {'Content-Type': 'application/octet-stream'}
+        if options['jeton']:
+            entetes['Authorization'] = entetes_trame['Authorization'] = f"Bearer {options['jeton']}"
+
+        acteurs = []
+        for numero in numeros:
+            position = [33.5731 + rnd.uniform(-0.05, 0.05), -7.5898 + rnd.uniform(-0.05, 0.05)]
+
+            def construire(numero=numero, position=position, eleve_id=un_eleve.get(numero)):
+                # Marche aléatoire d'environ 20 m par ping
+                position[0] += rnd.uniform(-0.0002, 0.0002)
+                position[1] += rnd.uniform(-0.0002, 0.0002)
+                if options['mode'] == 'trame':
+                    trame = ENREGISTREMENT.pack(ids_bus[numero], int(time.time()), position[0], position[1])
+                    return 'POST', chemin_bus, trame, entetes_trame
+                if options['mode'] == 'bus':
+                    corps = {'positions': [{'numero_bus': numero, 'latitude': position[0], 'longitude': position[1]}]}
+                    return 'POST', chemin_bus, json.dumps(corps), entetes
+                corps = {'eleve_id': eleve_id, 'latitude': position[0], 'longitude': position[1]}
+                return 'POST', chemin_eleve, json.dumps(corps), entetes
+
+            acteurs.append(_Acteur('bus', options['intervalle_bus'], construire))
+        return acteurs
+
+    def _parents(self, options, sessions):
+        eleves = list(
+            Eleve.objects.filter(parent_user__username__startswith=f"{options['prefixe']}_parent_", transport__isnull=False)
+            .select_related('parent_user').order_by('id')[:options['parents']]
+        )
+        if len(eleves) < options['parents']:
+            self.stderr.write(f"Seulement {len(eleves)} parents disponibles pour le préfixe {options['prefixe']}.")
+        acteurs = []
+        for eleve in eleves:
+            entetes = {'Cookie': f'{settings.SESSION_COOKIE_NAME}={self._session(eleve.parent_user, sessions)}'}
+            chemin = reverse('transport_position_parent', args=[eleve.id])
+            acteurs.append(_Acteur(
+                'parent', options['intervalle_parents'],
+                lambda chemin=chemin, entetes=entetes: ('GET', chemin, None, entetes),
+            ))
+        return acteurs
+
+    def _session(self, user, sessions):
+        # Session ouverte directement en base, comme Client.force_login
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        sessions.append(session.session_key)
+        return session.session_key
+
+    # Exécution
+
+    def _executer(self, acteurs, duree, nb_threads):
+        resultats = _Resultats()
+        verrou = threading.Lock()
+        debut = time.monotonic()
+        fin = debut + duree
+        # Premiers envois étalés sur un intervalle, pour ne pas démarrer en rafale
+        file = [(debut + random.uniform(0, a.intervalle), i, a) for i, a in enumerate(acteurs)]
+        heapq.heapify(file)
+
+        def travailleur():
+            connexion = None
+            while True:
+                with verrou:
+                    echeance, i, acteur = heapq.heappop(file)
+                attente = echeance - time.monotonic()
+                if echeance >= fin:
+                    with verrou:
+                        heapq.heappush(file, (echeance, i, acteur))
+                    break
+                if attente > 0:
+                    time.sleep(attente)
+
+                methode, chemin, corps, entetes = acteur.construire()
+                t0 = time.perf_counter()
+                try:
+                    if connexion is None:
+                        connexion = http.client.HTTPConnection(self.hote, self.port, timeout=30)
+                    connexion.request(methode, chemin, body=corps, headers=entetes)
+                    reponse = connexion.getresponse()
+                    reponse.read()
+                    statut = reponse.status
+                    if reponse.getheader('Connection', '').lower() == 'close':
+                        connexion.close()
+                        connexion = None
+                except (OSError, http.client.HTTPException):
+                    statut = 0  # erreur réseau
+                    if connexion is not None:
+                        connexion.close()
+                    connexion = None
+                resultats.enregistrer(acteur.role, (time.perf_counter() - t0) * 1000, statut)
+
+                with verrou:
+                    # Si le serveur prend du retard, on ne rattrape pas en rafale
+                    heapq.heappush(file, (max(echeance + acteur.intervalle, time.monotonic()), i, acteur))
+            if connexion is not None:
+                connexion.close()
+
+        threads = [threading.Thread(target=travailleur) for _ in range(min(nb_threads, len(acteurs)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return resultats, time.monotonic() - debut
+
+    # Mesures côté serveur
+
+    def _metriques(self, cookie):
+        """Texte de /metrics/ (format Prometheus), ou None si indisponible."""
+        try:
+            connexion = http.client.HTTPConnection(self.hote, self.port, timeout=10)
+            connexion.request('GET', reverse('metriques'), headers={'Cookie': f'{settings.SESSION_COOKIE_NAME}={cookie}'})
+            reponse = connexion.getresponse()
+            texte = reponse.read().decode('utf-8')
+            connexion.close()
+        except (OSError, http.client.HTTPException):
+            return None
+        return texte if reponse.status == 200 else None
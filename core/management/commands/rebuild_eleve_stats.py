@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Eleve
+from core.stats import recalculer_stats, reconstruire_stats
+
+
+class Command(BaseCommand):
+    help = "Reconstruit la table EleveStats à partir des notes, quiz, absences et badges."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--eleve', type=int, help="Ne recalculer que cet élève (id).")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        eleve_id = options.get('eleve')
+        if eleve_id:
+            if not Eleve.objects.filter(id=eleve_id).exists():
+                raise CommandError(f"Élève introuvable : {eleve_id}")
+            recalculer_stats(eleve_id)
+            self.stdout.write(self.style.SUCCESS(f"Statistiques recalculées pour l'élève {eleve_id}."))
+            return
+
+        total = reconstruire_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{total} lignes EleveStats reconstruites."))
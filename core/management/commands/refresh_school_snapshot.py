@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.snapshot import rafraichir_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule l'instantané de l'école utilisé par dashboard_admin. "
+        "Avec --interval, tourne en boucle (service snapshot) ; l'intervalle doit rester "
+        "inférieur à SCHOOL_SNAPSHOT_TTL et le cache être partagé avec les serveurs web (CACHE_URL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Secondes entre deux rafraîchissements (0 = une seule fois).",
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        if interval > 0 and not settings.CACHE_URL:
+            self.stderr.write(self.style.WARNING(
+                "CACHE_URL n'est pas défini : l'instantané reste dans le cache local de ce processus "
+                "et les serveurs web ne le verront pas."
+            ))
+        while True:
+            close_old_connections()
+            snapshot = rafraichir_snapshot()
+            self.stdout.write(
+                f"Instantané rafraîchi ({snapshot['nb_eleves']} élèves, {snapshot['generated_at']})."
+            )
+            if interval <= 0:
+                return
+            time.sleep(interval)
@@ -0,0 +1,42 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.taches import traiter_lot
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la file des notifications (TacheNotification) : réserve les tâches dues par lots, "
+        "les envoie et reprogramme les échecs avec un délai croissant. Plusieurs workers peuvent "
+        "tourner en parallèle sur PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, default=50, help="Tâches réservées à la fois.")
+        parser.add_argument('--intervalle', type=float, default=1.0, help="Attente (secondes) quand la file est vide.")
+        parser.add_argument('--une-fois', action='store_true', help="Vide la file puis s'arrête.")
+
+    def handle(self, *args, **options):
+        self.arret = False
+        signal.signal(signal.SIGTERM, self._arreter)
+        signal.signal(signal.SIGINT, self._arreter)
+
+        total = 0
+        while not self.arret:
+            close_old_connections()
+            traitees = traiter_lot(options['lot'])
+            total += traitees
+            if traitees:
+                self.stdout.write(f"{traitees} notification(s) traitée(s)")
+            elif options['une_fois']:
+                break
+            else:
+                time.sleep(options['intervalle'])
+        self.stdout.write(self.style.SUCCESS(f"Arrêt du worker : {total} notification(s) traitée(s)."))
+
+    def _arreter(self, signum, frame):
+        # Le lot en cours est terminé avant l'arrêt
+        self.arret = True
@@ -0,0 +1,182 @@
+# core/metrics.py
+#
+# Instrumentation par vue : latence, nombre de requêtes SQL et temps SQL,
+# agrégés en mémoire du processus sous forme d'histogrammes Prometheus et
+# exposés au format texte par la vue `metriques` (/metrics/). Les écritures
+# (INSERT, UPDATE, DELETE) sont aussi comptées par table, y compris hors des
+# requêtes HTTP (vidages différés des positions et des traces).
+#
+# Le middleware est hybride (sync et async) : sous ASGI, la requête en cours
+# est suivie par une ContextVar, que sync_to_async propage aux threads où
+# s'exécutent les vues synchrones et leurs requêtes SQL.
+
+import contextvars
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+BUCKETS_SECONDES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_REQUETES = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+METRIQUES = (
+    ('core_view_latency_seconds', "Durée de traitement de la requête par vue.", BUCKETS_SECONDES),
+    ('core_view_sql_queries', "Nombre de requêtes SQL par requête HTTP, par vue.", BUCKETS_REQUETES),
+    ('core_view_sql_seconds', "Temps passé en SQL par requête HTTP, par vue.", BUCKETS_SECONDES),
+)
+COMPTEURS_ECRITURE = (
+    ('core_sql_writes_total', "Instructions SQL d'écriture, par table et opération."),
+    ('core_sql_rows_written_total', "Lignes insérées, modifiées ou supprimées, par table et opération."),
+)
+
+# INSERT INTO, INSERT OR IGNORE INTO (SQLite), UPDATE, DELETE FROM
+_ECRITURE = re.compile(r'\s*(INSERT|UPDATE|DELETE)\b(?:\s+OR\s+\w+)?(?:\s+INTO|\s+FROM)?\s+"?([\w.]+)', re.IGNORECASE)
+
+
+class Histogramme:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.compteurs = [0] * (len(buckets) + 1)  # dernier : +Inf
+        self.somme = 0.0
+        self.total = 0
+
+    def observer(self, valeur):
+        self.compteurs[bisect_left(self.buckets, valeur)] += 1
+        self.somme += valeur
+        self.total += 1
+
+
+class Registre:
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._series = {nom: {} for nom, _, _ in METRIQUES}
+        # {(table, opération): [instructions, lignes]}
+        self._ecritures = {}
+
+    def enregistrer(self, vue, latence, nb_requetes, temps_sql):
+        with self._verrou:
+            for (nom, _, buckets), valeur in zip(METRIQUES, (latence, nb_requetes, temps_sql)):
+                histo = self._series[nom].get(vue)
+                if histo is None:
+                    histo = self._series[nom][vue] = Histogramme(buckets)
+                histo.observer(valeur)
+
+    def compter_ecriture(self, table, operation, lignes):
+        with self._verrou:
+            compte = self._ecritures.setdefault((table, operation), [0, 0])
+            compte[0] += 1
+            compte[1] += lignes
+
+    def exporter(self):
+        """Format texte d'exposition Prometheus (version 0.0.4)."""
+        lignes = []
+        with self._verrou:
+            for nom, aide, buckets in METRIQUES:
+                lignes.append(f'# HELP {nom} {aide}')
+                lignes.append(f'# TYPE {nom} histogram')
+                for vue, histo in sorted(self._series[nom].items()):
+                    cumul = 0
+                    for borne, compte in zip((*buckets, '+Inf'), histo.compteurs):
+                        cumul += compte
+                        lignes.append(f'{nom}_bucket{{view="{vue}",le="{borne}"}} {cumul}')
+                    lignes.append(f'{nom}_sum{{view="{vue}"}} {histo.somme}')
+                    lignes.append(f'{nom}_count{{view="{vue}"}} {histo.total}')
+            for i, (nom, aide) in enumerate(COMPTEURS_ECRITURE):
+                lignes.append(f'# HELP {nom} {aide}')
+                lignes.append(f'# TYPE {nom} counter')
+                for (table, operation), compte in sorted(self._ecritures.items()):
+                    lignes.append(f'{nom}{{table="{table}",operation="{operation}"}} {compte[i]}')
+        return '\n'.join(lignes) + '\n'
+
+
+registre = Registre()
+
+
+class _CompteurSQL:
+    def __init__(self):
+        self.nombre = 0
+        self.duree = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duree += time.perf_counter() - debut
+            self.nombre += 1
+
+
+_compteur_courant = contextvars.ContextVar('core_compteur_sql', default=None)
+
+
+def _lignes_ecrites(sql, cursor):
+    if 'RETURNING' in sql:
+        # rowcount n'est connu qu'après lecture des lignes renvoyées : une par groupe VALUES
+        return sql.count('), (') + 1
+    return max(cursor.rowcount, 0)
+
+
+def _compter_sql(execute, sql, params, many, context):
+    compteur = _compteur_courant.get()
+    if compteur is None:
+        resultat = execute(sql, params, many, context)
+    else:
+        resultat = compteur(execute, sql, params, many, context)
+    ecriture = _ECRITURE.match(sql)
+    if ecriture is not None:
+        registre.compter_ecriture(ecriture[2], ecriture[1].lower(), _lignes_ecrites(sql, context['cursor']))
+    return resultat
+
+
+def _installer_compteur(sender, connection, **kwargs):
+    # Posé une fois par connexion, dans le thread qui l'ouvre ; sans requête suivie, il ne compte que les écritures
+    if _compter_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_compter_sql)
+
+
+connection_created.connect(_installer_compteur, dispatch_uid='metrics_compteur_sql')
+
+
+class MetriquesMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Connexion ouverte avant le chargement du middleware (commande, tests)
+        _installer_compteur(None, connection)
+        compteur = _CompteurSQL()
+        jeton = _compteur_courant.set(compteur)
+        debut = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _compteur_courant.reset(jeton)
+        self._enregistrer(request, time.perf_counter() - debut, compteur)
+        return response
+
+    async def __acall__(self, request):
+        compteur = _CompteurSQL()
+        jeton = _compteur_courant.set(compteur)
+        debut = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _compteur_courant.reset(jeton)
+        self._enregistrer(request, time.perf_counter() - debut, compteur)
+        return response
+
+    def _enregistrer(self, request, latence, compteur):
+        match = getattr(request, 'resolver_match', None)
+        vue = (match.view_name if match else None) or '<unresolved>'
+        registre.enregistrer(vue, latence, compteur.nombre, compteur.duree)
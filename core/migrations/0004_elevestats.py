@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EleveStats',
+            fields=[
+                ('eleve', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.eleve')),
+                ('somme_notes', models.FloatField(default=0)),
+                ('nb_notes', models.PositiveIntegerField(default=0)),
+                ('somme_quiz', models.FloatField(default=0)),
+                ('nb_quiz', models.PositiveIntegerField(default=0)),
+                ('nb_quiz_notes', models.PositiveIntegerField(default=0)),
+                ('nb_absences', models.PositiveIntegerField(default=0)),
+                ('nb_badges', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
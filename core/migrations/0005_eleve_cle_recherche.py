@@ -0,0 +1,57 @@
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+def _normaliser(texte):
+    texte = unicodedata.normalize('NFKD', texte or '')
+    texte = ''.join(c for c in texte if not unicodedata.combining(c)).lower()
+    return ' '.join(re.split(r'[^0-9a-z]+', texte)).strip()
+
+
+def remplir_cle_recherche(apps, schema_editor):
+    Eleve = apps.get_model('core', 'Eleve')
+    lot = []
+    for eleve in Eleve.objects.only('id', 'nom', 'prenom').iterator(chunk_size=1000):
+        eleve.cle_recherche = _normaliser(f"{eleve.nom} {eleve.prenom}")
+        lot.append(eleve)
+        if len(lot) >= 1000:
+            Eleve.objects.bulk_update(lot, ['cle_recherche'])
+            lot = []
+    if lot:
+        Eleve.objects.bulk_update(lot, ['cle_recherche'])
+
+
+def creer_index_trigramme(apps, schema_editor):
+    # Index GIN trigramme pour les recherches "contient" : PostgreSQL uniquement
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS core_eleve_cle_recherche_trgm "
+        "ON core_eleve USING gin (cle_recherche gin_trgm_ops)"
+    )
+
+
+def supprimer_index_trigramme(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS core_eleve_cle_recherche_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_elevestats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eleve',
+            name='cle_recherche',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=201),
+        ),
+        migrations.RunPython(remplir_cle_recherche, migrations.RunPython.noop),
+        migrations.RunPython(creer_index_trigramme, supprimer_index_trigramme),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_eleve_cle_recherche'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='absence',
+            index=models.Index(fields=['eleve', 'justifiee', 'date'], name='absence_eleve_just_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='absence',
+            index=models.Index(fields=['date'], name='absence_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='badge',
+            index=models.Index(fields=['eleve', 'cours', 'titre'], name='badge_eleve_cours_titre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['eleve', 'date'], name='note_eleve_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['enseignant', 'date'], name='note_enseignant_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at'], name='notif_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['created_at'], name='notif_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='soumissionquiz',
+            index=models.Index(fields=['eleve', 'quiz'], name='soumission_eleve_quiz_idx'),
+        ),
+    ]
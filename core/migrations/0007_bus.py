@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+
+def creer_bus(apps, schema_editor):
+    # Un Bus par numero_bus existant, avec la position d'un de ses élèves si elle est connue
+    Bus = apps.get_model('core', 'Bus')
+    Transport = apps.get_model('core', 'Transport')
+    positions = {}
+    transports = (
+        Transport.objects.exclude(numero_bus__isnull=True).exclude(numero_bus='')
+        .values_list('numero_bus', 'latitude', 'longitude')
+    )
+    for numero_bus, latitude, longitude in transports.iterator(chunk_size=2000):
+        if positions.get(numero_bus, (None,))[0] is None:
+            positions[numero_bus] = (latitude, longitude)
+    Bus.objects.bulk_create(
+        [Bus(numero_bus=numero, latitude=lat, longitude=lon) for numero, (lat, lon) in positions.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero_bus', models.CharField(max_length=50, unique=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('position_updated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'bus',
+            },
+        ),
+        migrations.AlterField(
+            model_name='transport',
+            name='numero_bus',
+            field=models.CharField(blank=True, db_index=True, max_length=50, null=True),
+        ),
+        migrations.RunPython(creer_bus, migrations.RunPython.noop),
+    ]
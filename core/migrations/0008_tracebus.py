@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_bus'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TraceBus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jour', models.DateField()),
+                ('points', models.BinaryField(default=b'')),
+                ('nb_points', models.PositiveIntegerField(default=0)),
+                ('bus', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='traces', to='core.bus')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('bus', 'jour'), name='unique_trace_bus_jour')],
+            },
+        ),
+    ]
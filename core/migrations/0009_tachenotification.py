@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_tracebus'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TacheNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('canal', models.CharField(choices=[('sms', 'SMS'), ('email', 'Email'), ('app', 'Application')], max_length=10)),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('envoyee', 'Envoyée'), ('ignoree', 'Ignorée'), ('echouee', 'Échouée')], default='en_attente', max_length=10)),
+                ('tentatives', models.PositiveSmallIntegerField(default=0)),
+                ('prochain_essai', models.DateTimeField(default=django.utils.timezone.now)),
+                ('reservee_jusqua', models.DateTimeField(blank=True, null=True)),
+                ('derniere_erreur', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('traitee_a', models.DateTimeField(blank=True, null=True)),
+                ('eleve', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='taches_notification', to='core.eleve')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['statut', 'prochain_essai'], name='tache_notif_file_idx')],
+            },
+        ),
+    ]
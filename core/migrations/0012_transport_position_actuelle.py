@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_notification_regroupement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transport',
+            name='latitude_actuelle',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='transport',
+            name='longitude_actuelle',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_transport_position_actuelle'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tachenotification',
+            name='numero_bus',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='tachenotification',
+            name='canal',
+            field=models.CharField(choices=[('sms', 'SMS'), ('email', 'Email'), ('app', 'Application'), ('depart_bus', 'Départ du bus')], max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='tachenotification',
+            name='eleve',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='taches_notification', to='core.eleve'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_tache_notification_bus'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tachenotification',
+            name='message',
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -1,3 +1,6 @@
+import re
+import unicodedata
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -12,6 +15,14 @@ CLASSES = [
     ('CE6', 'CE6'),
 ]
 
+
+def normaliser_texte(texte):
+    # Minuscules, sans accents ni ponctuation : "Élodie D'Arc" -> "elodie d arc"
+    texte = unicodedata.normalize('NFKD', texte or '')
+    texte = ''.join(c for c in texte if not unicodedata.combining(c)).lower()
+    return ' '.join(re.split(r'[^0-9a-z]+', texte)).strip()
+
+
 class Enseignant(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     specialite = models.CharField(max_length=100)
@@ -28,10 +39,19 @@ class Eleve(models.Model):
     parent_user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='enfants')
     enseignants = models.ManyToManyField(Enseignant, blank=True, related_name='eleves')
     email_parent = models.EmailField(null=True, blank=True)
+    # "nom prenom" normalisé, indexé pour la recherche par préfixe (voir core.search)
+    cle_recherche = models.CharField(max_length=201, blank=True, default='', db_index=True, editable=False)
 
     def __str__(self):
         return f"{self.prenom} {self.nom} ({self.classe})"
 
+    def save(self, *args, **kwargs):
+        self.cle_recherche = normaliser_texte(f"{self.nom} {self.prenom}")
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'nom', 'prenom'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'cle_recherche'}
+        super().save(*args, **kwargs)
+
 class Parent(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
     nom = models.CharField(max_length=100)
@@ -48,6 +68,12 @@ class Absence(models.Model):
     motif = models.TextField(blank=True)
     justifiee = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['eleve', 'justifiee', 'date'], name='absence_eleve_just_date_idx'),
+            models.Index(fields=['date'], name='absence_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.eleve} - {self.date} - {'Justifiée' if self.justifiee else 'Non justifiée'}"
 
@@ -58,9 +84,28 @@ class Note(models.Model):
     date = models.DateField()
     enseignant = models.ForeignKey(Enseignant, null=True, blank=True, on_delete=models.CASCADE, related_name='notes')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['eleve', 'date'], name='note_eleve_date_idx'),
+            models.Index(fields=['enseignant', 'date'], name='note_enseignant_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.eleve} - {self.matiere}: {self.note}"
 
+class Bus(models.Model):
+    # Une seule position par bus, partagée par les élèves dont Transport.numero_bus correspond
+    numero_bus = models.CharField(max_length=50, unique=True)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    position_updated_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name_plural = 'bus'
+
+    def __str__(self):
+        return self.numero_bus
+
 class Transport(models.Model):
     MOYENS_TRANSPORT = [
         ('Bus', 'Bus'),
@@ -73,9 +118,13 @@ class Transport(models.Model):
     eleve = models.OneToOneField(Eleve, on_delete=models.CASCADE)
     moyen = models.CharField(max_length=50, choices=MOYENS_TRANSPORT, default='Bus')
     chauffeur = models.CharField(max_length=100, blank=True, null=True)
-    numero_bus = models.CharField(max_length=50, blank=True, null=True)
+    numero_bus = models.CharField(max_length=50, blank=True, null=True, db_index=True)
+    # Emplacement de l'élève (arrêt du bus), saisi sur la carte
     latitude = models.FloatField(blank=True, null=True)
     longitude = models.FloatField(blank=True, null=True)
+    # Dernière position GPS envoyée pour l'élève lui-même (transport_update_position)
+    latitude_actuelle = models.FloatField(blank=True, null=True)
+    longitude_actuelle = models.FloatField(blank=True, null=True)
 
     def __str__(self):
         return f"{self.eleve.nom} - {self.moyen}"
@@ -158,12 +207,22 @@ class SoumissionQuiz(models.Model):
     score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['eleve', 'quiz'], name='soumission_eleve_quiz_idx'),
+        ]
+
 class Badge(models.Model):
     eleve = models.ForeignKey(Eleve, on_delete=models.CASCADE)
     cours = models.ForeignKey(Cours, on_delete=models.CASCADE)
     titre = models.CharField(max_length=100)
     date_attribue = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['eleve', 'cours', 'titre'], name='badge_eleve_cours_titre_idx'),
+        ]
+
 class Probleme(models.Model):
     question = models.TextField()
     image = models.ImageField(upload_to='problemes/', blank=True, null=True)
@@ -199,6 +258,102 @@ class Notification(models.Model):
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
+    # Type d'événement (ex. 'bus_arrive') : les répétitions rapprochées d'un même type
+    # pour un même élève sont comptées ici au lieu d'être renvoyées (core.regroupement)
+    type_notification = models.CharField(max_length=30, blank=True, default='')
+    occurrences = models.PositiveIntegerField(default=1)
+    derniere_occurrence = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='notif_user_created_idx'),
+            models.Index(fields=['user', 'is_read'], name='notif_user_lu_idx'),
+            models.Index(fields=['created_at'], name='notif_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.titre}"
+
+
+class TacheNotification(models.Model):
+    # File d'envoi des notifications aux parents, traitée par `manage.py worker_notifications`
+    # (voir core.taches) : les vues ne font qu'insérer une ligne par canal.
+    CANAUX = [
+        ('sms', 'SMS'),
+        ('email', 'Email'),
+        ('app', 'Application'),
+        ('depart_bus', 'Départ du bus'),
+    ]
+    STATUTS = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('envoyee', 'Envoyée'),
+        ('ignoree', 'Ignorée'),
+        ('echouee', 'Échouée'),
+    ]
+    eleve = models.ForeignKey(Eleve, on_delete=models.CASCADE, related_name='taches_notification', null=True, blank=True)
+    # Tâches d'un bus entier (départ) : un seul envoi groupé aux parents de ses élèves
+    numero_bus = models.CharField(max_length=50, blank=True)
+    canal = models.CharField(max_length=10, choices=CANAUX)
+    # SMS déjà composé (envoi groupé refusé par la passerelle) ; vide : texte par défaut du canal
+    message = models.TextField(blank=True)
+    statut = models.CharField(max_length=10, choices=STATUTS, default='en_attente')
+    tentatives = models.PositiveSmallIntegerField(default=0)
+    prochain_essai = models.DateTimeField(default=timezone.now)
+    # Réservée par un worker jusqu'à cette date ; au-delà, un autre peut la reprendre
+    reservee_jusqua = models.DateTimeField(null=True, blank=True)
+    derniere_erreur = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    traitee_a = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['statut', 'prochain_essai'], name='tache_notif_file_idx'),
+        ]
+
+    def __str__(self):
+        if self.numero_bus:
+            return f"{self.canal} bus={self.numero_bus} ({self.statut})"
+        return f"{self.canal} élève={self.eleve_id} ({self.statut})"
+
+
+class EleveStats(models.Model):
+    # Statistiques dénormalisées, tenues à jour par core.stats à chaque écriture
+    eleve = models.OneToOneField(Eleve, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    somme_notes = models.FloatField(default=0)
+    nb_notes = models.PositiveIntegerField(default=0)
+    somme_quiz = models.FloatField(default=0)
+    nb_quiz = models.PositiveIntegerField(default=0)
+    nb_quiz_notes = models.PositiveIntegerField(default=0)
+    nb_absences = models.PositiveIntegerField(default=0)
+    nb_badges = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats {self.eleve_id}"
+
+    @property
+    def moyenne_notes(self):
+        return self.somme_notes / self.nb_notes if self.nb_notes else 0
+
+    @property
+    def moyenne_quiz(self):
+        return self.somme_quiz / self.nb_quiz_notes if self.nb_quiz_notes else 0
+
+
+class TraceBus(models.Model):
+    # Historique des positions d'un bus sur une journée, en ajout seul. `points` est
+    # une suite d'enregistrements de 12 octets : latitude et longitude en float32,
+    # horodatage Unix en uint32, petit-boutiste (voir core.traces).
+    bus = models.ForeignKey(Bus, on_delete=models.CASCADE, related_name='traces')
+    jour = models.DateField()
+    points = models.BinaryField(default=b'')
+    nb_points = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bus', 'jour'], name='unique_trace_bus_jour'),
+        ]
+
+    def __str__(self):
+        return f"{self.bus} {self.jour} ({self.nb_points} points)"
@@ -1,42 +1,26 @@
 import logging
-import os
 
-from django.core.mail import send_mail
+from django.conf import settings
+from django.core.mail import get_connection, send_mail, send_mass_mail
 
-from core.models import Parent, Notification  # Assure-toi que le modèle Parent est bien importé
+from core.boite import invalider_non_lues
+from core.models import Eleve, Parent, Notification, TacheNotification  # Assure-toi que le modèle Parent est bien importé
+from core.sms import envoyer_sms, envoyer_sms_groupe
 
 logger = logging.getLogger(__name__)
 
-def notifier_parent_par_sms(eleve):
+def notifier_parent_par_sms(eleve, texte=None):
     # Récupérer l’objet Parent via l'user lié
     parent = Parent.objects.filter(user=eleve.parent_user).first()
     if not parent:
         logger.warning("Aucun parent trouvé pour l'élève id=%s.", eleve.id)
         return False
 
-    account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-    from_number = os.getenv("TWILIO_FROM_NUMBER")
+    # Numéro du parent depuis le modèle Parent ; passerelle choisie par SMS_BACKEND.
+    # `texte` : SMS d'un envoi groupé à renvoyer (TacheNotification.message)
+    return envoyer_sms(parent.telephone, texte or f"🚍 Le bus approche de l'arrêt de {eleve.prenom}.")
 
-    if not account_sid or not auth_token or not from_number:
-        logger.warning("Twilio non configure (variables d'environnement manquantes).")
-        return False
-    try:
-        from twilio.rest import Client
-    except Exception:  # ImportError or runtime issue with twilio
-        logger.warning("Twilio n'est pas installé, SMS ignoré.")
-        return False
-
-    client = Client(account_sid, auth_token)
-
-    client.messages.create(
-        body=f"🚍 Le bus approche de l'arrêt de {eleve.prenom}.",
-        from_=from_number,
-        to=parent.telephone      # Numéro du parent depuis le modèle Parent
-    )
-    return True
-
-def notifier_parent_par_email(eleve):
+def notifier_parent_par_email(eleve, texte=None):
     parent = Parent.objects.filter(user=eleve.parent_user).first()
     if not parent:
         logger.warning("Aucun parent trouvé pour l'élève id=%s.", eleve.id)
@@ -49,12 +33,13 @@ def notifier_parent_par_email(eleve):
         return False
 
     subject = "🚌 Notification Transport Scolaire"
-    message = f"Bonjour {parent.nom},\n\nLe bus approche de l'arrêt de {eleve.prenom}."
+    # `texte` : corps d'un email d'envoi groupé à renvoyer (TacheNotification.message)
+    message = texte or f"Bonjour {parent.nom},\n\nLe bus approche de l'arrêt de {eleve.prenom}."
     
     send_mail(
         subject,
         message,
-        'smounat88@gmail.com',  # from_email dans settings.py
+        settings.DEFAULT_FROM_EMAIL,
         [email],
         fail_silently=False,
     )
@@ -74,3 +59,89 @@ def notifier_parent_par_app(eleve):
         message=f"Le transport est arrivé chez {eleve.prenom} {eleve.nom}.",
     )
     return True
+
+
+def eleves_cibles(numero_bus=None, classe=None):
+    """Élèves d'un bus ou d'une classe, avec leur compte parent."""
+    eleves = Eleve.objects.select_related('parent_user')
+    if numero_bus:
+        eleves = eleves.filter(transport__numero_bus=numero_bus)
+    if classe:
+        eleves = eleves.filter(classe=classe)
+    return eleves
+
+
+def _personnaliser(texte, eleve):
+    # {prenom} et {nom} désignent l'élève ; le reste du texte est laissé tel quel
+    return texte.replace('{prenom}', eleve.prenom).replace('{nom}', eleve.nom)
+
+
+def notifier_parents(eleves, titre, message, sms=False):
+    """Notifie les parents d'un groupe d'élèves (application, email et, si demandé, SMS).
+
+    Une requête pour les parents, un INSERT groupé pour les notifications, une
+    seule connexion SMTP pour tous les emails et un seul appel au backend SMS,
+    quelle que soit la taille du groupe. Les SMS refusés par la passerelle sont mis
+    en file un par un (core.taches), sans renvoyer ceux déjà partis ; si le serveur
+    SMTP échoue, les emails du groupe sont mis en file de la même façon.
+    Retourne {'notifications', 'emails', 'emails_en_file', 'sms', 'sms_en_file'}.
+    """
+    eleves = [eleve for eleve in eleves if eleve.parent_user_id]
+    # Par compte parent, comme les fonctions par élève : Parent.eleve ne désigne qu'un
+    # seul des enfants d'une fratrie
+    parents = {
+        p.user_id: p
+        for p in Parent.objects.filter(user_id__in={eleve.parent_user_id for eleve in eleves})
+        .only('user_id', 'nom', 'email', 'telephone')
+    }
+    notifications = Notification.objects.bulk_create([
+        Notification(user_id=eleve.parent_user_id, eleve=eleve, titre=titre, message=_personnaliser(message, eleve))
+        for eleve in eleves
+    ], batch_size=500)
+    invalider_non_lues(eleve.parent_user_id for eleve in eleves)
+
+    destinataires_email = [
+        eleve for eleve in eleves if eleve.parent_user_id in parents and parents[eleve.parent_user_id].email
+    ]
+    emails = [
+        (
+            titre,
+            f"Bonjour {parents[eleve.parent_user_id].nom},\n\n{_personnaliser(message, eleve)}",
+            settings.DEFAULT_FROM_EMAIL,
+            [parents[eleve.parent_user_id].email],
+        )
+        for eleve in destinataires_email
+    ]
+    emails_en_file = 0
+    if emails:
+        try:
+            with get_connection(fail_silently=False) as connexion:
+                send_mass_mail(emails, connection=connexion)
+        except OSError as exc:  # smtplib.SMTPException, connexion refusée, délai dépassé
+            # Les notifications sont déjà en base : le worker renverra les emails, et les SMS partent quand même
+            logger.warning("Envoi groupé de %s email(s) en échec, mis en file : %s", len(emails), exc)
+            emails_en_file = len(TacheNotification.objects.bulk_create([
+                TacheNotification(eleve=eleve, canal='email', message=corps)
+                for eleve, (_, corps, _, _) in zip(destinataires_email, emails)
+            ]))
+
+    envois_sms = 0
+    echecs = []
+    if sms:
+        destinataires = {
+            (parents[eleve.parent_user_id].telephone, f"{titre} : {_personnaliser(message, eleve)}"): eleve
+            for eleve in eleves if eleve.parent_user_id in parents and parents[eleve.parent_user_id].telephone
+        }
+        envois_sms = envoyer_sms_groupe(list(destinataires), echecs)
+        TacheNotification.objects.bulk_create([
+            TacheNotification(eleve=destinataires[(numero, texte)], canal='sms', message=texte)
+            for numero, texte, _ in echecs
+        ])
+    return {
+        'notifications': len(notifications),
+        'emails': len(emails) - emails_en_file,
+        'emails_en_file': emails_en_file,
+        'sms': envois_sms,
+        'sms_en_file': len(echecs),
+    }
+
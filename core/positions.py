@@ -0,0 +1,283 @@
+# core/positions.py
+#
+# Dernière position GPS des bus (et des transports suivis individuellement),
+# tenue dans le cache (partagé entre workers si CACHE_URL pointe vers Redis ou
+# un répertoire) et écrite en base en différé : les pings sont accumulés en
+# mémoire du processus puis envoyés par lots de bulk_update au plus toutes les
+# TRANSPORT_FLUSH_INTERVAL secondes.
+#
+# Un élève dont Transport.numero_bus est renseigné prend la position de son
+# bus : un ping de bus coûte une écriture, quel que soit le nombre d'enfants.
+
+import logging
+import math
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from .models import Bus, Eleve, Transport
+from .tampons import TamponDiffere
+from .traces import ajouter_points, tampon_traces
+
+logger = logging.getLogger(__name__)
+
+TAILLE_LOT = 500
+# Un numéro de bus sans ligne Bus est mémorisé comme inconnu, brièvement : un bus
+# créé entre-temps (admin, traceur) efface l'entrée par son post_save
+DUREE_BUS_INCONNU = 60
+
+
+def _cle(eleve_id):
+    return f'core:position:eleve:{eleve_id}'
+
+
+def _cle_bus(numero_bus):
+    return f'core:position:bus:{numero_bus}'
+
+
+class _TamponPositions(TamponDiffere):
+    """Positions en attente d'écriture pour un modèle, par clé primaire, pour ce processus."""
+
+    def __init__(self, modele, champs):
+        super().__init__('TRANSPORT_FLUSH_INTERVAL')
+        self.modele = modele
+        self.champs = champs
+
+    def ajouter(self, valeurs_par_pk):
+        self._ajouter(lambda attente: attente.update(valeurs_par_pk))
+
+    def vider(self):
+        positions = self._prendre()
+        if not positions:
+            return 0
+
+        objets = [self.modele(pk=pk, **valeurs) for pk, valeurs in positions.items()]
+        try:
+            self.modele.objects.bulk_update(objets, self.champs, batch_size=TAILLE_LOT)
+        except Exception:
+            logger.exception("Échec de l'écriture de %s position(s) (%s)", len(objets), self.modele.__name__)
+            with self._verrou:
+                # Les pings arrivés entre-temps sont plus récents : ils priment
+                for pk, valeurs in positions.items():
+                    self._attente.setdefault(pk, valeurs)
+            return 0
+        return len(objets)
+
+
+# Position suivie de l'élève lui-même ; Transport.latitude/longitude restent son arrêt
+tampon = _TamponPositions(Transport, ['latitude_actuelle', 'longitude_actuelle'])
+tampon_bus = _TamponPositions(Bus, ['latitude', 'longitude', 'position_updated_at'])
+
+
+def coordonnees_valides(latitude, longitude):
+    # float('inf') ou 'nan' passent float() mais cassent la géométrie et le JSON des réponses
+    return (
+        math.isfinite(latitude) and math.isfinite(longitude)
+        and -90 <= latitude <= 90 and -180 <= longitude <= 180
+    )
+
+
+def enregistrer_position(eleve_id, latitude, longitude):
+    """Mémorise la position d'un élève ; False si l'élève n'existe pas.
+
+    Seul le premier ping d'un élève touche la base (résolution de son transport) ;
+    les suivants ne font qu'une lecture et une écriture dans le cache.
+    """
+    entree = cache.get(_cle(eleve_id))
+    if entree is None:
+        if not Eleve.objects.filter(id=eleve_id).exists():
+            return False
+        transport, _ = Transport.objects.get_or_create(eleve_id=eleve_id)
+        transport_id = transport.pk
+    else:
+        transport_id = entree['transport_id']
+
+    cache.set(_cle(eleve_id), {
+        'transport_id': transport_id,
+        'latitude': latitude,
+        'longitude': longitude,
+        'horodatage': time.time(),
+    }, None)
+    tampon.ajouter({transport_id: {'latitude_actuelle': latitude, 'longitude_actuelle': longitude}})
+    return True
+
+
+def _ids_bus(numeros, creer=False):
+    """{numero_bus: id} des bus connus ; avec `creer`, les inconnus sont créés à leur premier ping."""
+    ids = dict(Bus.objects.filter(numero_bus__in=numeros).values_list('numero_bus', 'id'))
+    nouveaux = [numero for numero in numeros if numero not in ids]
+    if nouveaux and creer:
+        Bus.objects.bulk_create([Bus(numero_bus=numero) for numero in nouveaux], ignore_conflicts=True)
+        ids.update(Bus.objects.filter(numero_bus__in=nouveaux).values_list('numero_bus', 'id'))
+    return ids
+
+
+def enregistrer_positions_bus(positions, horodatages=None, creer_bus=False):
+    """Mémorise un lot de positions [(numero_bus, latitude, longitude), ...].
+
+    `horodatages` : instants Unix des positions, fournis par les trames binaires
+    (core.trames) ; à défaut, l'heure de réception. Tous les points vont dans
+    la trace du bus ; la dernière position ne remplace que celle plus ancienne.
+    Les positions d'un bus inconnu sont ignorées, sauf avec `creer_bus` (traceur
+    authentifié), qui crée le bus.
+
+    Une lecture et une écriture groupées dans le cache par lot ; la base n'est
+    interrogée que pour les bus pas encore en cache. Retourne l'ensemble des
+    numéros de bus acceptés.
+    """
+    if horodatages is None:
+        horodatages = [time.time()] * len(positions)
+    dernieres = {}
+    for (numero, latitude, longitude), instant in zip(positions, horodatages):
+        if numero not in dernieres or instant >= dernieres[numero][2]:
+            dernieres[numero] = (latitude, longitude, instant)
+    if not dernieres:
+        return set()
+
+    entrees = cache.get_many([_cle_bus(numero) for numero in dernieres])
+    ids = {
+        numero: entrees[_cle_bus(numero)]['bus_id'] for numero in dernieres
+        if entrees.get(_cle_bus(numero), {}).get('bus_id') is not None
+    }
+    manquants = [numero for numero in dernieres if numero not in ids]
+    if manquants:
+        ids.update(_ids_bus(manquants, creer=creer_bus))
+    dernieres = {numero: valeurs for numero, valeurs in dernieres.items() if numero in ids}
+    if not dernieres:
+        return set()
+
+    # Positions envoyées en retard (traceur hors réseau) : trace seulement
+    recentes = {
+        numero: valeurs for numero, valeurs in dernieres.items()
+        if _cle_bus(numero) not in entrees or valeurs[2] >= entrees[_cle_bus(numero)]['horodatage']
+    }
+    cache.set_many({
+        _cle_bus(numero): {'bus_id': ids[numero], 'latitude': lat, 'longitude': lon, 'horodatage': instant}
+        for numero, (lat, lon, instant) in recentes.items()
+    }, None)
+    tampon_bus.ajouter({
+        ids[numero]: {
+            'latitude': lat,
+            'longitude': lon,
+            'position_updated_at': datetime.fromtimestamp(instant, tz=dt_timezone.utc),
+        }
+        for numero, (lat, lon, instant) in recentes.items()
+    })
+    ajouter_points([
+        (ids[numero], lat, lon, instant)
+        for (numero, lat, lon), instant in zip(positions, horodatages) if numero in ids
+    ])
+    return set(dernieres)
+
+
+def _entree_bus_en_base(numero_bus):
+    bus = (
+        Bus.objects.filter(numero_bus=numero_bus)
+        .values('id', 'latitude', 'longitude', 'position_updated_at')
+        .first()
+    )
+    if bus is None:
+        # Sans cette entrée, chaque lecture d'un tel transport refait la requête
+        entree = {'bus_id': None, 'latitude': None, 'longitude': None, 'horodatage': 0}
+        cache.set(_cle_bus(numero_bus), entree, DUREE_BUS_INCONNU)
+        return entree
+    entree = {
+        'bus_id': bus['id'],
+        'latitude': bus['latitude'],
+        'longitude': bus['longitude'],
+        'horodatage': bus['position_updated_at'].timestamp() if bus['position_updated_at'] else 0,
+    }
+    cache.set(_cle_bus(numero_bus), entree, None)
+    return entree
+
+
+def _cles_transport(transport):
+    cles = [_cle(transport.eleve_id)]
+    if transport.numero_bus:
+        cles.append(_cle_bus(transport.numero_bus))
+    return cles
+
+
+def _plus_recente(entrees):
+    connues = [entree for entree in entrees.values() if entree['latitude'] is not None]
+    if not connues:
+        return None
+    entree = max(connues, key=lambda e: e['horodatage'])
+    return {cle: entree[cle] for cle in ('latitude', 'longitude', 'horodatage')}
+
+
+def position_transport(transport):
+    """Dernière position connue pour un transport : {'latitude', 'longitude', 'horodatage'} ou None.
+
+    La plus récente entre celle de son bus et celle envoyée pour l'élève lui-même.
+    """
+    entrees = cache.get_many(_cles_transport(transport))
+    if transport.numero_bus and _cle_bus(transport.numero_bus) not in entrees:
+        entrees[_cle_bus(transport.numero_bus)] = _entree_bus_en_base(transport.numero_bus)
+    return _plus_recente(entrees)
+
+
+async def aposition_transport(transport):
+    """position_transport pour les vues asynchrones (core.live).
+
+    La lecture du cache reste asynchrone ; seul un bus absent du cache passe
+    par un thread pour la requête en base.
+    """
+    entrees = await cache.aget_many(_cles_transport(transport))
+    if transport.numero_bus and _cle_bus(transport.numero_bus) not in entrees:
+        entrees[_cle_bus(transport.numero_bus)] = await sync_to_async(_entree_bus_en_base)(transport.numero_bus)
+    return _plus_recente(entrees)
+
+
+def etat_position(transport, position=None):
+    """Réponse de transport_position_parent pour un transport (None si l'élève n'en a pas).
+
+    `position` est celle du cache (position_transport) ; à défaut, la dernière position
+    écrite en base, ou l'emplacement saisi pour le transport.
+    """
+    if transport is None:
+        return {'status': 'no_position'}
+    if position is None and transport.latitude_actuelle is not None:
+        position = {'latitude': transport.latitude_actuelle, 'longitude': transport.longitude_actuelle}
+    position = position or {'latitude': transport.latitude, 'longitude': transport.longitude}
+    if position['latitude'] is None or position['longitude'] is None:
+        return {'status': 'no_position'}
+    return {
+        'status': 'ok',
+        'latitude': position['latitude'],
+        'longitude': position['longitude'],
+        'moyen': transport.moyen,
+        'chauffeur': transport.chauffeur or '',
+    }
+
+
+def vider_positions():
+    """Écrit immédiatement les positions et points de trace en attente ; retourne le nombre de lignes mises à jour."""
+    return tampon.vider() + tampon_bus.vider() + tampon_traces.vider()
+
+
+def abandonner_positions():
+    """Oublie les positions et points de trace en attente sans les écrire (tests)."""
+    for differe in (tampon, tampon_bus, tampon_traces):
+        differe.abandonner()
+
+
+def _transport_modifie(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Une saisie manuelle (formulaire, admin) remplace la position en cache
+    if raw or (update_fields and set(update_fields) <= {'latitude_actuelle', 'longitude_actuelle'}):
+        return
+    cache.delete(_cle(instance.eleve_id))
+
+
+def _bus_modifie(sender, instance, raw=False, **kwargs):
+    if not raw:
+        cache.delete(_cle_bus(instance.numero_bus))
+
+
+post_save.connect(_transport_modifie, sender=Transport, dispatch_uid='positions_post_transport')
+post_delete.connect(_transport_modifie, sender=Transport, dispatch_uid='positions_del_transport')
+post_save.connect(_bus_modifie, sender=Bus, dispatch_uid='positions_post_bus')
+post_delete.connect(_bus_modifie, sender=Bus, dispatch_uid='positions_del_bus')
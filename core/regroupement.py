@@ -0,0 +1,93 @@
+# core/regroupement.py
+#
+# Regroupement des notifications répétées. Un même événement pour un même
+# parent et un même élève (bus arrivé appelé deux fois, position GPS qui
+# ressort puis revient dans le rayon d'arrivée…) n'est notifié qu'une fois par
+# fenêtre de NOTIF_FENETRE_REGROUPEMENT secondes : les répétitions incrémentent
+# Notification.occurrences au lieu de renvoyer SMS, email et notification.
+#
+# La notification de la fenêtre en cours, en base, sert de référence pour tous
+# les workers ; les arrivées simultanées sont départagées par cache.add (atomique
+# quand CACHE_URL désigne un cache partagé).
+#
+# Le départ d'un bus passe aussi par ici, élève par élève : un départ réémis
+# (trajet repris par un autre worker, tâche rejouée) n'est pas renvoyé.
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Notification
+from .notifications import eleves_cibles
+from .taches import mettre_en_file
+
+
+def _cle(user_id, eleve_id, type_notification):
+    return f'core:regroupement:{user_id}:{eleve_id}:{type_notification}'
+
+
+def _compter_repetition(user_id, eleve_id, type_notification, maintenant):
+    """Incrémente la notification de la fenêtre en cours ; False s'il n'y en a pas."""
+    return bool(
+        Notification.objects.filter(
+            user_id=user_id,
+            eleve_id=eleve_id,
+            type_notification=type_notification,
+            created_at__gte=maintenant - timedelta(seconds=settings.NOTIF_FENETRE_REGROUPEMENT),
+        ).update(occurrences=F('occurrences') + 1, derniere_occurrence=maintenant)
+    )
+
+
+def notifier_une_fois(eleve, type_notification, titre, message, canaux=(), texte=''):
+    """Crée la notification de l'élève et met en file les `canaux` (sms, email), une fois par fenêtre.
+
+    `texte` : message des canaux mis en file ; vide, chaque canal envoie son texte par défaut.
+    Retourne True si la notification a été envoyée, False si c'était une répétition
+    (comptée sur la notification existante) ou si l'élève n'a pas de compte parent.
+    """
+    if not eleve.parent_user_id:
+        return False
+    maintenant = timezone.now()
+    if _compter_repetition(eleve.parent_user_id, eleve.id, type_notification, maintenant):
+        return False
+    if not cache.add(_cle(eleve.parent_user_id, eleve.id, type_notification), 1, settings.NOTIF_FENETRE_REGROUPEMENT):
+        # Un autre worker vient de la créer
+        _compter_repetition(eleve.parent_user_id, eleve.id, type_notification, maintenant)
+        return False
+
+    Notification.objects.create(
+        user_id=eleve.parent_user_id,
+        eleve=eleve,
+        titre=titre,
+        message=message,
+        type_notification=type_notification,
+        derniere_occurrence=maintenant,
+    )
+    if canaux:
+        mettre_en_file([eleve], canaux, texte)
+    return True
+
+
+def notifier_arrivee(eleve):
+    # Bus arrivé chez l'élève : notification tout de suite, SMS et email par le worker
+    return notifier_une_fois(
+        eleve,
+        'bus_arrive',
+        "🚌 Transport arrivé",
+        f"Le transport est arrivé chez {eleve.prenom} {eleve.nom}.",
+        canaux=('sms', 'email'),
+    )
+
+
+def notifier_depart(eleve):
+    # Bus parti : notification tout de suite, email par le worker
+    titre, message = "🚌 Départ du bus", f"Le bus de {eleve.prenom} {eleve.nom} vient de partir."
+    return notifier_une_fois(eleve, 'depart_bus', titre, message, canaux=('email',), texte=f"{titre} : {message}")
+
+
+def notifier_depart_bus(numero_bus):
+    """notifier_depart pour chaque élève du bus ; retourne le nombre de notifications envoyées."""
+    return sum(notifier_depart(eleve) for eleve in eleves_cibles(numero_bus=numero_bus))
@@ -0,0 +1,53 @@
+# core/search.py
+#
+# Recherche d'élèves sur Eleve.cle_recherche ("nom prenom" sans accents, en
+# minuscules). Les préfixes passent par l'index B-tree ; les recherches
+# "contient" s'appuient sur l'index trigramme GIN sous PostgreSQL.
+
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import Eleve, normaliser_texte
+
+LIMITE_RESULTATS = 20
+LIMITE_AUTOCOMPLETE = 10
+
+
+def _debut_de_mot(mot):
+    return Q(cle_recherche__startswith=mot) | Q(cle_recherche__contains=f' {mot}')
+
+
+def rechercher_eleves(query, limite=LIMITE_RESULTATS):
+    """Élèves correspondant à la requête, les plus pertinents d'abord.
+
+    Rang 0 : nom complet identique ; 1 : préfixe de "nom prenom" ;
+    2 : chaque mot est un début de mot (ex. "jean dup") ; 3 : simple sous-chaîne.
+    """
+    cle = normaliser_texte(query)
+    if not cle:
+        return []
+
+    eleves = Eleve.objects.only('id', 'nom', 'prenom', 'classe', 'naissance')
+
+    # Cas le plus fréquent (on tape le début du nom) : l'index de préfixe suffit
+    prefixes = list(eleves.filter(cle_recherche__startswith=cle).order_by('cle_recherche', 'id')[:limite])
+    if len(prefixes) >= limite:
+        return prefixes
+
+    mots = cle.split()
+    tous_les_mots = Q()
+    debuts_de_mots = Q()
+    for mot in mots:
+        tous_les_mots &= Q(cle_recherche__contains=mot)
+        debuts_de_mots &= _debut_de_mot(mot)
+
+    return list(
+        eleves.filter(tous_les_mots)
+        .annotate(rang=Case(
+            When(cle_recherche=cle, then=Value(0)),
+            When(cle_recherche__startswith=cle, then=Value(1)),
+            When(debuts_de_mots, then=Value(2)),
+            default=Value(3),
+            output_field=IntegerField(),
+        ))
+        .order_by('rang', 'cle_recherche', 'id')[:limite]
+    )
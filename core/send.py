@@ -9,7 +9,7 @@ def envoyer_notification_paiement(eleve, montant, mois):
         send_mail(
             subject="📩 Confirmation de paiement scolaire",
             message=f"Bonjour, le paiement de {montant}€ pour le mois de {mois} a été enregistré pour {eleve.nom}.",
-            from_email="smounat88@gmail.com",
+            from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[eleve.email_parent],
             fail_silently=False  # Important pour voir les erreurs
         )
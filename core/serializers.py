@@ -3,6 +3,7 @@ from .models import Eleve
 from .models import Absence
 from .models import Note
 from .models import Transport
+from .models import Notification
 
 
 
@@ -29,3 +30,10 @@ class EleveSerializer(serializers.ModelSerializer):
     class Meta:
         model = Eleve
         fields = '__all__'
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ['id', 'titre', 'message', 'eleve', 'created_at', 'is_read', 'occurrences', 'derniere_occurrence']
+        read_only_fields = fields
@@ -6,14 +6,9 @@ from django.dispatch import receiver
 from django.db.models.signals import post_save
 from django.contrib.auth.models import User
 from core.models import Profile
-from .models import Transport  # ou Bus, ou autre modèle concerné
-from .notifications import notifier_parent_par_email
-
-@receiver(post_save, sender=Transport)
-def envoyer_email_depart_bus(sender, instance, created, **kwargs):
-    if instance.depart:  # supposons un champ booléen ou timestamp
-        eleve = instance.eleve
-        notifier_parent_par_email(eleve)
+
+# Les notifications de départ et d'arrivée des bus sont émises par la machine à
+# états des trajets (core.trajets), pas par un signal sur Transport.
 
 @receiver(post_migrate)
 def creer_groupes(sender, **kwargs):
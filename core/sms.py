@@ -0,0 +1,137 @@
+# core/sms.py
+#
+# Envoi de SMS derrière un backend interchangeable, sur le modèle d'EMAIL_BACKEND :
+# settings.SMS_BACKEND désigne la classe utilisée. Le backend est instancié une
+# fois par processus ; celui de Twilio garde un seul client, et donc une seule
+# session HTTP (connexions réutilisées), pour tous les envois.
+#
+#   core.sms.TwilioBackend   production (TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_FROM_NUMBER)
+#   core.sms.ConsoleBackend  affiche les SMS sur la sortie standard
+#   core.sms.FileBackend     ajoute les SMS au fichier SMS_FILE_PATH
+#   core.sms.LocmemBackend   conserve les SMS dans core.sms.boite_envoi (tests, tests de charge)
+
+import logging
+import sys
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Envoyés par LocmemBackend : [(numéro, texte), ...]
+boite_envoi = []
+
+
+class BaseSmsBackend:
+    def send_many(self, messages, echecs=None):
+        """Envoie [(numéro, texte), ...] ; retourne le nombre de SMS envoyés.
+
+        Un message refusé par la passerelle n'interrompt pas le lot : il est ajouté
+        à `echecs` sous la forme (numéro, texte, exception).
+        """
+        raise NotImplementedError
+
+    def send(self, numero, texte):
+        # Un seul message : l'échec est levé, pour que l'appelant (tâche de la file) réessaie
+        echecs = []
+        envoyes = self.send_many([(numero, texte)], echecs)
+        if echecs:
+            raise echecs[0][2]
+        return envoyes == 1
+
+
+class TwilioBackend(BaseSmsBackend):
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._client = None
+
+    def _client_twilio(self):
+        if self._client is None:
+            with self._verrou:
+                if self._client is None:
+                    from twilio.http.http_client import TwilioHttpClient
+                    from twilio.rest import Client
+
+                    self._client = Client(
+                        settings.TWILIO_ACCOUNT_SID,
+                        settings.TWILIO_AUTH_TOKEN,
+                        http_client=TwilioHttpClient(pool_connections=True, timeout=settings.SMS_TIMEOUT),
+                    )
+        return self._client
+
+    def send_many(self, messages, echecs=None):
+        if not (settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN and settings.TWILIO_FROM_NUMBER):
+            logger.warning("Twilio non configure (variables d'environnement manquantes).")
+            return 0
+        try:
+            client = self._client_twilio()
+        except ImportError:
+            logger.warning("Twilio n'est pas installé, SMS ignoré.")
+            return 0
+
+        envoyes = 0
+        for numero, texte in messages:
+            try:
+                client.messages.create(body=texte, from_=settings.TWILIO_FROM_NUMBER, to=numero)
+            except Exception as exc:
+                logger.warning("SMS vers %s refusé par Twilio : %s", numero, exc)
+                if echecs is not None:
+                    echecs.append((numero, texte, exc))
+            else:
+                envoyes += 1
+        return envoyes
+
+
+class ConsoleBackend(BaseSmsBackend):
+    def __init__(self, flux=None):
+        self.flux = flux or sys.stdout
+        self._verrou = threading.Lock()
+
+    def _ecrire(self, flux, messages):
+        for numero, texte in messages:
+            flux.write(f"SMS {timezone.now().isoformat()} -> {numero}\n{texte}\n{'-' * 40}\n")
+        flux.flush()
+
+    def send_many(self, messages, echecs=None):
+        with self._verrou:
+            self._ecrire(self.flux, messages)
+        return len(messages)
+
+
+class FileBackend(ConsoleBackend):
+    def send_many(self, messages, echecs=None):
+        with self._verrou, open(settings.SMS_FILE_PATH, 'a', encoding='utf-8') as fichier:
+            self._ecrire(fichier, messages)
+        return len(messages)
+
+
+class LocmemBackend(BaseSmsBackend):
+    def send_many(self, messages, echecs=None):
+        boite_envoi.extend(messages)
+        return len(messages)
+
+
+_verrou = threading.Lock()
+_backends = {}
+
+
+def backend_sms():
+    """Instance unique, pour ce processus, du backend désigné par SMS_BACKEND."""
+    chemin = settings.SMS_BACKEND
+    backend = _backends.get(chemin)
+    if backend is None:
+        with _verrou:
+            backend = _backends.get(chemin)
+            if backend is None:
+                backend = _backends[chemin] = import_string(chemin)()
+    return backend
+
+
+def envoyer_sms(numero, texte):
+    return backend_sms().send(numero, texte)
+
+
+def envoyer_sms_groupe(messages, echecs=None):
+    return backend_sms().send_many(messages, echecs)
@@ -0,0 +1,73 @@
+# core/snapshot.py
+#
+# Instantané de l'école pour dashboard_admin : tous les compteurs en une seule
+# requête (sous-requêtes scalaires) + les moyennes par classe en une requête
+# groupée, le tout mis en cache. La commande refresh_school_snapshot --interval
+# (service snapshot du Procfile et de render.yaml) le recalcule en arrière-plan
+# avant son expiration, pour que le tableau de bord ne touche pas aux tables.
+# Le service doit partager le cache des serveurs web (CACHE_URL) : avec le cache
+# local par défaut, l'instantané est recalculé par la première requête qui suit
+# son expiration.
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Avg
+from django.utils import timezone
+
+from .models import Absence, Cours, Eleve, Enseignant, Note, Notification, Parent, Quiz, Transport
+
+CACHE_KEY = 'core:school_snapshot'
+
+COMPTEURS = {
+    'nb_eleves': Eleve,
+    'nb_parents': Parent,
+    'nb_enseignants': Enseignant,
+    'nb_cours': Cours,
+    'nb_quiz': Quiz,
+    'nb_notes': Note,
+    'nb_absences': Absence,
+    'nb_transports': Transport,
+    'nb_notifications': Notification,
+}
+
+
+def _compter_tout():
+    qn = connection.ops.quote_name
+    colonnes = ", ".join(
+        f"(SELECT COUNT(*) FROM {qn(modele._meta.db_table)})" for modele in COMPTEURS.values()
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {colonnes}")
+        ligne = cursor.fetchone()
+    return dict(zip(COMPTEURS, ligne))
+
+
+def calculer_snapshot():
+    """Calcule l'instantané complet (2 requêtes, quelle que soit la taille de l'école)."""
+    snapshot = _compter_tout()
+    moyennes = (
+        Note.objects.values('eleve__classe')
+        .annotate(moyenne=Avg('note'))
+        .order_by('eleve__classe')
+    )
+    snapshot['moyennes'] = [
+        {'eleve__classe': m['eleve__classe'], 'moyenne': float(m['moyenne'] or 0)}
+        for m in moyennes
+    ]
+    snapshot['generated_at'] = timezone.now().isoformat()
+    return snapshot
+
+
+def rafraichir_snapshot():
+    snapshot = calculer_snapshot()
+    cache.set(CACHE_KEY, snapshot, settings.SCHOOL_SNAPSHOT_TTL)
+    return snapshot
+
+
+def snapshot_ecole():
+    """Instantané en cache ; recalculé à la demande seulement s'il a expiré."""
+    snapshot = cache.get(CACHE_KEY)
+    if snapshot is None:
+        snapshot = rafraichir_snapshot()
+    return snapshot
@@ -0,0 +1,151 @@
+# core/stats.py
+#
+# Maintien incrémental de EleveStats : chaque création, modification ou
+# suppression d'une Note, Absence, SoumissionQuiz ou Badge applique un delta
+# (sommes et compteurs) sur la ligne de l'élève au lieu de tout recalculer.
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .models import Absence, Badge, Eleve, EleveStats, Note, SoumissionQuiz
+
+CHAMPS = ('somme_notes', 'nb_notes', 'somme_quiz', 'nb_quiz', 'nb_quiz_notes', 'nb_absences', 'nb_badges')
+
+
+def _contribution_note(note):
+    return {'somme_notes': float(note.note or 0), 'nb_notes': 1}
+
+
+def _contribution_quiz(soumission):
+    if soumission.score is None:
+        return {'nb_quiz': 1}
+    return {'somme_quiz': float(soumission.score), 'nb_quiz': 1, 'nb_quiz_notes': 1}
+
+
+def _contribution_absence(absence):
+    return {'nb_absences': 1}
+
+
+def _contribution_badge(badge):
+    return {'nb_badges': 1}
+
+
+CONTRIBUTIONS = {
+    Note: _contribution_note,
+    SoumissionQuiz: _contribution_quiz,
+    Absence: _contribution_absence,
+    Badge: _contribution_badge,
+}
+
+
+def _calculer(eleve_ids=None):
+    """Agrège les tables sources en quatre requêtes groupées : {eleve_id: {champ: valeur}}."""
+    requetes = [
+        (Note, {'somme_notes': Sum('note'), 'nb_notes': Count('id')}),
+        (SoumissionQuiz, {
+            'somme_quiz': Sum('score'),
+            'nb_quiz': Count('id'),
+            'nb_quiz_notes': Count('id', filter=Q(score__isnull=False)),
+        }),
+        (Absence, {'nb_absences': Count('id')}),
+        (Badge, {'nb_badges': Count('id')}),
+    ]
+    resultats = {}
+    for modele, agregats in requetes:
+        qs = modele.objects.all()
+        if eleve_ids is not None:
+            qs = qs.filter(eleve_id__in=eleve_ids)
+        for ligne in qs.values('eleve_id').annotate(**agregats).order_by():
+            valeurs = resultats.setdefault(ligne.pop('eleve_id'), {})
+            valeurs.update({k: float(v) if k.startswith('somme') else v for k, v in ligne.items() if v is not None})
+    return resultats
+
+
+def recalculer_stats(eleve_id):
+    """Recalcule entièrement la ligne EleveStats d'un élève."""
+    valeurs = {champ: 0 for champ in CHAMPS}
+    valeurs.update(_calculer([eleve_id]).get(eleve_id, {}))
+    stats, _ = EleveStats.objects.update_or_create(eleve_id=eleve_id, defaults=valeurs)
+    return stats
+
+
+def reconstruire_stats(batch_size=1000):
+    """Reconstruit la table EleveStats pour toute l'école ; retourne le nombre de lignes."""
+    resultats = _calculer()
+    lignes = []
+    for eleve_id in Eleve.objects.values_list('id', flat=True).iterator():
+        valeurs = {champ: 0 for champ in CHAMPS}
+        valeurs.update(resultats.get(eleve_id, {}))
+        lignes.append(EleveStats(eleve_id=eleve_id, **valeurs))
+
+    with transaction.atomic():
+        EleveStats.objects.all().delete()
+        EleveStats.objects.bulk_create(lignes, batch_size=batch_size)
+    return len(lignes)
+
+
+def stats_pour(eleve):
+    """Statistiques d'un élève en une lecture par clé primaire (calculées au premier accès)."""
+    try:
+        return EleveStats.objects.get(pk=eleve.pk)
+    except EleveStats.DoesNotExist:
+        return recalculer_stats(eleve.pk)
+
+
+def _appliquer(eleve_id, deltas, signe=1, creer=True):
+    deltas = {champ: valeur * signe for champ, valeur in deltas.items() if valeur}
+    if not deltas:
+        return
+    maj = EleveStats.objects.filter(eleve_id=eleve_id).update(
+        updated_at=timezone.now(),
+        **{champ: F(champ) + valeur for champ, valeur in deltas.items()},
+    )
+    if not maj and creer:
+        # Pas encore de ligne : le recalcul inclut déjà l'écriture en cours
+        recalculer_stats(eleve_id)
+
+
+def memoriser_contribution(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    contribution = CONTRIBUTIONS[sender]
+    instance._stats_avant = None
+    if instance.pk:
+        ancien = sender.objects.filter(pk=instance.pk).first()
+        if ancien is not None:
+            instance._stats_avant = (ancien.eleve_id, contribution(ancien))
+
+
+def appliquer_contribution(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    contribution = CONTRIBUTIONS[sender]
+    nouveau = contribution(instance)
+    avant = getattr(instance, '_stats_avant', None)
+    instance._stats_avant = None
+
+    if avant is None:
+        _appliquer(instance.eleve_id, nouveau)
+        return
+
+    ancien_eleve_id, ancien = avant
+    if ancien_eleve_id == instance.eleve_id:
+        deltas = {champ: nouveau.get(champ, 0) - ancien.get(champ, 0) for champ in set(nouveau) | set(ancien)}
+        _appliquer(instance.eleve_id, deltas)
+    else:
+        _appliquer(ancien_eleve_id, ancien, signe=-1, creer=False)
+        _appliquer(instance.eleve_id, nouveau)
+
+
+def retirer_contribution(sender, instance, **kwargs):
+    contribution = CONTRIBUTIONS[sender]
+    # creer=False : lors d'une suppression en cascade de l'élève, sa ligne a déjà disparu
+    _appliquer(instance.eleve_id, contribution(instance), signe=-1, creer=False)
+
+
+for _modele in CONTRIBUTIONS:
+    pre_save.connect(memoriser_contribution, sender=_modele, dispatch_uid=f'stats_pre_{_modele.__name__}')
+    post_save.connect(appliquer_contribution, sender=_modele, dispatch_uid=f'stats_post_{_modele.__name__}')
+    post_delete.connect(retirer_contribution, sender=_modele, dispatch_uid=f'stats_del_{_modele.__name__}')
@@ -0,0 +1,210 @@
+# core/synthetic.py
+#
+# Génération d'une école synthétique à grande échelle pour les mesures de
+# performance (generate_school, benchmark_roles, check_query_plans). Tout passe
+# par bulk_create : les signaux ne sont pas émis, donc EleveStats et la clé de
+# recherche sont renseignés explicitement.
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import (
+    CLASSES,
+    Absence,
+    Badge,
+    Bus,
+    Cours,
+    Eleve,
+    Enseignant,
+    Note,
+    Notification,
+    PaiementEleve,
+    PaiementEnseignant,
+    Parent,
+    Profile,
+    Question,
+    Quiz,
+    SoumissionQuiz,
+    Transport,
+    normaliser_texte,
+)
+from .stats import reconstruire_stats
+
+MOT_DE_PASSE = 'synthetique'
+PRENOMS = ['Adam', 'Yasmine', 'Lina', 'Rayan', 'Inès', 'Youssef', 'Sara', 'Noah', 'Aya', 'Élias', 'Léa', 'Omar']
+NOMS = ['Alaoui', 'Bennani', 'Dupont', 'Martin', 'El Idrissi', 'Berrada', 'Lefèvre', 'Tazi', 'Moreau', 'Chraïbi']
+MATIERES = ['Maths', 'Français', 'Arabe', 'Sciences', 'Histoire', 'Anglais']
+MOIS = ['septembre', 'octobre', 'novembre', 'décembre', 'janvier', 'février', 'mars', 'avril', 'mai', 'juin']
+
+# Centre approximatif des positions de domicile (Casablanca)
+LATITUDE, LONGITUDE = 33.5731, -7.5898
+
+
+def generer_ecole(
+    nb_eleves,
+    prefixe='synth',
+    eleves_par_enseignant=25,
+    notes_par_eleve=20,
+    absences_par_eleve=4,
+    quiz_par_cours=3,
+    eleves_par_bus=40,
+    graine=0,
+    batch_size=2000,
+):
+    """Crée une école complète et retourne le nombre de lignes créées par modèle."""
+    rnd = random.Random(graine)
+    mot_de_passe = make_password(MOT_DE_PASSE)  # un seul hachage pour tous les comptes
+    today = date.today()
+    classes = [code for code, _ in CLASSES]
+    nb_enseignants = max(1, nb_eleves // eleves_par_enseignant)
+
+    with transaction.atomic():
+        users = User.objects.bulk_create(
+            [User(username=f'{prefixe}_admin', password=mot_de_passe, is_staff=True)]
+            + [User(username=f'{prefixe}_enseignant_{i}', password=mot_de_passe, email=f'{prefixe}_ens{i}@exemple.ma')
+               for i in range(nb_enseignants)]
+            + [User(username=f'{prefixe}_parent_{i}', password=mot_de_passe) for i in range(nb_eleves)]
+            + [User(username=f'{prefixe}_eleve_{i}', password=mot_de_passe) for i in range(nb_eleves)],
+            batch_size=batch_size,
+        )
+        admin = users[0]
+        users_enseignants = users[1:1 + nb_enseignants]
+        users_parents = users[1 + nb_enseignants:1 + nb_enseignants + nb_eleves]
+        users_eleves = users[1 + nb_enseignants + nb_eleves:]
+
+        Profile.objects.bulk_create(
+            [Profile(user=admin, role='admin')]
+            + [Profile(user=u, role='enseignant') for u in users_enseignants]
+            + [Profile(user=u, role='parent') for u in users_parents]
+            + [Profile(user=u, role='eleve') for u in users_eleves],
+            batch_size=batch_size,
+        )
+
+        enseignants = Enseignant.objects.bulk_create(
+            [Enseignant(user=u, specialite=MATIERES[i % len(MATIERES)]) for i, u in enumerate(users_enseignants)],
+            batch_size=batch_size,
+        )
+
+        eleves = []
+        for i in range(nb_eleves):
+            nom, prenom = rnd.choice(NOMS), rnd.choice(PRENOMS)
+            eleves.append(Eleve(
+                user=users_eleves[i],
+                nom=nom,
+                prenom=prenom,
+                naissance=today - timedelta(days=rnd.randint(6 * 365, 12 * 365)),
+                # Chaque enseignant suit une classe entière du même niveau
+                classe=classes[(i // eleves_par_enseignant) % len(classes)],
+                parent_user=users_parents[i],
+                email_parent=f'{prefixe}_parent{i}@exemple.ma',
+                cle_recherche=normaliser_texte(f"{nom} {prenom}"),
+            ))
+        eleves = Eleve.objects.bulk_create(eleves, batch_size=batch_size)
+
+        Affectation = Eleve.enseignants.through
+        Affectation.objects.bulk_create(
+            [Affectation(eleve=e, enseignant=enseignants[(i // eleves_par_enseignant) % nb_enseignants])
+             for i, e in enumerate(eleves)],
+            batch_size=batch_size,
+        )
+
+        Parent.objects.bulk_create(
+            [Parent(user=users_parents[i], nom=f"{e.nom} (parent)", telephone=f'+2126{i:08d}',
+                    email=e.email_parent, eleve=e)
+             for i, e in enumerate(eleves)],
+            batch_size=batch_size,
+        )
+
+        cours = Cours.objects.bulk_create(
+            [Cours(nom=f"{MATIERES[i % len(MATIERES)]} {classes[i % len(classes)]}", description='Cours synthétique',
+                   enseignant=ens, classe=classes[i % len(classes)])
+             for i, ens in enumerate(enseignants)],
+            batch_size=batch_size,
+        )
+        quiz = Quiz.objects.bulk_create(
+            [Quiz(cours=c, titre=f'Quiz {n + 1}') for c in cours for n in range(quiz_par_cours)],
+            batch_size=batch_size,
+        )
+        Question.objects.bulk_create(
+            [Question(quiz=q, texte='2 + 2 ?', choix_1='3', choix_2='4', choix_3='5', bonne_reponse='4') for q in quiz],
+            batch_size=batch_size,
+        )
+        quiz_par_enseignant = {}
+        for q in quiz:
+            quiz_par_enseignant.setdefault(q.cours.enseignant_id, []).append(q)
+
+        notes = []
+        absences = []
+        soumissions = []
+        badges = []
+        for i, e in enumerate(eleves):
+            k = (i // eleves_par_enseignant) % nb_enseignants
+            enseignant = enseignants[k]
+            for n in range(notes_par_eleve):
+                notes.append(Note(
+                    eleve=e, enseignant=enseignant, matiere=MATIERES[n % len(MATIERES)],
+                    note=round(rnd.uniform(4, 20), 1), date=today - timedelta(days=rnd.randint(0, 300)),
+                ))
+            for n in range(absences_par_eleve):
+                absences.append(Absence(
+                    eleve=e, date=today - timedelta(days=rnd.randint(0, 300)), justifiee=rnd.random() < 0.6,
+                ))
+            for q in quiz_par_enseignant.get(enseignant.id, []):
+                soumissions.append(SoumissionQuiz(eleve=e, quiz=q, score=Decimal(rnd.randint(0, 10))))
+            if rnd.random() < 0.5:
+                badges.append(Badge(eleve=e, cours=cours[k], titre='Math Master'))
+        Note.objects.bulk_create(notes, batch_size=batch_size)
+        Absence.objects.bulk_create(absences, batch_size=batch_size)
+        SoumissionQuiz.objects.bulk_create(soumissions, batch_size=batch_size)
+        Badge.objects.bulk_create(badges, batch_size=batch_size)
+
+        Transport.objects.bulk_create(
+            [Transport(eleve=e, moyen='Bus', chauffeur=f'Chauffeur {i // eleves_par_bus}',
+                       numero_bus=f'{prefixe.upper()}-{i // eleves_par_bus:03d}',
+                       latitude=LATITUDE + rnd.uniform(-0.05, 0.05), longitude=LONGITUDE + rnd.uniform(-0.05, 0.05))
+             for i, e in enumerate(eleves)],
+            batch_size=batch_size,
+        )
+        bus = Bus.objects.bulk_create(
+            [Bus(numero_bus=f'{prefixe.upper()}-{n:03d}', latitude=LATITUDE, longitude=LONGITUDE)
+             for n in range((nb_eleves + eleves_par_bus - 1) // eleves_par_bus)],
+            batch_size=batch_size,
+        )
+
+        paiements_eleves = PaiementEleve.objects.bulk_create(
+            [PaiementEleve(eleve=e, montant=Decimal('800.00'), mois_concerne=mois) for e in eleves for mois in MOIS[:3]],
+            batch_size=batch_size,
+        )
+        paiements_enseignants = PaiementEnseignant.objects.bulk_create(
+            [PaiementEnseignant(enseignant=ens, montant=Decimal('6000.00'), mois_concerne=mois)
+             for ens in enseignants for mois in MOIS[:3]],
+            batch_size=batch_size,
+        )
+        notifications = Notification.objects.bulk_create(
+            [Notification(user=u, eleve=e, titre='🚌 Transport arrivé', message='Notification synthétique')
+             for u, e in zip(users_parents, eleves) for _ in range(3)],
+            batch_size=batch_size,
+        )
+
+        reconstruire_stats(batch_size=batch_size)
+
+    return {
+        'users': len(users),
+        'enseignants': len(enseignants),
+        'eleves': len(eleves),
+        'cours': len(cours),
+        'quiz': len(quiz),
+        'notes': len(notes),
+        'absences': len(absences),
+        'soumissions': len(soumissions),
+        'badges': len(badges),
+        'transports': len(eleves),
+        'bus': len(bus),
+        'paiements': len(paiements_eleves) + len(paiements_enseignants),
+        'notifications': len(notifications),
+    }
@@ -0,0 +1,128 @@
+# core/taches.py
+#
+# File des notifications aux parents, en base (TacheNotification). Les vues et
+# la machine à états des trajets n'y insèrent qu'une ligne par canal et
+# répondent aussitôt ; le worker (`manage.py worker_notifications`) réserve les
+# tâches dues par lots, avec SELECT ... FOR UPDATE SKIP LOCKED sur PostgreSQL
+# pour que plusieurs workers ne prennent jamais la même, puis appelle les
+# fonctions de core.notifications.
+#
+# Le départ d'un bus est une seule tâche (canal depart_bus, numero_bus
+# renseigné) ; le worker la répartit entre les élèves du bus par
+# core.regroupement, qui ne renvoie pas un départ déjà notifié.
+#
+# Une tâche en échec est reprogrammée avec un délai qui double à chaque
+# tentative (NOTIF_DELAI_BASE, 2×, 4×…) jusqu'à NOTIF_TENTATIVES_MAX ; une
+# tâche réservée par un worker arrêté en cours de route est reprise une fois
+# NOTIF_RESERVATION écoulé.
+
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import TacheNotification
+from .notifications import notifier_parent_par_app, notifier_parent_par_email, notifier_parent_par_sms
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATEURS = {
+    'sms': notifier_parent_par_sms,
+    'email': notifier_parent_par_email,
+    'app': notifier_parent_par_app,
+}
+
+
+def _notifier_depart(numero_bus):
+    # Import différé : core.regroupement met ses canaux en file par ce module
+    from .regroupement import notifier_depart_bus
+
+    # False si aucun parent n'est à notifier (pas de compte parent, départ déjà notifié)
+    return notifier_depart_bus(numero_bus) > 0
+
+
+# Tâches d'un bus entier, par numéro de bus
+NOTIFICATEURS_BUS = {
+    'depart_bus': _notifier_depart,
+}
+CANAUX_ARRIVEE = ('sms', 'email', 'app')
+
+
+def mettre_en_file(eleves, canaux=CANAUX_ARRIVEE, message=''):
+    """Programme une notification par élève et par canal ; retourne les tâches créées."""
+    return TacheNotification.objects.bulk_create([
+        TacheNotification(eleve=eleve, canal=canal, message=message) for eleve in eleves for canal in canaux
+    ])
+
+
+def mettre_en_file_bus(numero_bus, canal='depart_bus'):
+    return TacheNotification.objects.create(numero_bus=numero_bus, canal=canal)
+
+
+def delai_nouvel_essai(tentatives):
+    # Backoff exponentiel, avec ±20 % d'aléa pour ne pas relancer toutes les tâches ensemble
+    return settings.NOTIF_DELAI_BASE * 2 ** (tentatives - 1) * random.uniform(0.8, 1.2)
+
+
+def reserver(lot):
+    """Réserve jusqu'à `lot` tâches dues pour ce worker ; retourne leurs identifiants."""
+    maintenant = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            TacheNotification.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(statut='en_attente', prochain_essai__lte=maintenant)
+                | Q(statut='en_cours', reservee_jusqua__lt=maintenant)
+            )
+            .order_by('prochain_essai')
+            .values_list('id', flat=True)[:lot]
+        )
+        if ids:
+            TacheNotification.objects.filter(id__in=ids).update(
+                statut='en_cours',
+                tentatives=F('tentatives') + 1,
+                reservee_jusqua=maintenant + timedelta(seconds=settings.NOTIF_RESERVATION),
+            )
+    return ids
+
+
+def executer(tache):
+    """Envoie une tâche réservée et enregistre le résultat."""
+    maintenant = timezone.now()
+    try:
+        if tache.canal in NOTIFICATEURS_BUS:
+            envoyee = NOTIFICATEURS_BUS[tache.canal](tache.numero_bus)
+        elif tache.message:
+            envoyee = NOTIFICATEURS[tache.canal](tache.eleve, tache.message)
+        else:
+            envoyee = NOTIFICATEURS[tache.canal](tache.eleve)
+    except Exception as exc:
+        logger.warning("Notification %s en échec (élève id=%s, bus %s, tentative %s) : %s",
+                       tache.canal, tache.eleve_id, tache.numero_bus or '-', tache.tentatives, exc)
+        tache.derniere_erreur = f"{type(exc).__name__}: {exc}"[:2000]
+        if tache.tentatives >= settings.NOTIF_TENTATIVES_MAX:
+            tache.statut = 'echouee'
+            tache.traitee_a = maintenant
+        else:
+            tache.statut = 'en_attente'
+            tache.prochain_essai = maintenant + timedelta(seconds=delai_nouvel_essai(tache.tentatives))
+    else:
+        # False : rien à envoyer (pas de parent, d'email ou de passerelle SMS), inutile de réessayer
+        tache.statut = 'envoyee' if envoyee else 'ignoree'
+        tache.traitee_a = maintenant
+    tache.reservee_jusqua = None
+    tache.save(update_fields=['statut', 'prochain_essai', 'reservee_jusqua', 'derniere_erreur', 'traitee_a'])
+    return tache.statut
+
+
+def traiter_lot(lot=50):
+    """Réserve et exécute un lot de tâches ; retourne le nombre de tâches traitées."""
+    ids = reserver(lot)
+    taches = TacheNotification.objects.filter(id__in=ids).select_related('eleve', 'eleve__parent_user')
+    for tache in taches:
+        executer(tache)
+    return len(ids)
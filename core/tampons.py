@@ -0,0 +1,73 @@
+# core/tampons.py
+#
+# Base des tampons d'écriture différée (core.positions, core.traces). Les ajouts
+# sont accumulés en mémoire du processus et écrits par lots : par l'ajout qui
+# suit l'échéance, sinon par une minuterie armée au premier ajout en attente,
+# pour que les dernières positions d'un bus qui ne pingue plus ne restent pas
+# en mémoire jusqu'à l'arrêt du processus. Vidage final à la sortie (atexit).
+
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+
+class TamponDiffere:
+    """`reglage` : nom du setting donnant l'intervalle de vidage, en secondes."""
+
+    def __init__(self, reglage):
+        self.reglage = reglage
+        self._verrou = threading.Lock()
+        self._attente = {}
+        self._dernier_vidage = time.monotonic()
+        self._minuteur = None
+        atexit.register(self.vider)
+
+    def _ajouter(self, fusionner):
+        """Applique `fusionner(attente)` sous le verrou, puis vide ou arme la minuterie."""
+        intervalle = getattr(settings, self.reglage)
+        with self._verrou:
+            fusionner(self._attente)
+            echu = time.monotonic() - self._dernier_vidage >= intervalle
+        if echu:
+            self.vider()
+        else:
+            self._armer(intervalle)
+
+    def _prendre(self):
+        with self._verrou:
+            attente, self._attente = self._attente, {}
+            self._dernier_vidage = time.monotonic()
+        return attente
+
+    def _armer(self, intervalle):
+        with self._verrou:
+            if self._minuteur is not None or not self._attente:
+                return
+            minuteur = self._minuteur = threading.Timer(intervalle, self._vidage_programme)
+            minuteur.daemon = True
+        minuteur.start()
+
+    def _vidage_programme(self):
+        with self._verrou:
+            self._minuteur = None
+        try:
+            self.vider()
+        finally:
+            # Connexion propre à ce thread, hors du cycle des requêtes
+            connection.close()
+        # Lot remis en attente après un échec : nouvel essai au prochain intervalle
+        self._armer(getattr(settings, self.reglage))
+
+    def abandonner(self):
+        """Oublie les ajouts en attente et arrête la minuterie, sans rien écrire."""
+        with self._verrou:
+            minuteur, self._minuteur = self._minuteur, None
+        if minuteur is not None:
+            minuteur.cancel()
+        self._prendre()
+
+    def vider(self):
+        raise NotImplementedError
@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core import carte, geofence, positions, sms, trajets, trames
+from core.models import Eleve, Parent, Transport
+
+# Domicile des élèves de la tournée de test, et dépôt à environ 2 km au sud
+DOMICILE = (33.5700, -7.5900)
+DEPOT = (33.5500, -7.5900)
+
+
+@override_settings(
+    SMS_BACKEND='core.sms.LocmemBackend',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class BaseTests(TestCase):
+    """Vide le cache et les états tenus en mémoire du processus entre deux tests."""
+
+    def setUp(self):
+        cache.clear()
+        sms.boite_envoi.clear()
+        trajets.oublier_trajets()
+        geofence.oublier_arrets()
+        trames.oublier_numeros()
+        carte.invalider_index()
+        positions.abandonner_positions()
+        # Rien ne reste à écrire par la minuterie ou à la sortie, une fois la base de test détruite
+        self.addCleanup(positions.abandonner_positions)
+
+    def creer_parent(self, nom, telephone='+212600000001', email='parent@example.com'):
+        user = User.objects.create_user(nom, password='x')
+        parent = Parent.objects.create(user=user, nom=nom, telephone=telephone, email=email)
+        return user, parent
+
+    def creer_eleve(self, prenom, parent_user=None, numero_bus=None, domicile=DOMICILE, classe='CE1'):
+        eleve = Eleve.objects.create(nom='Test', prenom=prenom, classe=classe, parent_user=parent_user)
+        Transport.objects.create(eleve=eleve, numero_bus=numero_bus, latitude=domicile[0], longitude=domicile[1])
+        return eleve
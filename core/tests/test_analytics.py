@@ -0,0 +1,53 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+
+from core.analytics import graphique_enseignant
+from core.models import Absence, Enseignant, Note
+
+from .base import BaseTests
+
+
+class AnalyticsTests(BaseTests):
+    def setUp(self):
+        super().setUp()
+        self.prof = Enseignant.objects.create(user=User.objects.create_user('prof', password='x'), specialite='Maths')
+        self.autre = Enseignant.objects.create(user=User.objects.create_user('autre', password='x'), specialite='Arabe')
+        self.aya, self.omar = self.creer_eleve('Aya'), self.creer_eleve('Omar')
+        self.prof.eleves.add(self.aya, self.omar)
+
+    def test_note_invalide_seulement_son_enseignant(self):
+        Note.objects.create(eleve=self.aya, matiere='Maths', note=12, date=date.today(), enseignant=self.prof)
+        self.assertEqual(graphique_enseignant(self.prof, 'notes')['values'], [12.0])
+        self.assertEqual(graphique_enseignant(self.autre, 'notes')['values'], [])
+
+        Note.objects.create(eleve=self.omar, matiere='Maths', note=16, date=date.today(), enseignant=self.prof)
+        self.assertEqual(graphique_enseignant(self.prof, 'notes')['values'], [14.0])
+        # Graphiques de l'autre enseignant toujours servis par le cache
+        with self.assertNumQueries(0):
+            graphique_enseignant(self.autre, 'notes')
+
+    def test_absence_d_un_eleve(self):
+        self.assertEqual(graphique_enseignant(self.prof, 'absences')['values'], [])
+        absence = Absence.objects.create(eleve=self.aya, date=date.today())
+        self.assertEqual(graphique_enseignant(self.prof, 'absences')['values'], [1])
+        absence.delete()
+        self.assertEqual(graphique_enseignant(self.prof, 'absences')['values'], [])
+
+    def test_changement_de_classe_et_suppression(self):
+        self.assertEqual(graphique_enseignant(self.prof, 'classes')['values'], [2])
+
+        self.aya.classe = 'CE2'
+        self.aya.save()
+        self.assertEqual(graphique_enseignant(self.prof, 'classes'), {'labels': ['CE1', 'CE2'], 'values': [1, 1]})
+        self.omar.delete()
+        self.assertEqual(graphique_enseignant(self.prof, 'classes'), {'labels': ['CE2'], 'values': [1]})
+
+    def test_vue_reservee_aux_enseignants(self):
+        parent, _ = self.creer_parent('parent')
+        self.client.force_login(parent)
+        self.assertEqual(self.client.get('/enseignant/dashboard/charts/classes/').status_code, 403)
+
+        self.client.force_login(self.prof.user)
+        self.assertEqual(self.client.get('/enseignant/dashboard/charts/classes/').json()['values'], [2])
+        self.assertEqual(self.client.get('/enseignant/dashboard/charts/inconnu/').status_code, 404)
@@ -0,0 +1,35 @@
+from rest_framework.test import APIClient
+
+from core.models import Notification
+
+from .base import BaseTests
+
+
+class BoiteTests(BaseTests):
+    def setUp(self):
+        super().setUp()
+        self.parent, _ = self.creer_parent('parent')
+        # API authentifiée par JWT
+        self.client = APIClient()
+        self.client.force_authenticate(self.parent)
+        for i in range(3):
+            Notification.objects.create(user=self.parent, titre=f'n{i}', message='m')
+
+    def non_lues(self):
+        return self.client.get('/api/notifications/non_lues/').json()['non_lues']
+
+    def test_compteur_suit_les_lectures(self):
+        self.assertEqual(self.non_lues(), 3)
+        notification = Notification.objects.filter(user=self.parent).first()
+        self.client.post(f'/api/notifications/{notification.pk}/lire/')
+        self.assertEqual(self.non_lues(), 2)
+        Notification.objects.create(user=self.parent, titre='n', message='m')
+        self.assertEqual(self.non_lues(), 3)
+        self.client.post('/api/notifications/tout_lire/')
+        self.assertEqual(self.non_lues(), 0)
+
+    def test_identifiant_invalide(self):
+        self.assertEqual(self.client.post('/api/notifications/abc/lire/').status_code, 404)
+        autre, _ = self.creer_parent('autre')
+        notification = Notification.objects.create(user=autre, titre='n', message='m')
+        self.assertEqual(self.client.post(f'/api/notifications/{notification.pk}/lire/').status_code, 404)
@@ -0,0 +1,35 @@
+from unittest import mock
+
+from core import carte
+from core.models import Transport
+
+from .base import BaseTests
+
+EMPRISE = (-8, 33, -7, 34)
+
+
+class CarteTests(BaseTests):
+    def test_regroupement_selon_le_zoom(self):
+        aya = self.creer_eleve('Aya', numero_bus='B-1', domicile=(33.5700, -7.5900))
+        self.creer_eleve('Omar', domicile=(33.5701, -7.5901))
+        self.assertEqual(carte.marqueurs(*EMPRISE, zoom=5), [{'latitude': 33.57005, 'longitude': -7.59005, 'nombre': 2}])
+        marqueurs = sorted(carte.marqueurs(*EMPRISE, zoom=20), key=lambda m: m['latitude'])
+        self.assertEqual([m['nombre'] for m in marqueurs], [1, 1])
+        self.assertEqual((marqueurs[0]['eleve_id'], marqueurs[0]['numero_bus']), (aya.id, 'B-1'))
+        # Hors de l'emprise
+        self.assertEqual(carte.marqueurs(0, 0, 1, 1, zoom=5), [])
+
+    def test_index_invalide_pendant_le_chargement_non_installe(self):
+        self.creer_eleve('Aya', domicile=(33.5700, -7.5900))
+        filtrer = Transport.objects.filter
+
+        def charger_puis_modifier(*args, **kwargs):
+            # Un transport est ajouté entre la lecture des lignes et l'installation de l'index
+            lignes = list(filtrer(*args, **kwargs).values_list('eleve_id', 'numero_bus', 'latitude', 'longitude'))
+            self.creer_eleve('Omar', domicile=(33.6500, -7.5900))
+            return mock.Mock(values_list=mock.Mock(return_value=lignes))
+
+        with mock.patch.object(Transport.objects, 'filter', side_effect=charger_puis_modifier):
+            self.assertEqual(len(carte.marqueurs(*EMPRISE, zoom=15)), 1)
+        # L'index périmé n'a pas été gardé : le nouveau transport apparaît sans attendre CARTE_INDEX_TTL
+        self.assertEqual(len(carte.marqueurs(*EMPRISE, zoom=15)), 2)
@@ -0,0 +1,12 @@
+from django.test import SimpleTestCase, override_settings
+
+from core.checks import verifier_cache_partage
+
+
+class ChecksTests(SimpleTestCase):
+    def test_cache_local_signale(self):
+        self.assertEqual([w.id for w in verifier_cache_partage(None)], ['core.W001'])
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}})
+    def test_cache_partage(self):
+        self.assertEqual(verifier_cache_partage(None), [])
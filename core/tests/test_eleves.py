@@ -0,0 +1,68 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth.models import User
+
+from core.models import Absence, Enseignant, Note
+
+from .base import BaseTests
+
+
+class ListeElevesTests(BaseTests):
+    def setUp(self):
+        super().setUp()
+        self.prof = Enseignant.objects.create(user=User.objects.create_user('prof', password='x'), specialite='Maths')
+        self.client.force_login(self.prof.user)
+
+    def creer_eleves(self, nombre, classe='CE1'):
+        eleves = []
+        for i in range(nombre):
+            eleve = self.creer_eleve(f'E{i}', classe=classe)
+            self.prof.eleves.add(eleve)
+            Note.objects.create(eleve=eleve, matiere='Maths', note=10, date=date.today())
+            Absence.objects.create(eleve=eleve, date=date.today())
+            eleves.append(eleve)
+        return eleves
+
+    def page(self, requete=''):
+        reponse = self.client.get(f'/eleves/{requete}')
+        ids = [d['eleve'].id for d in reponse.context['donnees_eleves']]
+        return ids, reponse.context['curseur_precedent'], reponse.context['curseur_suivant']
+
+    def test_nombre_de_requetes_constant(self):
+        self.creer_eleves(3)
+        # Session, utilisateur, élèves annotés, deux prefetch, profil (gabarit)
+        with self.assertNumQueries(6):
+            self.client.get('/eleves/')
+        self.creer_eleves(5)
+        with self.assertNumQueries(6):
+            reponse = self.client.get('/eleves/')
+        donnees = reponse.context['donnees_eleves'][0]
+        self.assertEqual((donnees['nb_absences'], len(donnees['notes'])), (1, 1))
+
+    @mock.patch('core.views.ELEVES_PAR_PAGE', 2)
+    def test_curseurs_apres_et_avant(self):
+        ids = [eleve.id for eleve in self.creer_eleves(5)]
+
+        page, precedent, suivant = self.page()
+        self.assertEqual((page, precedent, suivant), (ids[:2], '', f'apres={ids[1]}'))
+        page, precedent, suivant = self.page(f'?{suivant}')
+        self.assertEqual((page, precedent, suivant), (ids[2:4], f'avant={ids[2]}', f'apres={ids[3]}'))
+        page, _, suivant = self.page(f'?{suivant}')
+        self.assertEqual((page, suivant), (ids[4:], ''))
+
+        # Page précédente : lue à rebours puis remise dans l'ordre croissant
+        page, precedent, suivant = self.page(f'?avant={ids[4]}')
+        self.assertEqual((page, precedent, suivant), (ids[2:4], f'avant={ids[2]}', f'apres={ids[3]}'))
+        page, precedent, _ = self.page(f'?{precedent}')
+        self.assertEqual((page, precedent), (ids[:2], ''))
+
+    @mock.patch('core.views.ELEVES_PAR_PAGE', 2)
+    def test_filtres_conserves_dans_les_curseurs(self):
+        self.creer_eleves(2, classe='CE2')
+        ids = [eleve.id for eleve in self.creer_eleves(3)]
+
+        page, _, suivant = self.page('?classe=CE1')
+        self.assertEqual((page, suivant), (ids[:2], f'classe=CE1&apres={ids[1]}'))
+        page, precedent, _ = self.page(f'?{suivant}')
+        self.assertEqual((page, precedent), (ids[2:], f'classe=CE1&avant={ids[2]}'))
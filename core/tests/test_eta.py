@@ -0,0 +1,63 @@
+from unittest import mock
+
+from django.test import override_settings
+
+from core.eta import FACTEUR_DETOUR, eta_transport, mettre_a_jour_eta
+
+from .base import DEPOT, BaseTests
+
+# Un centième de degré de latitude, en mètres
+CENTIEME = 1111.95
+
+
+@override_settings(ETA_VITESSE_DEFAUT=6, ETA_TTL=600)
+class EtaTests(BaseTests):
+    def setUp(self):
+        super().setUp()
+        self.parent, _ = self.creer_parent('parent')
+        # Créés dans un ordre différent de la tournée
+        self.omar = self.creer_eleve('Omar', self.parent, 'B-1', (DEPOT[0] + 0.03, DEPOT[1]))
+        self.aya = self.creer_eleve('Aya', self.parent, 'B-1', (DEPOT[0] + 0.01, DEPOT[1]))
+        self.sara = self.creer_eleve('Sara', self.parent, 'B-1', (DEPOT[0] + 0.02, DEPOT[1]))
+
+    def ping(self, instant, latitude):
+        with mock.patch('core.eta.time.time', return_value=instant):
+            mettre_a_jour_eta('B-1', latitude, DEPOT[1])
+
+    def eta(self, eleve, instant):
+        with mock.patch('core.eta.time.time', return_value=instant):
+            return eta_transport(eleve.transport)
+
+    def test_tournee_au_plus_proche_voisin_et_detour(self):
+        self.ping(1000, DEPOT[0])
+        for eleve, arrets in ((self.aya, 1), (self.sara, 2), (self.omar, 3)):
+            self.assertAlmostEqual(self.eta(eleve, 1000)['distance_m'], arrets * CENTIEME * FACTEUR_DETOUR, delta=3)
+
+    def test_vitesse_lissee(self):
+        # Premier ping : vitesse de service par défaut
+        self.ping(1000, DEPOT[0])
+        self.assertAlmostEqual(self.eta(self.aya, 1000)['secondes'], CENTIEME * FACTEUR_DETOUR / 6, delta=1)
+
+        # 10 m/s, puis 5 m/s : 0.3 * 5 + 0.7 * 10 = 8.5 m/s
+        self.ping(1000 + CENTIEME / 2 / 10, DEPOT[0] + 0.005)
+        instant = 1000 + CENTIEME / 2 / 10 + CENTIEME / 4 / 5
+        self.ping(instant, DEPOT[0] + 0.0075)
+        restant = CENTIEME / 4 * FACTEUR_DETOUR
+        self.assertAlmostEqual(self.eta(self.aya, instant)['secondes'], restant / 8.5, delta=1)
+
+        # Bus arrêté (vitesse lissée sous VITESSE_MIN)
+        for i in range(1, 20):
+            self.ping(instant + i * 60, DEPOT[0] + 0.0075)
+        self.assertAlmostEqual(self.eta(self.aya, instant + 19 * 60)['secondes'], restant / 6, delta=1)
+
+    def test_vue_reservee_au_parent(self):
+        autre, _ = self.creer_parent('autre')
+        self.client.force_login(autre)
+        self.assertEqual(self.client.get(f'/transport/eta/{self.aya.id}/').status_code, 403)
+
+        self.client.force_login(self.parent)
+        self.assertEqual(self.client.get(f'/transport/eta/{self.aya.id}/').json(), {'status': 'no_eta'})
+        mettre_a_jour_eta('B-1', *DEPOT)
+        reponse = self.client.get(f'/transport/eta/{self.aya.id}/').json()
+        self.assertEqual(reponse['status'], 'ok')
+        self.assertEqual(set(reponse['eta']), {'secondes', 'heure', 'distance_m'})
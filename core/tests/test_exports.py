@@ -0,0 +1,51 @@
+import csv
+import io
+import json
+from datetime import date
+
+from django.contrib.auth.models import User
+
+from core.models import Enseignant, Note, Profile
+
+from .base import BaseTests
+
+
+class ExportsTests(BaseTests):
+    def setUp(self):
+        super().setUp()
+        self.prof = Enseignant.objects.create(user=User.objects.create_user('prof', password='x'), specialite='Maths')
+        aya, omar = self.creer_eleve('Aya'), self.creer_eleve('Omar', classe='CE2')
+        Note.objects.create(eleve=aya, matiere='Maths', note=12, date=date(2026, 1, 5), enseignant=self.prof)
+        Note.objects.create(eleve=aya, matiere='Arabe', note=15, date=date(2026, 1, 6), enseignant=self.prof)
+        Note.objects.create(eleve=omar, matiere='Maths', note=9, date=date(2026, 1, 7), enseignant=self.prof)
+
+    def exporter(self, url):
+        reponse = self.client.get(url)
+        self.assertTrue(reponse.streaming)
+        return reponse, b''.join(reponse.streaming_content).decode()
+
+    def test_csv_filtre(self):
+        self.client.force_login(self.prof.user)
+        reponse, contenu = self.exporter('/notes/gerer/?export=csv&classe=CE1&min_note=13')
+        self.assertEqual(reponse['Content-Disposition'], 'attachment; filename="notes_enseignant.csv"')
+        self.assertEqual(list(csv.reader(io.StringIO(contenu))), [
+            ['Eleve', 'Classe', 'Matiere', 'Note', 'Date'],
+            ['Test Aya', 'CE1', 'Arabe', '15.0', '2026-01-06'],
+        ])
+
+    def test_jsonl_avec_enseignant(self):
+        admin = User.objects.create_user('admin', password='x')
+        Profile.objects.update_or_create(user=admin, defaults={'role': 'admin'})
+        self.client.force_login(admin)
+        reponse, contenu = self.exporter('/notes/gerer/admin/?export=jsonl&matiere=maths')
+        self.assertTrue(reponse['Content-Type'].startswith('application/x-ndjson'))
+        lignes = [json.loads(ligne) for ligne in contenu.splitlines()]
+        # Plus récentes en premier
+        self.assertEqual([(l['eleve'], l['note'], l['date']) for l in lignes], [
+            ('Test Omar', 9.0, '2026-01-07'), ('Test Aya', 12.0, '2026-01-05'),
+        ])
+        self.assertEqual({l['enseignant'] for l in lignes}, {'prof'})
+
+        _, contenu = self.exporter('/notes/gerer/admin/?export=csv&date_fin=2026-01-05')
+        self.assertEqual(contenu.splitlines()[0], 'Eleve,Classe,Matiere,Note,Date,Enseignant')
+        self.assertEqual(contenu.splitlines()[1:], ['Test Aya,CE1,Maths,12.0,2026-01-05,prof'])
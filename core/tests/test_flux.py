@@ -0,0 +1,57 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.test import override_settings
+
+from core import positions
+from core.live import flux_position
+from core.models import Eleve
+
+from .base import DOMICILE, BaseTests
+
+
+def _donnees(morceau):
+    evenement, donnees = morceau.strip().split('\n')
+    return evenement, json.loads(donnees[len('data: '):])
+
+
+@override_settings(TRANSPORT_STREAM_INTERVAL=0.01, TRANSPORT_STREAM_DUREE=5, TRANSPORT_FLUSH_INTERVAL=3600)
+class FluxPositionTests(BaseTests):
+    def setUp(self):
+        super().setUp()
+        self.parent, _ = self.creer_parent('parent')
+        self.eleve = self.creer_eleve('Aya', self.parent)
+        self.url = f'/transport/position/{self.eleve.id}/stream/'
+
+    def test_enfant_d_un_autre_parent(self):
+        autre, _ = self.creer_parent('autre')
+        self.client.force_login(autre)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_wsgi_refuse(self):
+        self.client.force_login(self.parent)
+        reponse = self.client.get(self.url)
+        self.assertEqual((reponse.status_code, reponse.json()), (501, {'error': 'asgi_required'}))
+
+    async def test_flux_asgi(self):
+        await self.async_client.aforce_login(self.parent)
+        reponse = await self.async_client.get(self.url)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(reponse['Content-Type'], 'text/event-stream')
+        self.assertEqual(reponse['Cache-Control'], 'no-cache')
+
+    async def test_evenement_seulement_quand_la_position_change(self):
+        eleve = await Eleve.objects.select_related('transport').aget(pk=self.eleve.pk)
+        flux = flux_position(eleve)
+        try:
+            self.assertEqual(await anext(flux), 'retry: 10\n\n')
+            evenement, donnees = _donnees(await anext(flux))
+            self.assertEqual(evenement, 'event: position')
+            # Pas encore de ping : emplacement saisi du transport
+            self.assertEqual((donnees['status'], donnees['latitude'], donnees['longitude']), ('ok', *DOMICILE))
+
+            await sync_to_async(positions.enregistrer_position)(self.eleve.id, 33.6, -7.6)
+            _, donnees = _donnees(await anext(flux))
+            self.assertEqual((donnees['latitude'], donnees['longitude']), (33.6, -7.6))
+        finally:
+            await flux.aclose()
@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.test import override_settings
+
+from core.metrics import registre
+from core.models import Eleve, Profile
+
+from .base import BaseTests
+
+
+class MetriquesTests(BaseTests):
+    def test_requete_mesuree(self):
+        avant = registre.exporter()
+        self.client.get('/login/')
+        apres = registre.exporter()
+        self.assertNotEqual(avant, apres)
+        self.assertIn('core_view_latency_seconds_count{view="login"}', apres)
+        self.assertIn('core_view_sql_queries_count{view="login"}', apres)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_acces_admin_ou_jeton(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        reponse = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(reponse.status_code, 200)
+        self.assertIn('# TYPE core_view_sql_queries histogram', reponse.content.decode())
+
+        admin = User.objects.create_user('admin', password='x')
+        Profile.objects.update_or_create(user=admin, defaults={'role': 'admin'})
+        self.client.force_login(admin)
+        self.assertEqual(self.client.get('/metrics/').status_code, 200)
+
+    def test_ecritures_comptees_hors_requete(self):
+        def lignes_ecrites(texte):
+            prefixe = 'core_sql_rows_written_total{table="core_eleve",operation="insert"} '
+            return next((int(l[len(prefixe):]) for l in texte.splitlines() if l.startswith(prefixe)), 0)
+
+        avant = lignes_ecrites(registre.exporter())
+        self.creer_eleve('Aya')
+        Eleve.objects.bulk_create([Eleve(nom='Test', prenom='Omar'), Eleve(nom='Test', prenom='Sara')])
+        self.assertEqual(lignes_ecrites(registre.exporter()) - avant, 3)
@@ -0,0 +1,101 @@
+import smtplib
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.test import override_settings
+
+from core import sms, taches
+from core.models import Notification, Profile, TacheNotification
+from core.notifications import eleves_cibles, notifier_parents
+from core.sms import BaseSmsBackend
+
+from .base import BaseTests
+
+
+class SmsRefuse(BaseSmsBackend):
+    # Passerelle de test : refuse les numéros se terminant par 9
+    def send_many(self, messages, echecs=None):
+        envoyes = 0
+        for numero, texte in messages:
+            if numero.endswith('9'):
+                if echecs is not None:
+                    echecs.append((numero, texte, RuntimeError('refusé')))
+            else:
+                sms.boite_envoi.append((numero, texte))
+                envoyes += 1
+        return envoyes
+
+
+@override_settings(DEFAULT_FROM_EMAIL='ecole@example.com')
+class NotificationsGroupeesTests(BaseTests):
+    def setUp(self):
+        super().setUp()
+        self.parent, self.fiche = self.creer_parent('parent', telephone='+212600000009')
+        self.aya = self.creer_eleve('Aya', self.parent, 'B-1')
+        self.omar = self.creer_eleve('Omar', self.parent, 'B-1')
+        # Parent.eleve ne désigne qu'un des enfants de la fratrie
+        self.fiche.eleve = self.aya
+        self.fiche.save()
+        self.autre, _ = self.creer_parent('autre', telephone='+212600000002', email='autre@example.com')
+        self.creer_eleve('Sara', self.autre, 'B-1')
+
+    def test_fratrie_notifiee_pour_chaque_enfant(self):
+        envois = notifier_parents(eleves_cibles(numero_bus='B-1'), 'Sortie', 'Bonjour {prenom}', sms=True)
+        self.assertEqual((envois['notifications'], envois['emails'], envois['sms']), (3, 3, 3))
+        self.assertEqual(
+            sorted(m.body.splitlines()[-1] for m in mail.outbox if m.to == ['parent@example.com']),
+            ['Bonjour Aya', 'Bonjour Omar'],
+        )
+        self.assertEqual({m.from_email for m in mail.outbox}, {'ecole@example.com'})
+
+    @override_settings(SMS_BACKEND='core.tests.test_notifications.SmsRefuse')
+    def test_seuls_les_sms_refuses_sont_renvoyes(self):
+        envois = notifier_parents(eleves_cibles(numero_bus='B-1'), 'Sortie', 'Bonjour {prenom}', sms=True)
+        self.assertEqual((envois['sms'], envois['sms_en_file']), (1, 2))
+        self.assertEqual(sorted(TacheNotification.objects.values_list('eleve__prenom', 'message')), [
+            ('Aya', 'Sortie : Bonjour Aya'), ('Omar', 'Sortie : Bonjour Omar'),
+        ])
+
+        sms.boite_envoi.clear()
+        with override_settings(SMS_BACKEND='core.sms.LocmemBackend'):
+            taches.traiter_lot()
+        self.assertEqual(sorted(texte for _, texte in sms.boite_envoi), ['Sortie : Bonjour Aya', 'Sortie : Bonjour Omar'])
+
+    def test_echec_smtp_emails_en_file_et_sms_envoyes(self):
+        with mock.patch('core.notifications.send_mass_mail', side_effect=smtplib.SMTPServerDisconnected('coupé')):
+            envois = notifier_parents(eleves_cibles(numero_bus='B-1'), 'Sortie', 'Bonjour {prenom}', sms=True)
+        self.assertEqual((envois['emails'], envois['emails_en_file'], envois['sms']), (0, 3, 3))
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertEqual(len(sms.boite_envoi), 3)
+        self.assertEqual(TacheNotification.objects.filter(canal='email').count(), 3)
+
+        taches.traiter_lot()
+        self.assertEqual(
+            sorted(m.body.splitlines()[-1] for m in mail.outbox if m.to == ['parent@example.com']),
+            ['Bonjour Aya', 'Bonjour Omar'],
+        )
+        self.assertEqual(set(TacheNotification.objects.values_list('statut', flat=True)), {'envoyee'})
+
+    def test_vue_groupe_valide_le_corps(self):
+        admin = User.objects.create_user('admin', password='x')
+        Profile.objects.update_or_create(user=admin, defaults={'role': 'admin'})
+        self.client.force_login(admin)
+        for corps in ('[1]', '"B-1"', '{"numero_bus": 5, "titre": "a", "message": "b"}'):
+            reponse = self.client.post('/notifications/groupe/', corps, content_type='application/json')
+            self.assertEqual(reponse.status_code, 400, corps)
+        reponse = self.client.post(
+            '/notifications/groupe/', {'numero_bus': 'B-1', 'titre': 'Sortie', 'message': 'Demain'},
+        )
+        self.assertEqual(reponse.json()['notifications'], 3)
+
+    def test_vue_groupe_repond_malgre_echec_smtp(self):
+        admin = User.objects.create_user('admin', password='x')
+        Profile.objects.update_or_create(user=admin, defaults={'role': 'admin'})
+        self.client.force_login(admin)
+        with mock.patch('core.notifications.send_mass_mail', side_effect=ConnectionRefusedError):
+            reponse = self.client.post(
+                '/notifications/groupe/', {'numero_bus': 'B-1', 'titre': 'Sortie', 'message': 'Demain'},
+            )
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(reponse.json()['emails_en_file'], 3)
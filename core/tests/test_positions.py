@@ -0,0 +1,90 @@
+import time
+from unittest import mock
+
+from django.test import override_settings
+
+from core import positions
+from core.models import Bus, TraceBus, Transport
+from core.traces import lire_points
+
+from .base import DOMICILE, BaseTests
+
+
+@override_settings(TRANSPORT_FLUSH_INTERVAL=3600, TRACE_FLUSH_INTERVAL=3600, GPS_TRACKER_TOKEN='')
+class PositionsTests(BaseTests):
+    def setUp(self):
+        super().setUp()
+        self.bus = Bus.objects.create(numero_bus='B-1')
+        self.eleve = self.creer_eleve('Aya', numero_bus='B-1')
+
+    def test_position_eleve_differee_sans_deplacer_l_arret(self):
+        self.assertTrue(positions.enregistrer_position(self.eleve.id, 33.6, -7.6))
+        self.assertFalse(positions.enregistrer_position(self.eleve.id + 1, 33.6, -7.6))
+        transport = Transport.objects.get(eleve=self.eleve)
+        self.assertIsNone(transport.latitude_actuelle)
+        # Pings suivants : cache seulement
+        with self.assertNumQueries(0):
+            positions.enregistrer_position(self.eleve.id, 33.61, -7.6)
+
+        positions.vider_positions()
+        transport.refresh_from_db()
+        self.assertEqual((transport.latitude_actuelle, transport.longitude_actuelle), (33.61, -7.6))
+        self.assertEqual((transport.latitude, transport.longitude), DOMICILE)
+
+    def test_vidage_programme_sans_nouveau_ping(self):
+        # Minuterie seulement : pas d'écriture par l'ajout lui-même
+        tampon = positions.tampon
+        with override_settings(TRANSPORT_FLUSH_INTERVAL=0.05):
+            tampon.abandonner()
+            with mock.patch.object(tampon, 'vider', side_effect=tampon.abandonner) as vider:
+                positions.enregistrer_position(self.eleve.id, 33.6, -7.6)
+                vider.assert_not_called()
+                time.sleep(0.3)
+            vider.assert_called_once_with()
+
+    def test_position_bus_differee(self):
+        self.assertEqual(positions.enregistrer_positions_bus([('B-1', 33.55, -7.59), ('B-1', 33.56, -7.59)]), {'B-1'})
+        self.assertEqual(positions.position_transport(self.eleve.transport)['latitude'], 33.56)
+        # Bus connu en cache : lot suivant sans requête
+        with self.assertNumQueries(0):
+            positions.enregistrer_positions_bus([('B-1', 33.57, -7.59)])
+        self.assertEqual(positions.position_transport(self.eleve.transport)['latitude'], 33.57)
+
+        positions.vider_positions()
+        self.bus.refresh_from_db()
+        self.assertEqual((self.bus.latitude, self.bus.longitude), (33.57, -7.59))
+
+    def test_bus_inconnu_ignore_et_mis_en_cache(self):
+        self.assertEqual(positions.enregistrer_positions_bus([('INCONNU', 33.5, -7.5)]), set())
+        self.assertFalse(Bus.objects.filter(numero_bus='INCONNU').exists())
+
+        transport = self.eleve.transport
+        transport.numero_bus = 'INCONNU'
+        transport.save()
+        self.assertIsNone(positions.position_transport(transport))
+        with self.assertNumQueries(0):
+            self.assertIsNone(positions.position_transport(transport))
+
+    def test_vue_rejette_coordonnees_non_finies_ou_hors_bornes(self):
+        corps = '{"positions": [%s]}' % ', '.join([
+            '{"numero_bus": "B-1", "latitude": "inf", "longitude": -7.59}',
+            '{"numero_bus": "B-1", "latitude": NaN, "longitude": -7.59}',
+            '{"numero_bus": "B-1", "latitude": 500, "longitude": -7.59}',
+            '{"numero_bus": "B-2", "latitude": 33.5, "longitude": -7.59}',
+            '{"numero_bus": "B-1", "latitude": 33.5, "longitude": -7.59}',
+        ])
+        reponse = self.client.post('/transport/bus/positions/', corps, content_type='application/json')
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(reponse.json()['rejetees'], [0, 1, 2, 3])
+        self.assertEqual(reponse.json()['acceptees'], 1)
+        self.assertFalse(Bus.objects.filter(numero_bus='B-2').exists())
+
+    def test_trace_ajoutee_en_sql_a_chaque_vidage(self):
+        positions.enregistrer_positions_bus([('B-1', 33.55, -7.59), ('B-1', 33.56, -7.59)])
+        positions.vider_positions()
+        positions.enregistrer_positions_bus([('B-1', 33.57, -7.59)])
+        positions.vider_positions()
+
+        trace = TraceBus.objects.get(bus=self.bus)
+        self.assertEqual(trace.nb_points, 3)
+        self.assertEqual([round(p[0], 2) for p in lire_points(trace)], [33.55, 33.56, 33.57])
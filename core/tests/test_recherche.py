@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+
+from core.models import Eleve
+from core.search import rechercher_eleves
+
+from .base import BaseTests
+
+
+class RechercheTests(BaseTests):
+    def setUp(self):
+        super().setUp()
+        self.jean = Eleve.objects.create(nom='Dupont', prenom='Jean', classe='CE1')
+        self.ali = Eleve.objects.create(nom='Dupontel', prenom='Ali', classe='CE2')
+        self.sami = Eleve.objects.create(nom='Ben Dupont', prenom='Sami', classe='CE1')
+        self.omar = Eleve.objects.create(nom='Adupont', prenom='Omar', classe='CM1')
+        self.helene = Eleve.objects.create(nom='Hélène', prenom='Éloïse', classe='CM2')
+
+    def test_sans_accents_ni_casse(self):
+        for requete in ('helene eloise', 'HÉLÈNE', 'éloïse'):
+            self.assertEqual(rechercher_eleves(requete), [self.helene], requete)
+
+    def test_classement(self):
+        # Préfixe, début de mot, puis simple sous-chaîne
+        self.assertEqual(rechercher_eleves('dupont'), [self.jean, self.ali, self.sami, self.omar])
+        # Nom complet identique en tête
+        self.assertEqual(rechercher_eleves('Dupont Jean')[0], self.jean)
+        # Chaque mot en début de mot
+        self.assertEqual(rechercher_eleves('sami dup'), [self.sami])
+        # Assez de préfixes : la recherche "contient" n'est pas faite
+        self.assertEqual(rechercher_eleves('dupont', limite=2), [self.jean, self.ali])
+
+    def test_autocomplete(self):
+        self.client.force_login(User.objects.create_user('prof', password='x'))
+        self.assertEqual(self.client.get('/recherche/autocomplete/?q=d').json(), {'resultats': []})
+        resultats = self.client.get('/recherche/autocomplete/?q=du').json()['resultats']
+        self.assertEqual(resultats[0], {
+            'id': self.jean.id, 'nom': 'Dupont', 'prenom': 'Jean', 'classe': 'CE1', 'label': 'Dupont Jean (CE1)',
+        })
+        self.assertEqual(len(resultats), 4)
+
+    def test_page_avec_plusieurs_resultats(self):
+        # Plusieurs élèves correspondent : liste, sans fiche (MultipleObjectsReturned auparavant)
+        reponse = self.client.get('/recherche/?q=dupont')
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(len(reponse.context['resultats']), 4)
+        self.assertIsNone(reponse.context['eleve'])
+
+        reponse = self.client.get(f'/recherche/?q=dupont&eleve={self.sami.id}')
+        self.assertEqual(reponse.context['eleve'], self.sami)
+        self.assertEqual(self.client.get('/recherche/?q=jean').context['eleve'], self.jean)
@@ -0,0 +1,36 @@
+from django.core import mail
+
+from core import taches
+from core.models import Notification, TacheNotification
+from core.regroupement import notifier_arrivee
+
+from .base import BaseTests
+
+
+class RegroupementTests(BaseTests):
+    def setUp(self):
+        super().setUp()
+        self.parent, _ = self.creer_parent('parent')
+        self.eleve = self.creer_eleve('Aya', self.parent, 'B-1')
+
+    def test_arrivees_repetees_comptees(self):
+        self.assertTrue(notifier_arrivee(self.eleve))
+        self.assertFalse(notifier_arrivee(self.eleve))
+        notification = Notification.objects.get(user=self.parent)
+        self.assertEqual(notification.occurrences, 2)
+        self.assertEqual(TacheNotification.objects.count(), 2)
+
+    def test_depart_repete_compte_sans_renvoi(self):
+        # Départ réémis (tâche rejouée, trajet repris par un autre worker)
+        taches.mettre_en_file_bus('B-1')
+        taches.mettre_en_file_bus('B-1')
+        self.assertEqual(taches.traiter_lot(), 2)
+        self.assertEqual(
+            sorted(TacheNotification.objects.values_list('canal', 'statut')),
+            [('depart_bus', 'envoyee'), ('depart_bus', 'ignoree'), ('email', 'en_attente')],
+        )
+        notification = Notification.objects.get(user=self.parent, type_notification='depart_bus')
+        self.assertEqual(notification.occurrences, 2)
+
+        taches.traiter_lot()
+        self.assertEqual([m.body for m in mail.outbox], ["🚌 Départ du bus : Le bus de Aya Test vient de partir."])
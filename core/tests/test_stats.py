@@ -0,0 +1,31 @@
+from datetime import date
+
+from core.models import Absence, EleveStats, Note
+
+from .base import BaseTests
+
+
+class StatsTests(BaseTests):
+    def test_notes_et_absences_tenues_par_signaux(self):
+        eleve = self.creer_eleve('Aya')
+        note = Note.objects.create(eleve=eleve, matiere='Maths', note=12, date=date.today())
+        Note.objects.create(eleve=eleve, matiere='Arabe', note=16, date=date.today())
+        Absence.objects.create(eleve=eleve, date=date.today())
+        stats = EleveStats.objects.get(pk=eleve.pk)
+        self.assertEqual((stats.somme_notes, stats.nb_notes, stats.nb_absences), (28, 2, 1))
+
+        note.note = 8
+        note.save()
+        note = Note.objects.get(pk=note.pk)
+        note.delete()
+        stats.refresh_from_db()
+        self.assertEqual((stats.somme_notes, stats.nb_notes), (16, 1))
+
+    def test_changement_d_eleve_deplace_la_contribution(self):
+        aya, omar = self.creer_eleve('Aya'), self.creer_eleve('Omar')
+        note = Note.objects.create(eleve=aya, matiere='Maths', note=10, date=date.today())
+        Note.objects.create(eleve=omar, matiere='Maths', note=14, date=date.today())
+        note.eleve = omar
+        note.save()
+        self.assertEqual(EleveStats.objects.get(pk=aya.pk).nb_notes, 0)
+        self.assertEqual(EleveStats.objects.get(pk=omar.pk).somme_notes, 24)
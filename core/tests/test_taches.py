@@ -0,0 +1,53 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.test import override_settings
+from django.utils import timezone
+
+from core import sms, taches
+from core.models import Notification, TacheNotification
+
+from .base import BaseTests
+
+
+@override_settings(NOTIF_TENTATIVES_MAX=2, NOTIF_DELAI_BASE=30)
+class TachesTests(BaseTests):
+    def setUp(self):
+        super().setUp()
+        self.parent, _ = self.creer_parent('parent')
+        self.eleve = self.creer_eleve('Aya', self.parent, 'B-1')
+
+    def test_worker_envoie_chaque_canal(self):
+        taches.mettre_en_file([self.eleve])
+        taches.mettre_en_file_bus('B-1')
+        self.assertEqual(taches.traiter_lot(), 4)
+        # Le départ met en file l'email de chaque parent du bus (core.regroupement)
+        self.assertEqual(taches.traiter_lot(), 1)
+        self.assertEqual(set(TacheNotification.objects.values_list('statut', flat=True)), {'envoyee'})
+        self.assertEqual(len(sms.boite_envoi), 1)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(Notification.objects.filter(user=self.parent).count(), 2)
+
+    def test_echec_reprogramme_puis_abandonne(self):
+        tache, = taches.mettre_en_file([self.eleve], ('sms',))
+        with mock.patch.dict(taches.NOTIFICATEURS, {'sms': mock.Mock(side_effect=RuntimeError('passerelle'))}):
+            self.assertEqual(taches.traiter_lot(), 1)
+            tache.refresh_from_db()
+            self.assertEqual((tache.statut, tache.tentatives), ('en_attente', 1))
+            self.assertGreater(tache.prochain_essai, timezone.now())
+            # Pas encore due
+            self.assertEqual(taches.traiter_lot(), 0)
+
+            TacheNotification.objects.filter(pk=tache.pk).update(prochain_essai=timezone.now())
+            taches.traiter_lot()
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.tentatives), ('echouee', 2))
+        self.assertIn('passerelle', tache.derniere_erreur)
+
+    def test_reservation_expiree_reprise(self):
+        taches.mettre_en_file([self.eleve], ('app',))
+        self.assertEqual(len(taches.reserver(10)), 1)
+        self.assertEqual(taches.reserver(10), [])
+        TacheNotification.objects.update(reservee_jusqua=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(taches.reserver(10)), 1)
@@ -0,0 +1,73 @@
+import time
+from unittest import mock
+
+from django.core import mail
+from django.test import override_settings
+
+from core import trajets
+from core.geofence import arrets_du_bus, trajet_en_cours
+from core.models import TacheNotification
+
+from .base import DEPOT, DOMICILE, BaseTests
+
+
+@override_settings(TRAJET_DEPART_METRES=200, GEOFENCE_APPROCHE_METRES=800, GEOFENCE_RAYON_METRES=150, TRAJET_REPOS=600)
+class TrajetsTests(BaseTests):
+    def setUp(self):
+        super().setUp()
+        self.parent, _ = self.creer_parent('parent')
+        self.aya = self.creer_eleve('Aya', self.parent, 'B-1', DOMICILE)
+        self.omar = self.creer_eleve('Omar', self.parent, 'B-1', (33.5800, -7.5900))
+
+    def evenements(self, *position):
+        return [type_ for type_, _ in trajets.avancer_trajet('B-1', *position)]
+
+    def test_trajet_du_depart_au_dernier_arret(self):
+        self.assertEqual(self.evenements(*DEPOT), [])
+        self.assertEqual(self.evenements(DEPOT[0] + 0.005, DEPOT[1]), [trajets.DEPARTED])
+        trajet = trajet_en_cours('B-1')
+        self.assertIsNotNone(trajet)
+
+        self.assertEqual(self.evenements(33.5660, -7.5900), [trajets.APPROACHING])
+        self.assertEqual(self.evenements(*DOMICILE), [trajets.ARRIVED])
+        self.assertEqual(self.evenements(*DOMICILE), [])
+        self.assertEqual(trajet_en_cours('B-1'), trajet)
+        self.assertEqual(self.evenements(33.5800, -7.5900), [trajets.ARRIVED])
+        # Dernier arrêt : fin du trajet
+        self.assertIsNone(trajet_en_cours('B-1'))
+
+        # Retour au dépôt sans s'y arrêter : pas un nouveau départ
+        self.assertEqual(self.evenements(33.5650, -7.5900), [])
+        self.assertEqual(self.evenements(*DEPOT), [])
+        with mock.patch('core.trajets.time.time', return_value=time.time() + 700):
+            self.assertEqual(self.evenements(DEPOT[0] + 0.005, DEPOT[1]), [trajets.DEPARTED])
+
+    def test_depart_et_approche_mis_en_file(self):
+        trajets.avancer_trajets([('B-1', *DEPOT)])
+        trajets.avancer_trajets([('B-1', 33.5660, -7.5900)])
+        canaux = sorted(TacheNotification.objects.values_list('canal', 'numero_bus'))
+        self.assertEqual(canaux, [('depart_bus', 'B-1'), ('email', ''), ('sms', '')])
+        # Rien n'est envoyé pendant la requête GPS
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_etat_partage_entre_processus(self):
+        # Un autre worker (états du processus oubliés) ne réémet pas les événements déjà posés
+        self.evenements(*DEPOT)
+        self.evenements(DEPOT[0] + 0.005, DEPOT[1])
+        self.evenements(*DOMICILE)
+        self.assertIsNotNone(trajet_en_cours('B-1'))
+
+        trajets.oublier_trajets()
+        self.assertEqual(self.evenements(*DOMICILE), [])
+        # Reprend le trajet en cours, sans nouveau départ : l'arrivée chez Aya y est déjà
+        # posée, celle chez Omar termine le trajet
+        self.assertEqual(self.evenements(33.5800, -7.5900), [trajets.ARRIVED])
+        self.assertIsNone(trajet_en_cours('B-1'))
+
+    def test_changement_de_bus_retire_l_ancien_arret(self):
+        self.assertEqual(len(arrets_du_bus('B-1').eleve_ids), 2)
+        transport = self.aya.transport
+        transport.numero_bus = 'B-2'
+        transport.save()
+        self.assertEqual(arrets_du_bus('B-1').eleve_ids, [self.omar.id])
+        self.assertEqual(arrets_du_bus('B-2').eleve_ids, [self.aya.id])
@@ -0,0 +1,54 @@
+import struct
+import time
+
+from django.test import override_settings
+
+from core import positions
+from core.models import Bus, TraceBus
+from core.trames import RETARD_MAX, decoder_trame, positions_en_direct
+
+from .base import BaseTests
+
+
+@override_settings(TRANSPORT_FLUSH_INTERVAL=3600, TRACE_FLUSH_INTERVAL=3600, GPS_TRACKER_TOKEN='')
+class TramesTests(BaseTests):
+    def setUp(self):
+        super().setUp()
+        self.bus = Bus.objects.create(numero_bus='B-1')
+
+    def enregistrement(self, horodatage, latitude, bus_id=None):
+        return struct.pack('<IIff', bus_id or self.bus.id, horodatage, latitude, -7.59)
+
+    def test_decodage(self):
+        self.assertEqual(len(decoder_trame(self.enregistrement(1, 33.5) * 3)), 3)
+        for longueur in (0, 15, 17):
+            with self.assertRaises(ValueError):
+                decoder_trame(b'\0' * longueur)
+
+    def test_trame_binaire(self):
+        maintenant = int(time.time())
+        trame = b''.join([
+            self.enregistrement(maintenant, 33.56),
+            self.enregistrement(maintenant, 33.56, bus_id=999999),
+            self.enregistrement(maintenant, float('nan')),
+            self.enregistrement(maintenant + 3600, 33.56),
+            self.enregistrement(maintenant - 10, 33.55),
+        ])
+        reponse = self.client.post('/transport/bus/positions/', trame, content_type='application/octet-stream')
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(reponse.json()['rejetees'], [1, 2, 3])
+        positions.vider_positions()
+        # Positions triées par horodatage : la plus récente reste celle du bus
+        self.bus.refresh_from_db()
+        self.assertAlmostEqual(self.bus.latitude, 33.56, places=5)
+        self.assertEqual(TraceBus.objects.get(bus=self.bus).nb_points, 2)
+
+        reponse = self.client.post('/transport/bus/positions/', b'abc', content_type='application/octet-stream')
+        self.assertEqual(reponse.status_code, 400)
+
+    def test_positions_en_retard_pour_la_trace_seulement(self):
+        maintenant = time.time()
+        lot = [('B-1', 33.55, -7.59), ('B-1', 33.56, -7.59)]
+        self.assertEqual(
+            positions_en_direct(lot, [maintenant - RETARD_MAX - 1, maintenant]), [('B-1', 33.56, -7.59)],
+        )
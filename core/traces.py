@@ -0,0 +1,175 @@
+# core/traces.py
+#
+# Historique des positions des bus : une ligne TraceBus par bus et par jour dont
+# la colonne binaire reçoit, en ajout seul, des enregistrements de 12 octets
+# (latitude/longitude float32, horodatage uint32). Une journée de pings toutes
+# les 2 secondes tient en quelques centaines de kilo-octets au lieu de dizaines
+# de milliers de lignes. Les points sont accumulés en mémoire puis ajoutés par
+# lots, comme les positions (core.positions, core.tampons).
+#
+# La relecture simplifie le tracé avec Douglas–Peucker, avec une tolérance d'un
+# pixel au niveau de zoom demandé.
+
+import logging
+import math
+import struct
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import BinaryField, F, Func, Value
+from django.utils import timezone
+
+from .models import TraceBus
+from .tampons import TamponDiffere
+
+try:
+    import numpy as np
+except ImportError:  # repli en Python pur
+    np = None
+
+logger = logging.getLogger(__name__)
+
+ENREGISTREMENT = struct.Struct('<ffI')
+if np is not None:
+    DTYPE_POINT = np.dtype([('lat', '<f4'), ('lon', '<f4'), ('t', '<u4')])
+
+RAYON_TERRE_METRES = 6371000.0
+# Mètres par pixel au zoom 0 à l'équateur (tuiles Web Mercator de 256 px)
+METRES_PAR_PIXEL_ZOOM_0 = 156543.03392
+ZOOM_MAX = 22
+
+
+class _AjoutOctets(Func):
+    """Concaténation de deux colonnes binaires, dans la base."""
+
+    arg_joiner = ' || '
+    template = '(%(expressions)s)'
+    output_field = BinaryField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # || produit du texte sous SQLite : on revient en BLOB, octets inchangés
+        return self.as_sql(compiler, connection, template='CAST(%(expressions)s AS BLOB)', **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, function='CONCAT', template='%(function)s(%(expressions)s)', arg_joiner=', ',
+            **extra_context,
+        )
+
+
+class _TamponTraces(TamponDiffere):
+    """Points en attente d'ajout, par (bus, jour), pour ce processus."""
+
+    def __init__(self):
+        super().__init__('TRACE_FLUSH_INTERVAL')
+
+    def ajouter(self, points):
+        """points : [(bus_id, latitude, longitude, horodatage Unix), ...]"""
+        def fusionner(attente):
+            for bus_id, latitude, longitude, horodatage in points:
+                jour = timezone.localdate(datetime.fromtimestamp(horodatage, tz=dt_timezone.utc))
+                tampon = attente.setdefault((bus_id, jour), bytearray())
+                tampon += ENREGISTREMENT.pack(latitude, longitude, int(horodatage))
+
+        self._ajouter(fusionner)
+
+    def vider(self):
+        points = self._prendre()
+        if not points:
+            return 0
+
+        try:
+            with transaction.atomic():
+                TraceBus.objects.bulk_create(
+                    [TraceBus(bus_id=bus_id, jour=jour) for bus_id, jour in points], ignore_conflicts=True,
+                )
+                # Ajout en SQL (points = points || ajout) : la trace déjà stockée n'est ni relue
+                # ni renvoyée, et deux processus qui vident le même bus ne s'écrasent pas
+                for (bus_id, jour), ajout in points.items():
+                    TraceBus.objects.filter(bus_id=bus_id, jour=jour).update(
+                        points=_AjoutOctets(F('points'), Value(bytes(ajout), output_field=BinaryField())),
+                        nb_points=F('nb_points') + len(ajout) // ENREGISTREMENT.size,
+                    )
+        except Exception:
+            logger.exception("Échec de l'ajout de points à %s trace(s) de bus", len(points))
+            with self._verrou:
+                for cle, ajout in points.items():
+                    self._attente[cle] = ajout + self._attente.get(cle, bytearray())
+            return 0
+        return len(points)
+
+
+tampon_traces = _TamponTraces()
+
+
+def ajouter_points(points):
+    tampon_traces.ajouter(points)
+
+
+def lire_points(trace):
+    """[(latitude, longitude, horodatage), ...] d'une TraceBus, dans l'ordre d'arrivée."""
+    donnees = bytes(trace.points)
+    if np is not None:
+        tableau = np.frombuffer(donnees, dtype=DTYPE_POINT)
+        return list(zip(tableau['lat'].tolist(), tableau['lon'].tolist(), tableau['t'].tolist()))
+    return list(ENREGISTREMENT.iter_unpack(donnees))
+
+
+def tolerance_zoom(zoom, latitude):
+    """Un pixel, en mètres, au niveau de zoom donné."""
+    return METRES_PAR_PIXEL_ZOOM_0 * math.cos(math.radians(latitude)) / 2 ** zoom
+
+
+def douglas_peucker(x, y, tolerance):
+    """Indices des points conservés pour une polyligne plane (x, y en mètres)."""
+    n = len(x)
+    if n < 3:
+        return list(range(n))
+    garder = [False] * n
+    garder[0] = garder[-1] = True
+    pile = [(0, n - 1)]
+    while pile:
+        debut, fin = pile.pop()
+        if fin - debut < 2:
+            continue
+        dx, dy = x[fin] - x[debut], y[fin] - y[debut]
+        norme = math.hypot(dx, dy)
+        if np is not None:
+            px, py = x[debut + 1:fin] - x[debut], y[debut + 1:fin] - y[debut]
+            distances = np.abs(dy * px - dx * py) / norme if norme else np.hypot(px, py)
+            i = int(np.argmax(distances))
+            distance_max = float(distances[i])
+        else:
+            distance_max, i = -1.0, 0
+            for j in range(debut + 1, fin):
+                px, py = x[j] - x[debut], y[j] - y[debut]
+                d = abs(dy * px - dx * py) / norme if norme else math.hypot(px, py)
+                if d > distance_max:
+                    distance_max, i = d, j - debut - 1
+        if distance_max > tolerance:
+            k = debut + 1 + i
+            garder[k] = True
+            pile.append((debut, k))
+            pile.append((k, fin))
+    return [i for i, g in enumerate(garder) if g]
+
+
+def trace_simplifiee(trace, zoom):
+    """Points [latitude, longitude, horodatage] de la trace, simplifiés pour le zoom."""
+    points = lire_points(trace)
+    if len(points) < 3:
+        return [list(p) for p in points]
+
+    # Projection équirectangulaire locale : suffisante à l'échelle d'une ville
+    lat0 = points[0][0]
+    echelle_x = math.radians(1) * RAYON_TERRE_METRES * math.cos(math.radians(lat0))
+    echelle_y = math.radians(1) * RAYON_TERRE_METRES
+    if np is not None:
+        x = np.fromiter((p[1] for p in points), dtype=np.float64, count=len(points)) * echelle_x
+        y = np.fromiter((p[0] for p in points), dtype=np.float64, count=len(points)) * echelle_y
+    else:
+        x = [p[1] * echelle_x for p in points]
+        y = [p[0] * echelle_y for p in points]
+
+    indices = douglas_peucker(x, y, tolerance_zoom(zoom, lat0))
+    return [[round(points[i][0], 6), round(points[i][1], 6), points[i][2]] for i in indices]
@@ -0,0 +1,198 @@
+# core/trajets.py
+#
+# Machine à états des trajets de bus, avancée par les positions reçues
+# (transport_positions_bus) :
+#
+#   bus :    idle ──(s'éloigne de son point de départ)──> departed
+#            departed ──(dernier arrêt atteint, ou inactivité)──> idle
+#   arrêt :  departed ──(GEOFENCE_APPROCHE_METRES)──> approaching ──(GEOFENCE_RAYON_METRES)──> arrived
+#
+# Un trajet commence au départ, qui lui donne un identifiant (core.geofence.cle_trajet),
+# et se termine quand le bus a atteint tous ses arrêts ou quand il n'a plus bougé
+# depuis TRAJET_INACTIVITE secondes (l'identifiant expire du cache). Après le
+# dernier arrêt, le point de départ suit le bus jusqu'à ce qu'il reste TRAJET_REPOS
+# secondes au même endroit : le retour au dépôt n'est pas un nouveau départ.
+#
+# Chaque transition est posée avec cache.add, atomique sur tous les backends :
+# un événement (départ, approche, arrivée) n'est émis qu'une fois par trajet,
+# même si plusieurs workers reçoivent des pings du même bus. Les états déjà
+# franchis sont aussi mémorisés dans le processus, si bien qu'un ping ordinaire
+# ne coûte qu'un calcul de distances ; le trajet en cours n'est relu dans le
+# cache qu'une fois toutes les RELECTURE_TRAJET secondes.
+
+import math
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .geofence import RAYON_TERRE_METRES, arrets_du_bus, cle_arrivee, cle_trajet
+from .models import Eleve
+from .regroupement import notifier_une_fois
+from .taches import mettre_en_file, mettre_en_file_bus
+
+IDLE, DEPARTED, APPROACHING, ARRIVED = 'idle', 'departed', 'approaching', 'arrived'
+DUREE_ETAT = 24 * 3600
+RELECTURE_TRAJET = 60
+
+_verrou = threading.Lock()
+# {numero_bus: {'trajet': id | None, 'origine': point de départ | None, 'repere': (lat, lon),
+#               'relu_a': instant de la dernière relecture, 'arrets': {eleve_id: état}}}
+_etats = {}
+
+
+def _cle(numero_bus, trajet, *suite):
+    return ':'.join(['core:trajet', numero_bus, trajet, *map(str, suite)])
+
+
+def _cle_origine(numero_bus):
+    # Point de départ du prochain trajet : {'latitude', 'longitude', 'depuis' (instant Unix)}
+    return f'core:trajet:{numero_bus}:origine'
+
+
+def _distance(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * RAYON_TERRE_METRES * math.asin(math.sqrt(a))
+
+
+def _reinitialiser(etat, trajet=None, origine=None, position=None):
+    etat.update(trajet=trajet, origine=origine, repere=position, relu_a=time.monotonic(), arrets={})
+
+
+def _etat_local(numero_bus):
+    with _verrou:
+        etat = _etats.get(numero_bus)
+        if etat is None:
+            etat = _etats[numero_bus] = {}
+            _reinitialiser(etat)
+    return etat
+
+
+def oublier_trajets():
+    """Oublie les états mémorisés par ce processus ; ils sont relus dans le cache au prochain ping."""
+    with _verrou:
+        _etats.clear()
+
+
+def _origine(numero_bus, latitude, longitude):
+    # Sans point de départ connu (premier ping, bus resté immobile au-delà de
+    # TRAJET_INACTIVITE), le bus est considéré au repos là où il est
+    origine = cache.get(_cle_origine(numero_bus))
+    if origine is None:
+        cache.add(_cle_origine(numero_bus), {'latitude': latitude, 'longitude': longitude, 'depuis': 0},
+                  settings.TRAJET_INACTIVITE)
+        origine = cache.get(_cle_origine(numero_bus)) or {'latitude': latitude, 'longitude': longitude, 'depuis': 0}
+    return origine
+
+
+def _verifier_depart(etat, numero_bus, latitude, longitude):
+    """(trajet, transition) : identifiant du trajet si le bus est parti, et s'il vient de partir."""
+    def immobile(origine):
+        return _distance(origine['latitude'], origine['longitude'], latitude, longitude) < settings.TRAJET_DEPART_METRES
+
+    if etat['origine'] is not None and immobile(etat['origine']):
+        return None, False
+    # Relu avant de conclure : un autre worker a pu déplacer le point de départ
+    origine = etat['origine'] = _origine(numero_bus, latitude, longitude)
+    if immobile(origine):
+        return None, False
+    if time.time() - origine['depuis'] < settings.TRAJET_REPOS:
+        # Toujours en route depuis le dernier arrêt : le point de départ suit le bus
+        etat['origine'] = {'latitude': latitude, 'longitude': longitude, 'depuis': time.time()}
+        cache.set(_cle_origine(numero_bus), etat['origine'], settings.TRAJET_INACTIVITE)
+        return None, False
+
+    transition = cache.add(cle_trajet(numero_bus), uuid.uuid4().hex, settings.TRAJET_INACTIVITE)
+    trajet = cache.get(cle_trajet(numero_bus))
+    if trajet is None:
+        return None, False
+    cache.delete(_cle_origine(numero_bus))
+    return trajet, transition
+
+
+def _relire_trajet(etat, numero_bus, latitude, longitude):
+    etat['relu_a'] = time.monotonic()
+    if cache.get(cle_trajet(numero_bus)) != etat['trajet']:
+        # Terminé (dernier arrêt, inactivité) ou remplacé, par ce processus ou un autre
+        _reinitialiser(etat)
+        return
+    # Seul un bus qui roule prolonge son trajet : immobile, il expire après TRAJET_INACTIVITE
+    if _distance(*etat['repere'], latitude, longitude) >= settings.TRAJET_DEPART_METRES:
+        cache.touch(cle_trajet(numero_bus), settings.TRAJET_INACTIVITE)
+        etat['repere'] = (latitude, longitude)
+
+
+def _terminer(etat, numero_bus, latitude, longitude):
+    cache.delete(cle_trajet(numero_bus))
+    origine = {'latitude': latitude, 'longitude': longitude, 'depuis': time.time()}
+    cache.set(_cle_origine(numero_bus), origine, settings.TRAJET_INACTIVITE)
+    _reinitialiser(etat, origine=origine)
+
+
+def avancer_trajet(numero_bus, latitude, longitude):
+    """Fait avancer le trajet du bus ; retourne les événements [(type, eleve_id | None)]."""
+    etat = _etat_local(numero_bus)
+    evenements = []
+
+    if etat['trajet'] is not None and time.monotonic() - etat['relu_a'] >= RELECTURE_TRAJET:
+        _relire_trajet(etat, numero_bus, latitude, longitude)
+    if etat['trajet'] is None:
+        trajet, transition = _verifier_depart(etat, numero_bus, latitude, longitude)
+        if trajet is None:
+            return evenements
+        _reinitialiser(etat, trajet=trajet, position=(latitude, longitude))
+        if transition:
+            evenements.append((DEPARTED, None))
+    trajet = etat['trajet']
+
+    arrets = arrets_du_bus(numero_bus)
+    for eleve_id, distance in arrets.proches(latitude, longitude, settings.GEOFENCE_APPROCHE_METRES):
+        connu = etat['arrets'].get(eleve_id)
+        cible = ARRIVED if distance <= settings.GEOFENCE_RAYON_METRES else APPROACHING
+        if connu == ARRIVED or connu == cible:
+            continue
+        # Un bus qui entre directement dans le rayon d'arrivée passe aussi par "approaching"
+        if cache.add(_cle(numero_bus, trajet, eleve_id, APPROACHING), 1, DUREE_ETAT) and cible == APPROACHING:
+            evenements.append((APPROACHING, eleve_id))
+        if cible == ARRIVED and cache.add(cle_arrivee(numero_bus, trajet, eleve_id), 1, DUREE_ETAT):
+            evenements.append((ARRIVED, eleve_id))
+        etat['arrets'][eleve_id] = cible
+
+    if any(type_ == ARRIVED for type_, _ in evenements):
+        cles = [cle_arrivee(numero_bus, trajet, eleve_id) for eleve_id in arrets.eleve_ids]
+        if len(cache.get_many(cles)) == len(cles):
+            _terminer(etat, numero_bus, latitude, longitude)
+    return evenements
+
+
+def _diffuser(numero_bus, evenements):
+    # Approche : SMS et email par la file des notifications (core.taches). Arrivée :
+    # notification regroupée avec les appels à notifier_bus_arrive (core.regroupement).
+    # Départ : une seule tâche pour tout le bus, répartie par le worker entre ses élèves
+    # (core.regroupement), sans renvoyer un départ déjà notifié.
+    approches = [eleve_id for type_, eleve_id in evenements if type_ == APPROACHING]
+    if approches:
+        mettre_en_file(Eleve.objects.filter(id__in=approches), ('sms', 'email'))
+    arrivees = [eleve_id for type_, eleve_id in evenements if type_ == ARRIVED]
+    for eleve in Eleve.objects.filter(id__in=arrivees) if arrivees else []:
+        notifier_une_fois(
+            eleve, 'bus_arrive', "🚌 Transport arrivé", f"Le transport est arrivé chez {eleve.prenom} {eleve.nom}.",
+        )
+
+    if any(type_ == DEPARTED for type_, _ in evenements):
+        mettre_en_file_bus(numero_bus)
+
+
+def avancer_trajets(positions):
+    """avancer_trajet pour un lot [(numero_bus, latitude, longitude), ...] ; retourne le nombre d'événements."""
+    dernieres = {numero: (latitude, longitude) for numero, latitude, longitude in positions}
+    total = 0
+    for numero, (latitude, longitude) in dernieres.items():
+        evenements = avancer_trajet(numero, latitude, longitude)
+        if evenements:
+            _diffuser(numero, evenements)
+            total += len(evenements)
+    return total
@@ -0,0 +1,82 @@
+# core/trames.py
+#
+# Format binaire des trames envoyées par les traceurs GPS des bus, accepté par
+# transport_positions_bus à côté du JSON (Content-Type application/octet-stream).
+# Une trame est une suite d'enregistrements de 16 octets, petit-boutiste :
+#
+#   identifiant du bus (Bus.id, uint32) | horodatage Unix (uint32) | latitude (float32) | longitude (float32)
+#
+# Soit 16 octets par position au lieu d'environ 70 en JSON ; un traceur peut
+# regrouper plusieurs positions (les siennes, ou celles accumulées hors réseau)
+# dans une même trame. Le décodage se fait directement sur le corps de la
+# requête avec struct.iter_unpack, sans copie ni analyse de texte.
+
+import struct
+import threading
+import time
+
+from .models import Bus
+from .positions import coordonnees_valides
+
+ENREGISTREMENT = struct.Struct('<IIff')
+# Tolérance sur l'horloge des traceurs (secondes dans le futur)
+AVANCE_MAX = 300
+# Au-delà (secondes), une position envoyée en retard ne sert plus qu'à la trace du bus
+RETARD_MAX = 120
+
+_verrou = threading.Lock()
+# Bus.id -> numero_bus, pour ce processus (un bus ne change pas de numéro)
+_numeros = {}
+
+
+def numeros_bus(ids):
+    """{Bus.id: numero_bus} pour les identifiants connus."""
+    manquants = [i for i in ids if i not in _numeros]
+    if manquants:
+        trouves = dict(Bus.objects.filter(id__in=manquants).values_list('id', 'numero_bus'))
+        with _verrou:
+            _numeros.update(trouves)
+    return {i: _numeros[i] for i in ids if i in _numeros}
+
+
+def oublier_numeros():
+    """Vide la correspondance Bus.id -> numero_bus mémorisée par ce processus."""
+    with _verrou:
+        _numeros.clear()
+
+
+def decoder_trame(donnees):
+    """[(index, bus_id, horodatage, latitude, longitude)] ; ValueError si la longueur est invalide."""
+    vue = memoryview(donnees)
+    if not vue.nbytes or vue.nbytes % ENREGISTREMENT.size:
+        raise ValueError(f"trame de {vue.nbytes} octets, multiple de {ENREGISTREMENT.size} attendu")
+    return [(index, *enregistrement) for index, enregistrement in enumerate(ENREGISTREMENT.iter_unpack(vue))]
+
+
+def positions_trame(donnees):
+    """Décode une trame en (positions, horodatages, rejetees) pour enregistrer_positions_bus.
+
+    Les positions sont triées par horodatage ; sont rejetés (par index) les
+    enregistrements d'un bus inconnu, hors des bornes GPS ou datés du futur.
+    """
+    enregistrements = decoder_trame(donnees)
+    numeros = numeros_bus({bus_id for _, bus_id, _, _, _ in enregistrements})
+    limite = time.time() + AVANCE_MAX
+
+    valides = []
+    rejetees = []
+    for index, bus_id, horodatage, latitude, longitude in enregistrements:
+        if bus_id not in numeros or not horodatage or horodatage > limite or not coordonnees_valides(latitude, longitude):
+            rejetees.append(index)
+            continue
+        valides.append((horodatage, numeros[bus_id], latitude, longitude))
+
+    valides.sort(key=lambda v: v[0])
+    positions = [(numero, latitude, longitude) for _, numero, latitude, longitude in valides]
+    return positions, [v[0] for v in valides], rejetees
+
+
+def positions_en_direct(positions, horodatages):
+    """Positions assez récentes pour faire avancer les trajets et les estimations d'arrivée."""
+    limite = time.time() - RETARD_MAX
+    return [position for position, horodatage in zip(positions, horodatages) if horodatage >= limite]
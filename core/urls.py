@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import EleveViewSet, AbsenceViewSet, NoteViewSet
+from .views import EleveViewSet, AbsenceViewSet, NoteViewSet, NotificationViewSet
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from . import views
 from .views import index
@@ -25,6 +25,7 @@ router = DefaultRouter()
 router.register(r'eleves', EleveViewSet)
 router.register(r'absences', AbsenceViewSet)
 router.register(r'notes', NoteViewSet)
+router.register(r'notifications', NotificationViewSet, basename='notification')
 
 urlpatterns = [
   path('', views.redirection_dashboard, name='home'),
@@ -41,6 +42,7 @@ urlpatterns = [
   path('eleves/modifier/<int:eleve_id>/', views.modifier_eleve, name='modifier_eleve'),
   path('eleves/supprimer/<int:eleve_id>/', views.supprimer_eleve, name='supprimer_eleve'),
   path('recherche/', views.recherche_eleve, name='recherche_eleve'),
+  path('recherche/autocomplete/', views.autocomplete_eleves, name='autocomplete_eleves'),
   path('transports/ajax/', views.liste_transport, name='liste_transport'),
 
   path('enseignants/', views.liste_enseignants, name='liste_enseignants'),
@@ -68,6 +70,7 @@ urlpatterns = [
   #path('enseignant/dashboard/', views.dashboard_enseignant, name='dashboard_enseignant'),
    
   path('enseignant/dashboard/', views.dashboard_enseignant, name='dashboard_enseignant'),
+  path('enseignant/dashboard/charts/<str:nom>/', views.dashboard_enseignant_chart, name='dashboard_enseignant_chart'),
   path('notes/ajouter/', ajouter_note, name='ajouter_note'),
   path('notes/modifier/<int:note_id>/', modifier_note, name='modifier_note'),
   path('notes/supprimer/<int:note_id>/', supprimer_note, name='supprimer_note'),
@@ -101,6 +104,7 @@ urlpatterns = [
   path('jeu-probleme/', views.jeu_probleme, name='jeu_probleme'),
   path("api/chatbot/", views.chatbot_api, name="chatbot_api"),
   path('ecole/dashboard/', views.dashboard_admin, name='dashboard_admin'),
+  path('metrics/', views.metriques, name='metriques'),
   path('paiements/eleves/', views.paiements_eleves, name='paiements_eleves'),
   path('paiements/enseignants/', views.paiements_enseignants, name='paiements_enseignants'),
   path('paiements/', views.gestion_paiement, name='gestion_paiement'),
@@ -108,10 +112,16 @@ urlpatterns = [
   path('paiements/enseignants/ajouter/', views.ajouter_paiement_enseignant, name='ajouter_paiement_enseignant'),
 
   path('transports/carte/', views.carte_transport, name='localisation_point_depart'),
+  path('transports/carte/marqueurs/', views.transport_carte_marqueurs, name='transport_carte_marqueurs'),
   path('transport/carte_parent/<int:eleve_id>/', views.carte_transport_parent, name='carte_transport_parent'),
   path('transport/position/<int:eleve_id>/', views.transport_position_parent, name='transport_position_parent'),
+  path('transport/position/<int:eleve_id>/stream/', views.transport_position_stream, name='transport_position_stream'),
+  path('transport/eta/<int:eleve_id>/', views.transport_eta_parent, name='transport_eta_parent'),
   path('transport/position/update/', views.transport_update_position, name='transport_update_position'),
+  path('transport/bus/positions/', views.transport_positions_bus, name='transport_positions_bus'),
+  path('transport/bus/<str:numero_bus>/trace/', views.transport_trace_bus, name='transport_trace_bus'),
   path('transport/arrive/<int:eleve_id>/', views.notifier_bus_arrive, name='notifier_bus_arrive'),
+  path('notifications/groupe/', views.notifier_groupe, name='notifier_groupe'),
 
 
 
@@ -1,15 +1,16 @@
 # core/utils.py
 
-from .models import Note, SoumissionQuiz, Absence, Badge
+from .stats import stats_pour
 
 def analyse_apprentissage(eleve):
     recommandations = []
     stats = {}
+    # Sommes et compteurs lus sur EleveStats au lieu de parcourir les lignes
+    eleve_stats = stats_pour(eleve)
 
     # --- Notes ---
-    notes = Note.objects.filter(eleve=eleve)
-    if notes.exists():
-        moyenne = sum(n.note for n in notes) / notes.count()
+    if eleve_stats.nb_notes:
+        moyenne = eleve_stats.moyenne_notes
         stats['moyenne_notes'] = round(moyenne, 2)
 
         if moyenne < 10:
@@ -22,9 +23,8 @@ def analyse_apprentissage(eleve):
         recommandations.append("⚠️ Aucune note trouvée. Commence par les évaluations du professeur.")
 
     # --- Quiz ---
-    quiz_scores = SoumissionQuiz.objects.filter(eleve=eleve)
-    if quiz_scores.exists():
-        moy_quiz = sum(q.score for q in quiz_scores if q.score is not None) / quiz_scores.count()
+    if eleve_stats.nb_quiz:
+        moy_quiz = eleve_stats.somme_quiz / eleve_stats.nb_quiz
         stats['moyenne_quiz'] = round(moy_quiz, 2)
 
         if moy_quiz < 5:
@@ -35,18 +35,18 @@ def analyse_apprentissage(eleve):
             recommandations.append("🏆 Tu maîtrises bien les quiz, bravo !")
 
     # --- Badges / jeux ---
-    badges = Badge.objects.filter(eleve=eleve)
-    stats['badges_total'] = badges.count()
+    nb_badges = eleve_stats.nb_badges
+    stats['badges_total'] = nb_badges
 
-    if badges.count() == 0:
+    if nb_badges == 0:
         recommandations.append("🎮 Essaie les mini-jeux pour t’entraîner en t’amusant.")
-    elif badges.count() == 1:
+    elif nb_badges == 1:
         recommandations.append("💡 Tu as déjà un badge, continue pour en débloquer d’autres.")
     else:
         recommandations.append("🔥 Super, tu cumules les badges ! Continue sur cette lancée.")
 
     # --- Absences ---
-    nb_abs = Absence.objects.filter(eleve=eleve).count()
+    nb_abs = eleve_stats.nb_absences
     stats['absences'] = nb_abs
 
     if nb_abs >= 3:
@@ -1,4 +1,3 @@
-import csv
 import json
 import logging
 import traceback
@@ -8,19 +7,32 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, Prefetch, Q
 from django.core.mail import send_mail
-from django.http import JsonResponse, HttpResponse
-from django.shortcuts import get_object_or_404, redirect, render
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
+from urllib.parse import urlencode
 
+from .analytics import GRAPHIQUES, graphique_enseignant
+from .boite import ajuster_non_lues, invalider_non_lues, nombre_non_lues
+from .carte import marqueurs
 from .decorators import allow_iframe
+from .exports import FORMATS as FORMATS_EXPORT, exporter_notes
+from .eta import eta_transport, mettre_a_jour_eta_bus
+from .fragments import versions_fiches
+from .metrics import registre as registre_metriques
 from .forms import (
     AbsenceForm,
     CoursForm,
@@ -33,8 +45,10 @@ from .forms import (
     ContactEnseignantForm,
 )
 from .models import (
+    CLASSES,
     Absence,
     Badge,
+    Bus,
     Cours,
     Eleve,
     EmploiDuTemps,
@@ -49,30 +63,37 @@ from .models import (
     Question,
     Quiz,
     SoumissionQuiz,
+    TraceBus,
     Transport,
 )
-from .notifications import notifier_parent_par_sms, notifier_parent_par_email, notifier_parent_par_app
+from .notifications import eleves_cibles, notifier_parents
 from .permissions import is_admin
+from .live import flux_position
+from .positions import (
+    coordonnees_valides,
+    enregistrer_position,
+    enregistrer_positions_bus,
+    etat_position,
+    position_transport,
+)
 from .send import envoyer_notification_paiement
-from .serializers import AbsenceSerializer, EleveSerializer, NoteSerializer
+from .snapshot import snapshot_ecole
+from .regroupement import notifier_arrivee
+from .trajets import avancer_trajets
+from .trames import positions_en_direct, positions_trame
+from .traces import ZOOM_MAX, trace_simplifiee
+from .search import LIMITE_AUTOCOMPLETE, rechercher_eleves
+from .serializers import AbsenceSerializer, EleveSerializer, NoteSerializer, NotificationSerializer
+from .stats import stats_pour
 from .utils.chatbot import poser_question
 logger = logging.getLogger(__name__)
 def analyse_apprentissage(eleve):
-    # Moyenne des notes
-    moyenne_notes = (
-        Note.objects.filter(eleve=eleve).aggregate(Avg('note'))['note__avg'] or 0
-    )
-
-    # Score moyen aux quiz
-    moyenne_quiz = (
-        SoumissionQuiz.objects.filter(eleve=eleve).aggregate(Avg('score'))['score__avg'] or 0
-    )
-
-    # Absences
-    nb_absences = Absence.objects.filter(eleve=eleve).count()
-
-    # Badges
-    nb_badges = Badge.objects.filter(eleve=eleve).count()
+    # Une seule lecture par clé primaire sur EleveStats (maintenue par core.stats)
+    stats = stats_pour(eleve)
+    moyenne_notes = stats.moyenne_notes
+    moyenne_quiz = stats.moyenne_quiz
+    nb_absences = stats.nb_absences
+    nb_badges = stats.nb_badges
 
     recommandations = []
 
@@ -132,17 +153,27 @@ def liste_transport(request):
     })
 
 def recherche_eleve(request):
-    query = request.GET.get('q')
+    query = request.GET.get('q', '').strip()
+    eleve_id = request.GET.get('eleve', '')
+    resultats = []
     eleve = None
     notes = absences = transports = []
 
     if query:
-        eleve = get_object_or_404(Eleve, nom__icontains=query)
+        resultats = rechercher_eleves(query)
+    if eleve_id.isdigit():
+        eleve = get_object_or_404(Eleve, id=eleve_id)
+    elif len(resultats) == 1:
+        eleve = resultats[0]
+
+    if eleve:
         notes = Note.objects.filter(eleve=eleve)
         absences = Absence.objects.filter(eleve=eleve)
         transports = Transport.objects.filter(eleve=eleve)
 
     context = {
+        'query': query,
+        'resultats': resultats,
         'eleve': eleve,
         'notes': notes,
         'absences': absences,
@@ -151,6 +182,25 @@ def recherche_eleve(request):
     return render(request, 'recherche_eleve.html', context)
 
 
+@login_required
+def autocomplete_eleves(request):
+    query = request.GET.get('q', '').strip()
+    if len(query) < 2:
+        return JsonResponse({'resultats': []})
+
+    resultats = [
+        {
+            'id': e.id,
+            'nom': e.nom,
+            'prenom': e.prenom,
+            'classe': e.classe,
+            'label': f"{e.nom} {e.prenom}" + (f" ({e.classe})" if e.classe else ''),
+        }
+        for e in rechercher_eleves(query, limite=LIMITE_AUTOCOMPLETE)
+    ]
+    return JsonResponse({'resultats': resultats})
+
+
 
 @login_required
 def emplois_du_temps(request):
@@ -160,12 +210,24 @@ def emplois_du_temps(request):
 
 def is_eleves(user):
     return user.groups.filter(name='eleves').exists()
+ELEVES_PAR_PAGE = 50
+NOTES_PAR_ELEVE = 5
+
+
 @login_required
 def liste_eleves(request):
     nom = request.GET.get('nom', '')
     classe = request.GET.get('classe', '')
 
-    eleves = Eleve.objects.all()
+    # Une seule requête annotée + trois prefetch bornés, quelle que soit la taille de l'école
+    eleves = (
+        Eleve.objects.select_related('transport', 'parent_profile__user')
+        .prefetch_related(
+            Prefetch('enseignants', queryset=Enseignant.objects.select_related('user')),
+            Prefetch('notes', queryset=Note.objects.order_by('-date', '-id')[:NOTES_PAR_ELEVE], to_attr='dernieres_notes'),
+        )
+        .annotate(nb_absences=Count('absences'))
+    )
 
     if nom:
         eleves = eleves.filter(nom__icontains=nom)
@@ -173,29 +235,39 @@ def liste_eleves(request):
     if classe:
         eleves = eleves.filter(classe__iexact=classe)
 
-    donnees_eleves = []
-    for eleve in eleves:
-        notes = Note.objects.filter(eleve=eleve)
-        absences = Absence.objects.filter(eleve=eleve)
-        transport = Transport.objects.filter(eleve=eleve).first()
-        parent = Parent.objects.filter(eleve=eleve).first()
-        enseignants = eleve.enseignants.all()
+    # Pagination par curseur (keyset) sur l'id : pas d'OFFSET, coût constant à chaque page
+    apres = request.GET.get('apres', '')
+    avant = request.GET.get('avant', '')
+    if avant.isdigit():
+        page = list(eleves.filter(id__lt=int(avant)).order_by('-id')[:ELEVES_PAR_PAGE + 1])
+        page_precedente = len(page) > ELEVES_PAR_PAGE
+        page = page[:ELEVES_PAR_PAGE][::-1]
+        page_suivante = True
+    else:
+        if apres.isdigit():
+            eleves = eleves.filter(id__gt=int(apres))
+        page = list(eleves.order_by('id')[:ELEVES_PAR_PAGE + 1])
+        page_suivante = len(page) > ELEVES_PAR_PAGE
+        page = page[:ELEVES_PAR_PAGE]
+        page_precedente = apres.isdigit()
 
+    donnees_eleves = []
+    for eleve in page:
         donnees_eleves.append({
             'eleve': eleve,
-            'notes': notes,
-            'absences': absences,
-            'transport': transport,
-            'parent': parent,
-            'enseignants': enseignants,
+            'notes': eleve.dernieres_notes,
+            'nb_absences': eleve.nb_absences,
+            'transport': getattr(eleve, 'transport', None),
+            'parent': getattr(eleve, 'parent_profile', None),
+            'enseignants': eleve.enseignants.all(),
         })
 
-    # Récupérer toutes les classes distinctes (en tant que texte)
-    classes = Eleve.objects.values_list('classe', flat=True).distinct()
-
+    filtres = {k: v for k, v in (('nom', nom), ('classe', classe)) if v}
     return render(request, 'liste_eleves.html', {
         'donnees_eleves': donnees_eleves,
-        'classes': classes,
+        'classes': [code for code, _ in CLASSES],
+        'curseur_suivant': urlencode({**filtres, 'apres': page[-1].id}) if page and page_suivante else '',
+        'curseur_precedent': urlencode({**filtres, 'avant': page[0].id}) if page and page_precedente else '',
     })
 
 
@@ -266,6 +338,50 @@ class NoteViewSet(viewsets.ModelViewSet):
     queryset = Note.objects.all()
     serializer_class = NoteSerializer
     permission_classes = [IsAuthenticated]
+
+
+class NotificationPagination(CursorPagination):
+    # Pagination par curseur : pas d'OFFSET qui s'allonge, ni de doublons quand de nouvelles notifications arrivent
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'taille'
+    max_page_size = 100
+
+
+class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+    # Boîte de réception de l'utilisateur connecté ; ?non_lues=1 pour ne garder que les non lues
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = NotificationPagination
+    # Un identifiant non numérique est un 404 du routeur, pas une erreur de la requête SQL
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        notifications = Notification.objects.filter(user=self.request.user)
+        if self.request.query_params.get('non_lues') in ('1', 'true'):
+            notifications = notifications.filter(is_read=False)
+        return notifications
+
+    @action(detail=False, methods=['get'])
+    def non_lues(self, request):
+        # Badge : servi par le compteur en cache (core/boite.py)
+        return Response({'non_lues': nombre_non_lues(request.user.id)})
+
+    @action(detail=True, methods=['post'])
+    def lire(self, request, pk=None):
+        lues = Notification.objects.filter(pk=pk, user=request.user, is_read=False).update(is_read=True)
+        if not lues and not Notification.objects.filter(pk=pk, user=request.user).exists():
+            raise Http404
+        ajuster_non_lues(request.user.id, -lues)
+        return Response({'lues': lues})
+
+    @action(detail=False, methods=['post'])
+    def tout_lire(self, request):
+        # Un seul UPDATE, quel que soit le nombre de notifications ; le compteur est
+        # recompté ensuite plutôt que mis à zéro, au cas où une notification arrive entre-temps
+        lues = Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        invalider_non_lues([request.user.id])
+        return Response({'lues': lues})
 @login_required(login_url='login')
 def index(request):
     return render(request, 'index.html')
@@ -475,9 +591,12 @@ def dashboard_parent(request):
     except Profile.DoesNotExist:
         return redirect('index')
 
-    # Récupérer les enfants liés à ce parent
-    enfants = Eleve.objects.filter(parent_user=user).select_related('transport').prefetch_related('notes', 'absences', 'enseignants')
-
+    # Récupérer les enfants liés à ce parent. Notes, absences et enseignants ne
+    # sont chargés que pour les fiches absentes du cache de fragments.
+    enfants = list(Eleve.objects.filter(parent_user=user).select_related('transport'))
+    versions = versions_fiches([enfant.id for enfant in enfants])
+    for enfant in enfants:
+        enfant.version_fiche = versions[enfant.id]
 
     notifications = []
     if user.is_authenticated:
@@ -487,6 +606,7 @@ def dashboard_parent(request):
         'parent': profile,
         'enfants': enfants,
         'notifications': notifications,
+        'fiche_ttl': settings.PARENT_FRAGMENT_TTL,
     })
 
 def login_view(request):
@@ -548,13 +668,11 @@ def dashboard_enseignant(request):
         print("❌ Aucun objet Enseignant pour :", user)
         return redirect('index')
 
-    eleves = (
-        Eleve.objects.filter(enseignants=enseignant)
-        .prefetch_related('notes', 'absences')
-    )
+    # Les élèves ne servent qu'à la liste (nom, prénom, classe) : pas de prefetch des notes/absences
+    eleves = Eleve.objects.filter(enseignants=enseignant).order_by('nom', 'prenom')
     notes = Note.objects.filter(enseignant=enseignant).select_related('eleve')
     absences = Absence.objects.filter(eleve__in=eleves).select_related('eleve')
-    cours = Cours.objects.filter(enseignant=enseignant).prefetch_related('quizz')
+    cours = Cours.objects.filter(enseignant=enseignant)
 
     quiz = Quiz.objects.filter(cours__in=cours)
 
@@ -568,33 +686,16 @@ def dashboard_enseignant(request):
         'total_cours': cours.count(),
         'total_quiz': quiz.count(),
     }
-    eleves_par_classe = (
-        eleves.values('classe').annotate(total=Count('id')).order_by('classe')
-    )
+    # Même jeu de données (en cache) que le graphique des classes
+    classes = graphique_enseignant(enseignant, 'classes')
+    eleves_par_classe = [
+        {'classe': label, 'total': total} for label, total in zip(classes['labels'], classes['values'])
+    ]
     notes_recentes = notes.order_by('-date')[:6]
     absences_recentes = absences.order_by('-date')[:6]
     cours_stats = cours.annotate(quiz_count=Count('quizz')).order_by('nom')
 
-    notes_par_matiere = (
-        notes.values('matiere')
-        .annotate(moyenne=Avg('note'), total=Count('id'))
-        .order_by('matiere')
-    )
-    absences_par_jour = (
-        absences.filter(date__gte=today - timedelta(days=7))
-        .values('date')
-        .annotate(total=Count('id'))
-        .order_by('date')
-    )
-    chart_notes_labels = [n['matiere'] or '—' for n in notes_par_matiere]
-    chart_notes_values = [float(n['moyenne'] or 0) for n in notes_par_matiere]
-    chart_absences_labels = [a['date'].strftime('%d/%m') for a in absences_par_jour]
-    chart_absences_values = [a['total'] for a in absences_par_jour]
-    chart_classes_labels = [c['classe'] or '—' for c in eleves_par_classe]
-    chart_classes_values = [c['total'] for c in eleves_par_classe]
-
-   
-
+    # Les graphiques sont chargés en différé via dashboard_enseignant_chart
     return render(request, 'dashboards/dashboard_enseignant.html', {
         'enseignant': enseignant,
         'profile': profile,
@@ -606,16 +707,21 @@ def dashboard_enseignant(request):
         'eleves_par_classe': eleves_par_classe,
         'notes_recentes': notes_recentes,
         'absences_recentes': absences_recentes,
-        'chart_notes_labels': json.dumps(chart_notes_labels),
-        'chart_notes_values': json.dumps(chart_notes_values),
-        'chart_absences_labels': json.dumps(chart_absences_labels),
-        'chart_absences_values': json.dumps(chart_absences_values),
-        'chart_classes_labels': json.dumps(chart_classes_labels),
-        'chart_classes_values': json.dumps(chart_classes_values),
-        
     })
 
 
+@login_required(login_url='login')
+def dashboard_enseignant_chart(request, nom):
+    if nom not in GRAPHIQUES:
+        return JsonResponse({'error': 'unknown_chart'}, status=404)
+    try:
+        enseignant = Enseignant.objects.get(user=request.user)
+    except Enseignant.DoesNotExist:
+        return JsonResponse({'error': 'forbidden'}, status=403)
+
+    return JsonResponse(graphique_enseignant(enseignant, nom))
+
+
 
 @login_required(login_url='login')
 def modifier_note(request, note_id):
@@ -635,22 +741,15 @@ def supprimer_note(request, note_id):
         return redirect('dashboard_enseignant')
     return render(request, 'notes/supprimer_note.html', {'note': note})
 
-@login_required(login_url='login')  # 👈 vérifie que le nom de ton url de login est bien 'login'
-def gerer_notes(request):
-    try:
-        enseignant = Enseignant.objects.get(user=request.user)
-    except Enseignant.DoesNotExist:
-        return redirect('index')  # 👈 redirige si l'user connecté n'est pas un enseignant
-
-    notes = Note.objects.filter(enseignant=enseignant).select_related('eleve')
-
-    q = request.GET.get('q', '').strip()
-    classe = request.GET.get('classe', '').strip()
-    matiere = request.GET.get('matiere', '').strip()
-    min_note = request.GET.get('min_note', '').strip()
-    max_note = request.GET.get('max_note', '').strip()
-    date_debut = request.GET.get('date_debut', '').strip()
-    date_fin = request.GET.get('date_fin', '').strip()
+def filtrer_notes(notes, params):
+    # Filtres communs à gerer_notes, gerer_notes_admin et à leurs exports
+    q = params.get('q', '').strip()
+    classe = params.get('classe', '').strip()
+    matiere = params.get('matiere', '').strip()
+    min_note = params.get('min_note', '').strip()
+    max_note = params.get('max_note', '').strip()
+    date_debut = params.get('date_debut', '').strip()
+    date_fin = params.get('date_fin', '').strip()
 
     if q:
         notes = notes.filter(Q(eleve__nom__icontains=q) | Q(eleve__prenom__icontains=q))
@@ -666,15 +765,21 @@ def gerer_notes(request):
         notes = notes.filter(date__gte=date_debut)
     if date_fin:
         notes = notes.filter(date__lte=date_fin)
+    return notes
+
+
+@login_required(login_url='login')  # 👈 vérifie que le nom de ton url de login est bien 'login'
+def gerer_notes(request):
+    try:
+        enseignant = Enseignant.objects.get(user=request.user)
+    except Enseignant.DoesNotExist:
+        return redirect('index')  # 👈 redirige si l'user connecté n'est pas un enseignant
 
-    if request.GET.get('export') == 'csv':
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="notes_enseignant.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['Eleve', 'Classe', 'Matiere', 'Note', 'Date'])
-        for n in notes.order_by('-date'):
-            writer.writerow([f"{n.eleve.nom} {n.eleve.prenom}", n.eleve.classe, n.matiere, n.note, n.date])
-        return response
+    notes = filtrer_notes(Note.objects.filter(enseignant=enseignant).select_related('eleve'), request.GET)
+
+    format_export = request.GET.get('export')
+    if format_export in FORMATS_EXPORT:
+        return exporter_notes(notes, format_export, 'notes_enseignant')
 
     if request.method == 'POST' and request.POST.get('quick_add') == '1':
         eleve_id = request.POST.get('eleve')
@@ -1273,38 +1378,35 @@ def dashboard_admin(request):
     except Profile.DoesNotExist:
         return redirect('index')
 
-    # Moyennes des notes par classe
-    moyennes = (
-        Note.objects.values('eleve__classe')
-        .annotate(moyenne=Avg('note'))
-        .order_by('eleve__classe')
-    )
+    # Compteurs et moyennes par classe servis depuis l'instantané en cache
+    snapshot = snapshot_ecole()
+    moyennes = snapshot['moyennes']
 
     # Données statistiques générales
     notifications = Notification.objects.select_related('user', 'eleve').order_by('-created_at')[:10]
     chart_classes_labels = [m['eleve__classe'] or '—' for m in moyennes]
-    chart_classes_values = [float(m['moyenne'] or 0) for m in moyennes]
+    chart_classes_values = [m['moyenne'] for m in moyennes]
     chart_counts_labels = ['Élèves', 'Parents', 'Enseignants', 'Cours', 'Quiz']
     chart_counts_values = [
-        Eleve.objects.count(),
-        Parent.objects.count(),
-        Enseignant.objects.count(),
-        Cours.objects.count(),
-        Quiz.objects.count(),
+        snapshot['nb_eleves'],
+        snapshot['nb_parents'],
+        snapshot['nb_enseignants'],
+        snapshot['nb_cours'],
+        snapshot['nb_quiz'],
     ]
 
     context = {
-        'nb_eleves': Eleve.objects.count(),
-        'nb_parents': Parent.objects.count(),
-        'nb_enseignants': Enseignant.objects.count(),
-        'nb_cours': Cours.objects.count(),
-        'nb_quiz': Quiz.objects.count(),
-        'nb_notes': Note.objects.count(),
-        'nb_absences': Absence.objects.count(),
-        'nb_transports': Transport.objects.count(),
-        'nb_notifications': Notification.objects.count(),
+        'nb_eleves': snapshot['nb_eleves'],
+        'nb_parents': snapshot['nb_parents'],
+        'nb_enseignants': snapshot['nb_enseignants'],
+        'nb_cours': snapshot['nb_cours'],
+        'nb_quiz': snapshot['nb_quiz'],
+        'nb_notes': snapshot['nb_notes'],
+        'nb_absences': snapshot['nb_absences'],
+        'nb_transports': snapshot['nb_transports'],
+        'nb_notifications': snapshot['nb_notifications'],
         'recent_notifications': notifications,
-        'moyennes': list(moyennes),
+        'moyennes': moyennes,
         'chart_classes_labels': json.dumps(chart_classes_labels),
         'chart_classes_values': json.dumps(chart_classes_values),
         'chart_counts_labels': json.dumps(chart_counts_labels),
@@ -1313,6 +1415,13 @@ def dashboard_admin(request):
 
     return render(request, 'dashboards/dashboard_admin.html', context)
 
+def metriques(request):
+    # Réservé aux admins connectés, ou à un scraper Prometheus muni de METRICS_TOKEN
+    jeton = settings.METRICS_TOKEN
+    if not (is_admin(request.user) or (jeton and request.headers.get('Authorization') == f'Bearer {jeton}')):
+        return HttpResponse(status=403)
+    return HttpResponse(registre_metriques.exporter(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @login_required
 def liste_parents(request):
     if not hasattr(request.user, 'profile') or request.user.profile.role != 'admin':
@@ -1325,7 +1434,12 @@ def gerer_notes_admin(request):
     if not hasattr(request.user, 'profile') or request.user.profile.role != 'admin':
         return redirect('index')
 
-    notes = Note.objects.all().select_related('eleve', 'enseignant')
+    notes = filtrer_notes(Note.objects.all().select_related('eleve', 'enseignant'), request.GET)
+
+    format_export = request.GET.get('export')
+    if format_export in FORMATS_EXPORT:
+        return exporter_notes(notes, format_export, 'notes_ecole', avec_enseignant=True)
+
     return render(request, 'notes/gerer_notes_admin.html', {
         'notes': notes,
     })
@@ -1366,27 +1480,65 @@ def ajouter_paiement_enseignant(request):
 
 def carte_transport(request):
     return render(request, "transports/carte.html") 
+
+@login_required
+def transport_carte_marqueurs(request):
+    # Marqueurs regroupés de l'emprise visible (?bbox=ouest,sud,est,nord&zoom=13), cf. core/carte.py
+    if not is_admin(request.user):
+        return JsonResponse({'error': 'forbidden'}, status=403)
+    try:
+        ouest, sud, est, nord = (float(v) for v in request.GET['bbox'].split(','))
+        zoom = int(request.GET.get('zoom', 13))
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'invalid_parameters'}, status=400)
+
+    groupes = marqueurs(ouest, sud, est, nord, zoom)
+    return JsonResponse({'zoom': zoom, 'total': sum(m['nombre'] for m in groupes), 'marqueurs': groupes})
+
 def carte_transport_parent(request, eleve_id):
     eleve = get_object_or_404(Eleve, id=eleve_id)
     return render(request, 'transports/carte_parent.html', {'eleve': eleve})
 
 @login_required
 def transport_position_parent(request, eleve_id):
-    eleve = get_object_or_404(Eleve, id=eleve_id)
-    if eleve.parent_user != request.user:
+    eleve = get_object_or_404(Eleve.objects.select_related('transport'), id=eleve_id)
+    if eleve.parent_user_id != request.user.id:
         return JsonResponse({'error': 'forbidden'}, status=403)
 
+    # La position la plus récente est dans le cache ; la base peut avoir un lot de retard
     transport = getattr(eleve, 'transport', None)
-    if not transport or transport.latitude is None or transport.longitude is None:
-        return JsonResponse({'status': 'no_position'})
+    donnees = etat_position(transport, transport and position_transport(transport))
+    if donnees['status'] == 'ok':
+        donnees['eta'] = eta_transport(transport)
+    return JsonResponse(donnees)
 
-    return JsonResponse({
-        'status': 'ok',
-        'latitude': transport.latitude,
-        'longitude': transport.longitude,
-        'moyen': transport.moyen,
-        'chauffeur': transport.chauffeur or '',
-    })
+
+@login_required
+def transport_eta_parent(request, eleve_id):
+    # Estimation partagée, calculée à la réception des positions du bus (core/eta.py)
+    eleve = get_object_or_404(Eleve.objects.select_related('transport'), id=eleve_id)
+    if eleve.parent_user_id != request.user.id:
+        return JsonResponse({'error': 'forbidden'}, status=403)
+
+    eta = eta_transport(getattr(eleve, 'transport', None))
+    return JsonResponse({'status': 'ok', 'eta': eta} if eta else {'status': 'no_eta'})
+
+
+@login_required
+async def transport_position_stream(request, eleve_id):
+    # Server-Sent Events : un événement seulement quand la position change
+    eleve = await aget_object_or_404(Eleve.objects.select_related('transport'), id=eleve_id)
+    user = await request.auser()
+    if eleve.parent_user_id != user.id:
+        return JsonResponse({'error': 'forbidden'}, status=403)
+    if not isinstance(request, ASGIRequest):
+        # Sous WSGI le flux serait bufferisé en entier : le client repasse en polling
+        return JsonResponse({'error': 'asgi_required'}, status=501)
+
+    response = StreamingHttpResponse(flux_position(eleve), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -1408,26 +1560,130 @@ def transport_update_position(request):
     if not (eleve_id and latitude and longitude):
         return JsonResponse({'error': 'missing_fields'}, status=400)
 
-    eleve = get_object_or_404(Eleve, id=eleve_id)
-    transport, _ = Transport.objects.get_or_create(eleve=eleve)
-    transport.latitude = float(latitude)
-    transport.longitude = float(longitude)
-    transport.save(update_fields=['latitude', 'longitude'])
+    try:
+        eleve_id, latitude, longitude = int(eleve_id), float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'invalid_fields'}, status=400)
+    if not coordonnees_valides(latitude, longitude):
+        return JsonResponse({'error': 'invalid_fields'}, status=400)
+
+    # Écriture différée : la base est mise à jour par lots (core/positions.py)
+    if not enregistrer_position(eleve_id, latitude, longitude):
+        raise Http404("Élève introuvable")
 
     return JsonResponse({'status': 'ok'})
+@csrf_exempt
+@require_http_methods(["POST"])
+def transport_positions_bus(request):
+    # Traceurs embarqués : positions de plusieurs bus en une requête, une écriture par bus.
+    # {"positions": [{"numero_bus": "B-12", "latitude": 33.57, "longitude": -7.58}, ...]}
+    # ou une trame binaire application/octet-stream (core.trames)
+    if settings.GPS_TRACKER_TOKEN and request.headers.get('Authorization') != f'Bearer {settings.GPS_TRACKER_TOKEN}':
+        return JsonResponse({'error': 'forbidden'}, status=403)
+    if request.content_type == 'application/octet-stream':
+        try:
+            positions, horodatages, rejetees = positions_trame(request.body)
+        except ValueError:
+            return JsonResponse({'error': 'invalid_frame'}, status=400)
+        acceptees = enregistrer_positions_bus(positions, horodatages)
+        en_direct = positions_en_direct(positions, horodatages)
+        evenements = avancer_trajets(en_direct)
+        mettre_a_jour_eta_bus(en_direct)
+        return JsonResponse({'status': 'ok', 'acceptees': len(acceptees), 'rejetees': rejetees, 'evenements': evenements})
+
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+        entrees = data['positions']
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'error': 'invalid_json'}, status=400)
+    if not isinstance(entrees, list):
+        return JsonResponse({'error': 'invalid_json'}, status=400)
+
+    positions = []
+    rejetees = []
+    for index, entree in enumerate(entrees):
+        try:
+            numero_bus = str(entree['numero_bus']).strip()
+            latitude, longitude = float(entree['latitude']), float(entree['longitude'])
+        except (TypeError, ValueError, KeyError):
+            rejetees.append(index)
+            continue
+        if not numero_bus or not coordonnees_valides(latitude, longitude):
+            rejetees.append(index)
+            continue
+        positions.append((index, numero_bus, latitude, longitude))
+
+    # Sans jeton, n'importe qui peut appeler cette vue : seuls les bus existants sont acceptés
+    acceptees = enregistrer_positions_bus(
+        [position[1:] for position in positions], creer_bus=bool(settings.GPS_TRACKER_TOKEN),
+    )
+    rejetees = sorted(rejetees + [position[0] for position in positions if position[1] not in acceptees])
+    positions = [position[1:] for position in positions if position[1] in acceptees]
+    evenements = avancer_trajets(positions)
+    mettre_a_jour_eta_bus(positions)
+    return JsonResponse({'status': 'ok', 'acceptees': len(acceptees), 'rejetees': rejetees, 'evenements': evenements})
+
+@login_required
+def transport_trace_bus(request, numero_bus):
+    # Trajet d'un bus sur une journée, simplifié pour le zoom de la carte (?date=AAAA-MM-JJ&zoom=15)
+    bus = get_object_or_404(Bus, numero_bus=numero_bus)
+    if not (is_admin(request.user) or Transport.objects.filter(numero_bus=numero_bus, eleve__parent_user=request.user).exists()):
+        return JsonResponse({'error': 'forbidden'}, status=403)
+
+    try:
+        jour = date.fromisoformat(request.GET['date']) if request.GET.get('date') else timezone.localdate()
+        zoom = min(max(int(request.GET.get('zoom', 15)), 0), ZOOM_MAX)
+    except ValueError:
+        return JsonResponse({'error': 'invalid_parameters'}, status=400)
+
+    trace = TraceBus.objects.filter(bus=bus, jour=jour).first()
+    return JsonResponse({
+        'numero_bus': bus.numero_bus,
+        'date': jour.isoformat(),
+        'zoom': zoom,
+        'nb_points': trace.nb_points if trace else 0,
+        'points': trace_simplifiee(trace, zoom) if trace else [],
+    })
+
 def notifier_bus_arrive(request, eleve_id):
+    # Notification tout de suite, SMS et email par le worker ; une seule fois par
+    # fenêtre NOTIF_FENETRE_REGROUPEMENT, les appels répétés sont comptés (core/regroupement.py)
     eleve = get_object_or_404(Eleve, id=eleve_id)
-    sms_ok = notifier_parent_par_sms(eleve)
-    email_ok = notifier_parent_par_email(eleve)
-    app_ok = notifier_parent_par_app(eleve)
+    envoyee = notifier_arrivee(eleve)
 
     if request.headers.get('x-requested-with') == 'XMLHttpRequest' or request.content_type == 'application/json':
-        return JsonResponse({
-            'status': 'ok',
-            'sms': sms_ok,
-            'email': email_ok,
-            'app': app_ok,
-        })
+        return JsonResponse({'status': 'queued' if envoyee else 'coalesced'})
 
-    messages.success(request, "Notifications envoyées au parent.")
+    messages.success(request, "Notifications programmées pour le parent.")
     return redirect('dashboard_parent') 
+
+
+@login_required
+@require_http_methods(["POST"])
+def notifier_groupe(request):
+    # Annonce aux parents de tout un bus ou de toute une classe, en un seul lot (core/notifications.py)
+    if not is_admin(request.user):
+        return JsonResponse({'error': 'forbidden'}, status=403)
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body.decode('utf-8'))
+        except ValueError:
+            return JsonResponse({'error': 'invalid_json'}, status=400)
+    else:
+        data = request.POST
+    champs = ('numero_bus', 'classe', 'titre', 'message')
+    if not isinstance(data, dict) or not all(isinstance(data.get(champ) or '', str) for champ in champs):
+        return JsonResponse({'error': 'invalid_json'}, status=400)
+
+    numero_bus = (data.get('numero_bus') or '').strip()
+    classe = (data.get('classe') or '').strip()
+    titre = (data.get('titre') or '').strip()
+    message = (data.get('message') or '').strip()
+    if not (numero_bus or classe) or not titre or not message:
+        return JsonResponse({'error': 'missing_fields'}, status=400)
+    if classe and classe not in dict(CLASSES):
+        return JsonResponse({'error': 'invalid_fields'}, status=400)
+
+    sms = data.get('sms') in (True, '1', 'true', 'on')
+    envois = notifier_parents(eleves_cibles(numero_bus=numero_bus, classe=classe), titre[:120], message, sms=sms)
+    return JsonResponse({'status': 'ok', **envois})
@@ -11,9 +11,11 @@ if [ "${RUN_COLLECTSTATIC:-0}" = "1" ]; then
 fi
 
 echo "Starting app. PORT=${PORT:-8080}"
-python -c "import config.wsgi"  # fail fast with a real traceback in logs
+python -c "import config.asgi"  # fail fast with a real traceback in logs
 
-exec gunicorn config.wsgi:application \
+# ASGI (uvicorn) : nécessaire au flux SSE des positions de bus
+exec gunicorn config.asgi:application \
+  --worker-class uvicorn_worker.UvicornWorker \
   --bind "0.0.0.0:${PORT:-8080}" \
   --log-level info \
   --access-logfile - \